@@ -3,57 +3,325 @@ API Client for FRIZZLY Admin Dashboard
 Communicates with the API server instead of directly accessing Firebase
 """
 import requests
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Callable, Iterator, NamedTuple, Sequence
+import contextlib
+import contextvars
 import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http_transport import HTTPTransport, transport as shared_transport
+from response_cache import ValidatorCache, PolicyCache, EntityCache, detach
+from json_stream import iter_json_array
+import request_memo
 
 logger = logging.getLogger(__name__)
 
+# Bulk operations
+BULK_MAX_WORKERS = 8          # concurrent upstream writes per bulk call
+BULK_RETRIES = 2              # extra attempts per item on transient failures
+CAPABILITIES_TTL = 600        # re-check advertised server features every 10 minutes
+SERVE_STALE_ON_ERROR = True   # fall back to the last good body while an endpoint is failing
+STREAM_CHUNK_SIZE = 64 * 1024 # bytes read per chunk by the streaming list/export calls
+
+# Field projections (``fields=``) for list views; servers that don't support
+# projection ignore the parameter and send full objects
+ORDER_LIST_FIELDS = ('id', 'orderId', 'userId', 'status', 'totalAmount', 'timestamp', 'createdAt', 'itemCount')
+USER_LIST_FIELDS = ('id', 'userId', 'name', 'displayName', 'email', 'phone', 'phoneNumbers', 'fcmToken', 'createdAt')
+
+# Response cache policy: TTL (seconds) per read method. 'per_user' reads are
+# cached separately for each admin token.
+CACHE_POLICY = {
+    'get_products': {'ttl': 60},
+    'get_product_stock': {'ttl': 60},
+    'get_product_categories': {'ttl': 300},
+    'get_all_drivers': {'ttl': 60},
+    'get_available_drivers': {'ttl': 60},
+    'get_driver': {'ttl': 60},
+    'get_dashboard_stats': {'ttl': 30},
+    'get_analytics': {'ttl': 300},
+    'get_revenue_data': {'ttl': 300},
+    'get_admin_profile': {'ttl': 300, 'per_user': True},
+}
+
+# Reads that each write method makes stale
+PRODUCT_READS = ('get_products', 'get_product_stock', 'get_product_categories')
+DRIVER_READS = ('get_all_drivers', 'get_available_drivers', 'get_driver')
+ORDER_STATS_READS = ('get_dashboard_stats', 'get_analytics', 'get_revenue_data')
+INVALIDATES = {
+    'create_product': PRODUCT_READS,
+    'update_product': PRODUCT_READS,
+    'delete_product': PRODUCT_READS,
+    'bulk_delete_products': PRODUCT_READS,
+    'update_product_stock': PRODUCT_READS + ('get_dashboard_stats',),
+    'create_driver': DRIVER_READS,
+    'update_driver': DRIVER_READS,
+    'delete_driver': DRIVER_READS,
+    'assign_driver_to_order': DRIVER_READS + ORDER_STATS_READS,
+    'update_order_status': ORDER_STATS_READS + DRIVER_READS,
+    'delete_order': ORDER_STATS_READS,
+    'update_admin_profile': ('get_admin_profile',),
+}
+
+class Page(NamedTuple):
+    """One page of an API list
+
+    ``paged`` is False when the server has no cursor pagination and the page
+    was cut from the full list locally; ``total`` is None if the server didn't say.
+    """
+    items: List[Dict]
+    next_cursor: Optional[str]
+    total: Optional[int]
+    paged: bool
+
+# Admin token for calls made outside a request (see FrizzlyAPIClient.using_token)
+_token_override = contextvars.ContextVar('api_token_override', default=None)
+
+
 class FrizzlyAPIClient:
-    def __init__(self, base_url: str, admin_token: Optional[str] = None):
+    def __init__(self, base_url: str, admin_token: Optional[str] = None,
+                 token_provider: Optional[Callable[[], Optional[str]]] = None,
+                 transport: Optional[HTTPTransport] = None):
         self.base_url = base_url.rstrip('/')
         self.admin_token = admin_token
-        self.session = requests.Session()
+        self.token_provider = token_provider
+        self.transport = transport or shared_transport
+        self.session = self.transport.session
+        self._capabilities = {'features': set(), 'timestamp': 0}
+        # ETag / Last-Modified revalidation for GETs
+        self.validator_cache = ValidatorCache()
+        # TTL results for reads in CACHE_POLICY, dropped by writes in INVALIDATES
+        self.policy_cache = PolicyCache()
+        # Products by id, kept current by list fetches and dropped by product writes
+        self.product_cache = EntityCache(CACHE_POLICY['get_products']['ttl'])
+        self._product_detail_endpoint = True
+    
+    @contextlib.contextmanager
+    def using_token(self, token: Optional[str]):
+        """Send calls made in this context (e.g. a background thread) with ``token``"""
+        reset = _token_override.set(token)
+        try:
+            yield self
+        finally:
+            _token_override.reset(reset)
     
-    def _get_headers(self) -> Dict[str, str]:
-        headers = {'Content-Type': 'application/json'}
+    def _get_token(self) -> Optional[str]:
+        if _token_override.get():
+            return _token_override.get()
         if self.admin_token:
-            headers['Authorization'] = f'Bearer {self.admin_token}'
-        return headers
+            return self.admin_token
+        if self.token_provider:
+            return self.token_provider()
+        return None
     
-    def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+    def _request(self, method: str, endpoint: str, policy: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """Send a request; ``policy`` names the client method for CACHE_POLICY / INVALIDATES"""
         url = f"{self.base_url}{endpoint}"
-        headers = self._get_headers()
+        read_policy = CACHE_POLICY.get(policy) if method == 'GET' else None
+        
+        if read_policy:
+            cache_key = self._policy_key(url, kwargs.get('params'), read_policy)
+            cached = self.policy_cache.get(policy, cache_key)
+            if cached is not None:
+                return cached
         
         try:
-            response = self.session.request(method, url, headers=headers, timeout=30, **kwargs)
+            if method == 'GET':
+                # One upstream GET per URL per Flask request
+                memo_key = ('api', requests.Request('GET', url, params=kwargs.get('params')).prepare().url)
+                result = request_memo.get_or_load(memo_key, lambda: self._conditional_get(url, **kwargs))
+                if read_policy:
+                    self.policy_cache.set(policy, cache_key, detach(result), read_policy['ttl'])
+                return result
+            response = self.transport.request(method, url, token=self._get_token(), **kwargs)
             response.raise_for_status()
+            request_memo.forget('api')
+            if policy in INVALIDATES:
+                self.policy_cache.invalidate(*INVALIDATES[policy])
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"API request failed: {method} {url} - {e}")
+            if method == 'GET' and SERVE_STALE_ON_ERROR and self._is_upstream_failure(e):
+                stale = self._stale_body(url, kwargs.get('params'), policy)
+                if stale is not None:
+                    logger.warning(f"Serving cached data for {url} while the API is unavailable")
+                    return stale
+            raise
+    
+    @staticmethod
+    def _is_upstream_failure(error: requests.exceptions.RequestException) -> bool:
+        """Network errors, timeouts, open circuits and 5xx - not client errors"""
+        if isinstance(error, requests.exceptions.HTTPError):
+            return error.response is not None and error.response.status_code >= 500
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+    
+    def _stale_body(self, url: str, params: Optional[Dict], policy: Optional[str]) -> Optional[Any]:
+        read_policy = CACHE_POLICY.get(policy)
+        if read_policy:
+            stale = self.policy_cache.get_stale(policy, self._policy_key(url, params, read_policy))
+            if stale is not None:
+                return stale
+        body = self.validator_cache.get(requests.Request('GET', url, params=params).prepare().url)
+        return detach(body) if body is not None else None
+    
+    def _policy_key(self, url: str, params: Optional[Dict], read_policy: Dict) -> str:
+        key = requests.Request('GET', url, params=params).prepare().url
+        if read_policy.get('per_user'):
+            key = f"{self._get_token()}|{key}"
+        return key
+    
+    def _conditional_get(self, url: str, params: Optional[Dict] = None, **kwargs) -> Dict[str, Any]:
+        """GET with If-None-Match / If-Modified-Since; a 304 reuses the cached parsed body"""
+        cache_key = requests.Request('GET', url, params=params).prepare().url
+        headers = self.validator_cache.conditional_headers(cache_key)
+        response = self.transport.request('GET', cache_key, token=self._get_token(), headers=headers, **kwargs)
+        
+        if response.status_code == 304:
+            body = self.validator_cache.revalidated(cache_key)
+            if body is not None:
+                return body
+            # Entry was evicted between the request and the 304 - refetch unconditionally
+            response = self.transport.request('GET', cache_key, token=self._get_token(), **kwargs)
+        
+        response.raise_for_status()
+        body = response.json()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        self.validator_cache.store(cache_key, etag, last_modified, body, len(response.content))
+        return detach(body) if (etag or last_modified) else body
+    
+    def _stream(self, endpoint: str, params: Optional[Dict] = None) -> requests.Response:
+        """Open a streamed GET (caller must close the response)"""
+        response = self.transport.request('GET', f"{self.base_url}{endpoint}", token=self._get_token(),
+                                          params=params, stream=True)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            response.close()
             raise
+        return response
+    
+    def _stream_list(self, endpoint: str, key: str, params: Optional[Dict] = None,
+                     members: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield the items of ``{key: [...]}`` one at a time without buffering the body"""
+        response = self._stream(endpoint, params)
+        decoded = 0
+        
+        def chunks():
+            nonlocal decoded
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                decoded += len(chunk)
+                yield chunk
+        
+        try:
+            yield from iter_json_array(chunks(), key, members=members)
+        finally:
+            self.transport.record_payload(response, decoded)
+            response.close()
+    
+    def _get_page(self, endpoint: str, key: str, params: Optional[Dict] = None,
+                  cursor: Optional[str] = None, limit: int = 20, offset: int = 0,
+                  stream: bool = False, sort_key: Optional[Callable] = None,
+                  policy: Optional[str] = None, legacy_params: Optional[Dict] = None) -> Page:
+        """Request one page of a list endpoint
+        
+        When the server advertises ``cursor_pagination`` only ``limit`` items
+        after ``cursor`` are requested. Otherwise the full list is requested
+        (with ``legacy_params``) and the page at ``offset`` is cut locally,
+        sorted descending by ``sort_key`` first unless streaming. With
+        ``stream`` the body is decoded incrementally and only the page is kept.
+        """
+        paged = self.supports('cursor_pagination')
+        params = dict(params or {})
+        if paged:
+            params['limit'] = limit
+            if cursor:
+                params['cursor'] = cursor
+        elif legacy_params:
+            params.update(legacy_params)
+        
+        if stream:
+            members = {}
+            items, count = [], 0
+            for item in self._stream_list(endpoint, key, params, members=members):
+                if paged or offset <= count < offset + limit:
+                    items.append(item)
+                count += 1
+            if paged:
+                return Page(items, members.get('nextCursor'), members.get('total'), True)
+            return Page(items, None, count, False)
+        
+        result = self._request('GET', endpoint, params=params, policy=policy)
+        items = result.get(key, [])
+        if paged:
+            return Page(items, result.get('nextCursor'), result.get('total'), True)
+        if sort_key:
+            items = sorted(items, key=sort_key, reverse=True)
+        return Page(items[offset:offset + limit], None, len(items), False)
+    
+    @staticmethod
+    def _with_fields(params: Optional[Dict], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+        """Add a ``fields=a,b,c`` projection to request params"""
+        params = dict(params or {})
+        if fields:
+            params['fields'] = ','.join(fields)
+        return params
+    
+    def iter_pages(self, fetch_page: Callable[..., Page], limit: int = 100, **kwargs) -> Iterator[Page]:
+        """Follow ``nextCursor`` through every page of a ``get_*_page`` method"""
+        cursor = None
+        while True:
+            page = fetch_page(cursor=cursor, limit=limit, **kwargs)
+            yield page
+            if not page.paged or not page.next_cursor:
+                return
+            cursor = page.next_cursor
     
     # ==================== ORDERS ====================
     
-    def get_all_orders(self, status: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None) -> List[Dict]:
+    @staticmethod
+    def _order_filter_params(status: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None) -> Dict[str, Any]:
+        params = {}
+        if status:
+            params['status'] = status
+        if date_from:
+            params['date_from'] = date_from
+        if date_to:
+            params['date_to'] = date_to
+        if min_amount is not None:
+            params['min_amount'] = min_amount
+        if max_amount is not None:
+            params['max_amount'] = max_amount
+        return params
+    
+    def get_all_orders(self, status: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None, cursor: Optional[str] = None, limit: Optional[int] = None, fields: Optional[Sequence[str]] = None) -> List[Dict]:
         """Get all orders (admin endpoint) with optional filters"""
         try:
-            params = {}
-            if status:
-                params['status'] = status
-            if date_from:
-                params['date_from'] = date_from
-            if date_to:
-                params['date_to'] = date_to
-            if min_amount is not None:
-                params['min_amount'] = min_amount
-            if max_amount is not None:
-                params['max_amount'] = max_amount
-
+            params = self._with_fields(self._order_filter_params(status, date_from, date_to, min_amount, max_amount), fields)
+            if cursor:
+                params['cursor'] = cursor
+            if limit:
+                params['limit'] = limit
             result = self._request('GET', '/api/admin/orders', params=params)
             return result.get('orders', [])
         except:
             return []
     
+    def get_orders_page(self, cursor: Optional[str] = None, limit: int = 20, offset: int = 0, stream: bool = False, fields: Optional[Sequence[str]] = None, **filters) -> Page:
+        """One page of orders, newest first; see _get_page"""
+        try:
+            return self._get_page('/api/admin/orders', 'orders', self._with_fields(self._order_filter_params(**filters), fields),
+                                  cursor, limit, offset, stream=stream,
+                                  sort_key=lambda o: o.get('timestamp', 0))
+        except Exception as e:
+            logger.error(f"Failed to fetch orders page: {e}")
+            return Page([], None, 0, False)
+    
+    def iter_all_orders(self, status: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None, min_amount: Optional[float] = None, max_amount: Optional[float] = None, fields: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+        """Stream all orders one at a time (constant memory; raises on API errors)"""
+        params = self._with_fields(self._order_filter_params(status, date_from, date_to, min_amount, max_amount), fields)
+        return self._stream_list('/api/admin/orders', 'orders', params)
+    
     def get_order(self, order_id: str) -> Optional[Dict]:
         """Get single order"""
         try:
@@ -65,34 +333,139 @@ class FrizzlyAPIClient:
     def update_order_status(self, order_id: str, status: str) -> bool:
         """Update order status"""
         try:
-            self._request('PUT', f'/api/admin/orders/{order_id}', json={'status': status})
+            self._request('PUT', f'/api/admin/orders/{order_id}', json={'status': status}, policy='update_order_status')
             return True
         except:
             return False
     
+    def bulk_update_order_status(self, order_ids: List[str], status: str,
+                                 max_workers: int = BULK_MAX_WORKERS,
+                                 retries: int = BULK_RETRIES) -> Dict[str, Dict[str, Any]]:
+        """Update many orders to one status
+
+        Uses the server's batch endpoint when it advertises ``orders.bulk_status``,
+        otherwise runs per-order PUTs with bounded concurrency and retries.
+        Returns ``{order_id: {'success': bool, 'attempts': int, 'error': str|None}}``.
+        """
+        order_ids = list(dict.fromkeys(order_ids))  # de-duplicate, keep order
+        if not order_ids:
+            return {}
+        
+        if self.supports('orders.bulk_status'):
+            try:
+                result = self._request('POST', '/api/admin/orders/bulk-status',
+                                       json={'orderIds': order_ids, 'status': status},
+                                       policy='update_order_status')
+                per_item = result.get('results', {})
+                if isinstance(per_item, list):
+                    per_item = {r.get('orderId'): r.get('success', False) for r in per_item}
+                return {oid: {'success': bool(per_item.get(oid, result.get('success', False))),
+                              'attempts': 1, 'error': None}
+                        for oid in order_ids}
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Batch status update failed, falling back to per-order updates: {e}")
+        
+        def run(order_id):
+            return self._update_status_with_retry(order_id, status, retries)
+        
+        workers = max(1, min(max_workers, len(order_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-status') as pool:
+            # Each task gets a copy of the caller's context so the token provider still works
+            futures = [pool.submit(contextvars.copy_context().run, run, oid) for oid in order_ids]
+            return {oid: f.result() for oid, f in zip(order_ids, futures)}
+    
+    def _update_status_with_retry(self, order_id: str, status: str, retries: int) -> Dict[str, Any]:
+        attempts = 0
+        error = None
+        while attempts <= retries:
+            attempts += 1
+            try:
+                self._request('PUT', f'/api/admin/orders/{order_id}', json={'status': status},
+                              policy='update_order_status')
+                return {'success': True, 'attempts': attempts, 'error': None}
+            except requests.exceptions.HTTPError as e:
+                error = str(e)
+                code = e.response.status_code if e.response is not None else 0
+                if 400 <= code < 500 and code != 429:
+                    break  # client errors won't succeed on retry
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+            if attempts <= retries:
+                time.sleep(random.uniform(0, 0.2 * (2 ** attempts)))
+        return {'success': False, 'attempts': attempts, 'error': error}
+    
     def delete_order(self, order_id: str) -> bool:
         """Delete order"""
         try:
-            self._request('DELETE', f'/api/admin/orders/{order_id}')
+            self._request('DELETE', f'/api/admin/orders/{order_id}', policy='delete_order')
             return True
         except:
             return False
     
     # ==================== PRODUCTS ====================
     
-    def get_products(self, active_only: bool = False, limit: int = 100) -> List[Dict]:
+    def get_products(self, active_only: bool = False, limit: int = 100, cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> List[Dict]:
         """Get all products"""
         try:
-            params = {'active': str(active_only).lower(), 'limit': limit}
-            result = self._request('GET', '/api/products', params=params)
-            return result.get('products', [])
+            params = self._with_fields({'active': str(active_only).lower(), 'limit': limit}, fields)
+            if cursor:
+                params['cursor'] = cursor
+            result = self._request('GET', '/api/products', params=params, policy='get_products')
+            products = result.get('products', [])
+            if not fields:
+                self.product_cache.set_many(products)
+            return products
         except:
             return []
     
+    def get_products_page(self, cursor: Optional[str] = None, limit: int = 20, offset: int = 0, active_only: bool = False, fields: Optional[Sequence[str]] = None) -> Page:
+        """One page of products; see _get_page"""
+        try:
+            page = self._get_page('/api/products', 'products', self._with_fields({'active': str(active_only).lower()}, fields),
+                                  cursor, limit, offset, policy='get_products',
+                                  legacy_params={'limit': 1000})
+            if not fields:
+                self.product_cache.set_many(page.items)
+            return page
+        except Exception as e:
+            logger.error(f"Failed to fetch products page: {e}")
+            return Page([], None, 0, False)
+    
+    def get_product(self, product_id: str) -> Optional[Dict]:
+        """Get single product (id cache, then the detail endpoint)
+        
+        Servers without ``GET /api/products/<id>`` fall back to one list fetch,
+        which also warms the cache for the rest of the catalog.
+        """
+        product = self.product_cache.get(product_id)
+        if product is not None or not self._product_detail_endpoint:
+            return product or self._find_product(product_id)
+        try:
+            result = self._request('GET', f'/api/products/{product_id}')
+            product = result.get('product')
+            if product:
+                product.setdefault('id', product_id)
+                self.product_cache.set(product)
+            return product
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code not in (404, 405):
+                return None
+        except:
+            return None
+        product = self._find_product(product_id)
+        if product is not None:
+            # The list has it, so the 404 means the server has no detail endpoint
+            self._product_detail_endpoint = False
+        return product
+    
+    def _find_product(self, product_id: str) -> Optional[Dict]:
+        self.get_products(active_only=False, limit=1000)
+        return self.product_cache.get(product_id)
+    
     def create_product(self, product_data: Dict) -> Optional[str]:
         """Create new product"""
         try:
-            result = self._request('POST', '/api/products', json=product_data)
+            result = self._request('POST', '/api/products', json=product_data, policy='create_product')
             return result.get('productId')
         except:
             return None
@@ -100,7 +473,8 @@ class FrizzlyAPIClient:
     def update_product(self, product_id: str, product_data: Dict) -> bool:
         """Update product"""
         try:
-            self._request('PUT', f'/api/products/{product_id}', json=product_data)
+            self._request('PUT', f'/api/products/{product_id}', json=product_data, policy='update_product')
+            self.product_cache.invalidate(product_id)
             return True
         except:
             return False
@@ -108,21 +482,39 @@ class FrizzlyAPIClient:
     def delete_product(self, product_id: str) -> bool:
         """Delete product"""
         try:
-            self._request('DELETE', f'/api/products/{product_id}')
+            self._request('DELETE', f'/api/products/{product_id}', policy='delete_product')
+            self.product_cache.invalidate(product_id)
             return True
         except:
             return False
     
     # ==================== USERS ====================
     
-    def get_all_users(self) -> List[Dict]:
+    def get_all_users(self, cursor: Optional[str] = None, limit: Optional[int] = None, fields: Optional[Sequence[str]] = None) -> List[Dict]:
         """Get all users (admin endpoint)"""
         try:
-            result = self._request('GET', '/api/admin/users')
+            params = self._with_fields(None, fields)
+            if cursor:
+                params['cursor'] = cursor
+            if limit:
+                params['limit'] = limit
+            result = self._request('GET', '/api/admin/users', params=params)
             return result.get('users', [])
         except:
             return []
     
+    def get_users_page(self, cursor: Optional[str] = None, limit: int = 20, offset: int = 0, fields: Optional[Sequence[str]] = None) -> Page:
+        """One page of users; see _get_page"""
+        try:
+            return self._get_page('/api/admin/users', 'users', self._with_fields(None, fields), cursor, limit, offset)
+        except Exception as e:
+            logger.error(f"Failed to fetch users page: {e}")
+            return Page([], None, 0, False)
+    
+    def iter_all_users(self) -> Iterator[Dict]:
+        """Stream all users one at a time (constant memory; raises on API errors)"""
+        return self._stream_list('/api/admin/users', 'users')
+    
     def get_user(self, user_id: str) -> Optional[Dict]:
         """Get user profile"""
         try:
@@ -136,10 +528,24 @@ class FrizzlyAPIClient:
     def get_analytics(self) -> Dict:
         """Get analytics data (admin endpoint)"""
         try:
-            return self._request('GET', '/api/admin/analytics')
+            return self._request('GET', '/api/admin/analytics', policy='get_analytics')
         except:
             return {'totalOrders': 0, 'totalRevenue': 0, 'statusCounts': {}}
     
+    # ==================== CAPABILITIES ====================
+    
+    def supports(self, feature: str) -> bool:
+        """Whether the API server advertises an optional feature (cached)"""
+        now = time.time()
+        if now - self._capabilities['timestamp'] > CAPABILITIES_TTL:
+            try:
+                result = self._request('GET', '/api/capabilities')
+                self._capabilities['features'] = set(result.get('features', []))
+            except:
+                self._capabilities['features'] = set()
+            self._capabilities['timestamp'] = now
+        return feature in self._capabilities['features']
+    
     # ==================== HEALTH ====================
     
     def health_check(self) -> bool:
@@ -154,35 +560,35 @@ class FrizzlyAPIClient:
     
     def get_all_drivers(self) -> List[Dict]:
         try:
-            result = self._request('GET', '/api/drivers')
+            result = self._request('GET', '/api/drivers', policy='get_all_drivers')
             return result.get('drivers', [])
         except:
             return []
             
     def get_driver(self, driver_id: str) -> Optional[Dict]:
         try:
-            result = self._request('GET', f'/api/drivers/{driver_id}')
+            result = self._request('GET', f'/api/drivers/{driver_id}', policy='get_driver')
             return result.get('driver')
         except:
             return None
 
     def create_driver(self, driver_data: Dict) -> Optional[str]:
         try:
-            result = self._request('POST', '/api/drivers', json=driver_data)
+            result = self._request('POST', '/api/drivers', json=driver_data, policy='create_driver')
             return result.get('driverId')
         except:
             return None
 
     def update_driver(self, driver_id: str, driver_data: Dict) -> bool:
         try:
-            self._request('PUT', f'/api/drivers/{driver_id}', json=driver_data)
+            self._request('PUT', f'/api/drivers/{driver_id}', json=driver_data, policy='update_driver')
             return True
         except:
             return False
 
     def delete_driver(self, driver_id: str) -> bool:
         try:
-            self._request('DELETE', f'/api/drivers/{driver_id}')
+            self._request('DELETE', f'/api/drivers/{driver_id}', policy='delete_driver')
             return True
         except:
             return False
@@ -255,7 +661,7 @@ class FrizzlyAPIClient:
 
     def get_product_categories(self) -> List[str]:
         try:
-            result = self._request('GET', '/api/products/categories')
+            result = self._request('GET', '/api/products/categories', policy='get_product_categories')
             return result.get('categories', [])
         except:
             return []
@@ -264,7 +670,7 @@ class FrizzlyAPIClient:
 
     def get_available_drivers(self) -> List[Dict]:
         try:
-            result = self._request('GET', '/api/drivers/available')
+            result = self._request('GET', '/api/drivers/available', policy='get_available_drivers')
             return result.get('drivers', [])
         except:
             return []
@@ -273,7 +679,7 @@ class FrizzlyAPIClient:
 
     def get_dashboard_stats(self) -> Dict:
         try:
-            result = self._request('GET', '/api/admin/dashboard-stats')
+            result = self._request('GET', '/api/admin/dashboard-stats', policy='get_dashboard_stats')
             return result.get('stats', {})
         except:
             return {}
@@ -283,7 +689,7 @@ class FrizzlyAPIClient:
     def assign_driver_to_order(self, order_id: str, driver_id: str) -> bool:
         try:
             data = {'driverId': driver_id}
-            result = self._request('POST', f'/api/admin/orders/{order_id}/assign-driver', json=data)
+            result = self._request('POST', f'/api/admin/orders/{order_id}/assign-driver', json=data, policy='assign_driver_to_order')
             return result.get('success', False)
         except:
             return False
@@ -293,7 +699,8 @@ class FrizzlyAPIClient:
     def bulk_delete_products(self, product_ids: List[str]) -> bool:
         try:
             data = {'productIds': product_ids}
-            result = self._request('POST', '/api/products/bulk-delete', json=data)
+            result = self._request('POST', '/api/products/bulk-delete', json=data, policy='bulk_delete_products')
+            self.product_cache.invalidate(*product_ids)
             return result.get('success', False)
         except:
             return False
@@ -335,16 +742,24 @@ class FrizzlyAPIClient:
 
     def export_orders(self) -> Optional[str]:
         try:
-            response = self.session.request('GET', '/api/exports/orders', headers=self._get_headers(), timeout=30)
+            response = self.transport.request('GET', f"{self.base_url}/api/exports/orders", token=self._get_token())
             response.raise_for_status()
             return response.text # Assuming API returns CSV directly as text
         except requests.exceptions.RequestException as e:
             logger.error(f"API request failed for export_orders: {e}")
             return None
 
+    def iter_export_orders(self) -> Iterator[bytes]:
+        """Stream the orders CSV export in chunks (raises on API errors)"""
+        response = self._stream('/api/exports/orders')
+        try:
+            yield from response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        finally:
+            response.close()
+
     def export_revenue(self) -> Optional[str]:
         try:
-            response = self.session.request('GET', '/api/exports/revenue', headers=self._get_headers(), timeout=30)
+            response = self.transport.request('GET', f"{self.base_url}/api/exports/revenue", token=self._get_token())
             response.raise_for_status()
             return response.text # Assuming API returns CSV directly as text
         except requests.exceptions.RequestException as e:
@@ -355,7 +770,7 @@ class FrizzlyAPIClient:
 
     def get_revenue_data(self) -> Dict:
         try:
-            result = self._request('GET', '/api/analytics/revenue')
+            result = self._request('GET', '/api/analytics/revenue', policy='get_revenue_data')
             return result.get('data', {})
         except:
             return {}
@@ -364,14 +779,14 @@ class FrizzlyAPIClient:
 
     def get_admin_profile(self) -> Optional[Dict]:
         try:
-            result = self._request('GET', '/api/admin/profile')
+            result = self._request('GET', '/api/admin/profile', policy='get_admin_profile')
             return result.get('profile')
         except:
             return None
 
     def update_admin_profile(self, profile_data: Dict) -> bool:
         try:
-            result = self._request('PUT', '/api/admin/profile', json=profile_data)
+            result = self._request('PUT', '/api/admin/profile', json=profile_data, policy='update_admin_profile')
             return result.get('success', False)
         except:
             return False
@@ -393,7 +808,7 @@ class FrizzlyAPIClient:
 
     def get_product_stock(self) -> List[Dict]:
         try:
-            result = self._request('GET', '/api/products/stock')
+            result = self._request('GET', '/api/products/stock', policy='get_product_stock')
             return result.get('products', [])
         except:
             return []
@@ -401,7 +816,8 @@ class FrizzlyAPIClient:
     def update_product_stock(self, product_id: str, new_stock: int) -> bool:
         """Update product stock"""
         try:
-            self._request('PUT', f'/api/products/{product_id}/stock', json={'stock': new_stock})
+            self._request('PUT', f'/api/products/{product_id}/stock', json={'stock': new_stock}, policy='update_product_stock')
+            self.product_cache.invalidate(product_id)
             return True
         except:
             return False
@@ -2,17 +2,26 @@
 FRIZZLY Admin Dashboard - API Version
 Uses API server instead of direct Firebase access
 """
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, abort
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, abort, stream_with_context
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-import requests
-from datetime import datetime
 import os
 import time
 import json
+import itertools
+import functools
 from functools import wraps
 import logging
+import requests
 from logging.handlers import RotatingFileHandler
-from api_client import FrizzlyAPIClient
+import request_memo
+from api_client import FrizzlyAPIClient, ORDER_LIST_FIELDS, USER_LIST_FIELDS
+from async_api_client import AsyncFrizzlyAPIClient
+from http_transport import transport
+from resilience import Deadline, CONNECT_TIMEOUT
+from sse_hub import SSEHub, parse_last_event_id
+from order_index import order_index, sort_timestamp
+from order_stats import DASHBOARD_COUNTERS
+from formatting import format_timestamp, format_timestamps
 
 # Import configuration
 try:
@@ -21,8 +30,19 @@ except ImportError:
     API_BASE_URL = os.environ.get('API_BASE_URL', 'http://localhost:5000')
     SECRET_KEY = os.environ.get('SECRET_KEY', 'change-me-in-production')
 
-# Initialize API client
-api_client = FrizzlyAPIClient(base_url=API_BASE_URL)
+def _current_token():
+    """Bearer token of the logged-in admin (None outside a request)"""
+    try:
+        if current_user.is_authenticated:
+            return current_user.token
+    except Exception:
+        pass
+    return None
+
+# Initialize API client (shares the pooled transport with api_request)
+api_client = FrizzlyAPIClient(base_url=API_BASE_URL, token_provider=_current_token)
+# Coroutine mirror for pages that fan out to several independent endpoints
+api_async = AsyncFrizzlyAPIClient(api_client)
 
 # Helper function to normalize order data
 def normalize_order_data(order_dict):
@@ -31,18 +51,7 @@ def normalize_order_data(order_dict):
         order_dict['items'] = []
     
     # Convert timestamp to createdAt string for display
-    if 'timestamp' in order_dict and order_dict['timestamp']:
-        try:
-            # Handle Firestore Timestamp object
-            if hasattr(order_dict['timestamp'], 'timestamp'):
-                ts = order_dict['timestamp'].timestamp()
-            else:
-                ts = order_dict['timestamp'] / 1000 if order_dict['timestamp'] > 1e12 else order_dict['timestamp']
-            order_dict['createdAt'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            order_dict['createdAt'] = 'N/A'
-    elif 'createdAt' not in order_dict:
-        order_dict['createdAt'] = 'N/A'
+    format_timestamps([order_dict])
     
     return order_dict
 
@@ -60,48 +69,18 @@ def log_activity(action, details, user_id=None):
     except Exception as e:
         app.logger.error(f"Error logging activity via API: {e}")
 
-# In-memory cache for categories
-_category_cache = {'data': [], 'timestamp': 0}
-_CATEGORY_CACHE_TTL = 300 # Cache for 5 minutes (300 seconds)
+DEFAULT_CATEGORIES = ['Fruits', 'Vegetables', 'Organic', 'Others']
 
 def get_cached_categories():
-    global _category_cache
-    current_time = datetime.now().timestamp()
-    if (current_time - _category_cache['timestamp']) > _CATEGORY_CACHE_TTL:
-        app.logger.info("Refreshing category cache from API.")
-        try:
-            categories = api_client.get_product_categories()
-            if categories:
-                _category_cache['data'] = sorted(list(set(categories))) # Ensure unique and sorted
-            else:
-                _category_cache['data'] = ['Fruits', 'Vegetables', 'Organic', 'Others'] # Fallback
-            _category_cache['timestamp'] = current_time
-        except Exception as e:
-            app.logger.exception("Error refreshing category cache from API.")
-            # Return defaults on error or existing cache if available
-            if not _category_cache['data']:
-                _category_cache['data'] = ['Fruits', 'Vegetables', 'Organic', 'Others']
-    
-    return _category_cache['data']
-
-# In-memory cache for drivers (optional, but good for frequently accessed lists)
-_driver_cache = {'data': [], 'timestamp': 0}
-_DRIVER_CACHE_TTL = 60 # Cache for 1 minute
+    """Product categories (cached by api_client per CACHE_POLICY)"""
+    categories = api_client.get_product_categories()
+    if categories:
+        return sorted(set(categories))  # Ensure unique and sorted
+    return DEFAULT_CATEGORIES
 
 def get_available_drivers():
-    global _driver_cache
-    current_time = datetime.now().timestamp()
-    if (current_time - _driver_cache['timestamp']) > _DRIVER_CACHE_TTL:
-        app.logger.info("Refreshing driver cache from API.")
-        try:
-            drivers = api_client.get_available_drivers()
-            _driver_cache['data'] = [d for d in drivers if d.get('status') == 'available']
-            _driver_cache['timestamp'] = current_time
-        except Exception as e:
-            app.logger.exception("Error refreshing driver cache from API.")
-            if not _driver_cache['data']:
-                _driver_cache['data'] = [] # Ensure it's an empty list on error
-    return _driver_cache['data']
+    """Available drivers (cached by api_client per CACHE_POLICY)"""
+    return [d for d in api_client.get_available_drivers() if d.get('status') == 'available']
 
 # Constants
 VALID_ORDER_STATUSES = [
@@ -121,6 +100,9 @@ handler.setFormatter(formatter)
 app.logger.addHandler(handler)
 app.logger.setLevel(logging.INFO)
 
+# Convert timestamp to readable date (cached; runs only for rendered rows)
+app.add_template_filter(format_timestamp, 'timestamp_to_date')
+
 # Flask-Login setup
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -156,40 +138,52 @@ def role_required(roles):
     return wrapper
 
 # API Helper Functions
-def api_request(method, endpoint, data=None, params=None):
-    """Make API request with authentication"""
+def api_request(method, endpoint, data=None, params=None, budget=None):
+    """Make API request with authentication
+
+    ``budget`` caps the total seconds spent (retries included); defaults to API_CALL_BUDGET.
+    """
     url = f"{API_BASE_URL}{endpoint}"
-    headers = {'Content-Type': 'application/json'}
     
-    if current_user.is_authenticated:
-        headers['Authorization'] = f'Bearer {current_user.token}'
+    if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+        return None
     
-    try:
-        if method == 'GET':
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-        elif method == 'POST':
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-        elif method == 'PUT':
-            response = requests.put(url, headers=headers, json=data, timeout=30)
-        elif method == 'DELETE':
-            response = requests.delete(url, headers=headers, timeout=30)
-        else:
-            return None
+    kwargs = {'params': params} if method == 'GET' else {}
+    if method in ('POST', 'PUT'):
+        kwargs['json'] = data
+    
+    def send():
+        deadline = Deadline(budget) if budget else None
+        response = transport.request(method, url, token=_current_token(), deadline=deadline, **kwargs)
         
         if response.status_code in [200, 201]:
             return response.json()
         else:
             app.logger.error(f"API error: {response.status_code} - {response.text}")
             return None
+    
+    try:
+        if method == 'GET':
+            # Same endpoint twice in one request (page + helper) costs one call
+            return request_memo.get_or_load(('api', requests.Request('GET', url, params=params).prepare().url), send)
+        result = send()
+        if result is not None:
+            request_memo.forget('api')
+        return result
     except Exception as e:
         app.logger.error(f"API request failed: {e}")
         return None
 
-def paginate_list(items, page=1, per_page=20):
-    """Simple pagination for lists"""
-    total = len(items)
+def paginate_list(items, page=1, per_page=20, total=None):
+    """Simple pagination for lists
+
+    Pass ``total`` when ``items`` is already just the requested page.
+    """
     start = (page - 1) * per_page
     end = start + per_page
+    if total is None:
+        total = len(items)
+        items = items[start:end]
     
     class Pagination:
         def __init__(self, items, page, per_page, total):
@@ -203,7 +197,46 @@ def paginate_list(items, page=1, per_page=20):
             self.prev_num = page - 1 if page > 1 else None
             self.next_num = page + 1 if end < total else None
     
-    return Pagination(items[start:end], page, per_page, total)
+    return Pagination(items, page, per_page, total)
+
+PER_PAGE = 20
+CURSOR_WINDOW = 5  # pages either side of the current one whose cursors stay in the session
+
+def fetch_list_page(name, fetch_page, page, per_page=PER_PAGE, **filters):
+    """Fetch just the page being rendered from a paginated API list
+    
+    ``fetch_page`` is a client ``get_*_page`` method. Page numbers map to API
+    cursors remembered in the session (per list and filter set), so prev/next
+    and numbered links cost one request; an unknown page walks forward from
+    the nearest known cursor. Only cursors within ``CURSOR_WINDOW`` pages of
+    the current one are kept, since the session lives in a ~4KB cookie.
+    """
+    filter_key = json.dumps(filters, sort_keys=True, default=str)
+    state = session.get('page_cursors', {}).get(name)
+    if not state or state.get('filters') != filter_key:
+        state = {'filters': filter_key, 'cursors': {}}
+    cursors = state['cursors']
+    offset = (page - 1) * per_page
+    
+    known = max([int(p) for p in cursors if int(p) <= page] + [1])
+    result = fetch_page(cursor=cursors.get(str(known)), limit=per_page, offset=offset, **filters)
+    while result.paged and known < page and result.next_cursor:
+        known += 1
+        cursors[str(known)] = result.next_cursor
+        result = fetch_page(cursor=result.next_cursor, limit=per_page, offset=offset, **filters)
+    if result.paged and known < page:
+        result = result._replace(items=[], next_cursor=None)  # past the last page
+    
+    if result.paged and result.next_cursor:
+        cursors[str(page + 1)] = result.next_cursor
+    state['cursors'] = {p: c for p, c in cursors.items() if abs(int(p) - page) <= CURSOR_WINDOW + 1}
+    session['page_cursors'] = {**session.get('page_cursors', {}), name: state}
+    
+    total = result.total
+    if total is None:
+        # Unknown total: enough to make has_next/total_pages right for this page
+        total = offset + len(result.items) + (1 if result.next_cursor else 0)
+    return paginate_list(result.items, page=page, per_page=per_page, total=total)
 
 # ==================== AUTH ROUTES ====================
 
@@ -215,10 +248,10 @@ def login():
         
         # Call API login endpoint
         try:
-            response = requests.post(
+            response = transport.request(
+                'POST',
                 f"{API_BASE_URL}/api/admin/login",
-                json={'email': email, 'password': password},
-                timeout=30
+                json={'email': email, 'password': password}
             )
             
             if response.status_code == 200:
@@ -289,47 +322,69 @@ def dashboard():
                          stats=stats,
                          recent_orders=recent_orders_data)
 
+@app.route('/api/dashboard-stats')
+@login_required
+def dashboard_stats_api():
+    """Dashboard counters, for the browser's periodic reconciliation of live deltas"""
+    dashboard_stats = api_client.get_dashboard_stats()
+    stats = {key: dashboard_stats[key] for key in DASHBOARD_COUNTERS if key in dashboard_stats}
+    return jsonify({**stats, 'success': bool(dashboard_stats)})
+
 # ==================== NOTIFICATION POLLING ====================
 
+# ==================== ORDER EVENT STREAM ====================
+# One upstream subscription per process, fanned out to every open tab
+
+SSE_UPSTREAM_READ_TIMEOUT = 90  # upstream heartbeats every 30s; silence longer than this is a dead stream
+
+def _open_order_stream(token):
+    return transport.request('GET', f"{API_BASE_URL}/api/admin/stream/orders", token=token,
+                             stream=True, timeout=(CONNECT_TIMEOUT, SSE_UPSTREAM_READ_TIMEOUT))
+
+def _fetch_order_for_index(order_id):
+    response = transport.request('GET', f"{API_BASE_URL}/api/admin/orders/{order_id}",
+                                 token=order_hub.current_token())
+    try:
+        return response.json().get('order') if response.status_code == 200 else None
+    finally:
+        response.close()
+
+order_hub = SSEHub(_open_order_stream)
+# Keep the orders index current from the same events, applied once per event
+order_hub.add_listener(lambda event_type, data: order_index.apply_event(event_type, data, fetch=_fetch_order_for_index))
+order_hub.add_state_listener(lambda connected: order_index.stream_opened() if connected else order_index.stream_closed())
+# Counter changes of each transition the index sees go out as stats_delta events
+order_index.add_delta_listener(lambda delta: order_hub.publish('stats_delta', json.dumps(delta)))
+
 @app.route('/api/stream-orders')
 @login_required
 def stream_orders():
-    """Server-Sent Events endpoint - proxies from API server"""
+    """Server-Sent Events endpoint - fans out the shared API order stream"""
     # Get token BEFORE generator (inside request context)
     token = session.get('user_data', {}).get('token')
     
     if not token:
         return jsonify({'error': 'No authentication token'}), 401
     
-    def generate():
-        try:
-            print(f"🔴 Dashboard SSE: Connecting to API with token: {token[:10]}...")
-            
-            # Connect to API SSE endpoint
-            headers = {'Authorization': f'Bearer {token}'}
-            response = requests.get(
-                f"{API_BASE_URL}/api/admin/stream/orders",
-                headers=headers,
-                stream=True,
-                timeout=None
-            )
-            
-            print(f"🔴 Dashboard SSE: Connected to API, status: {response.status_code}")
-            
-            # Stream events from API
-            for line in response.iter_lines():
-                if line:
-                    decoded = line.decode('utf-8')
-                    print(f"🔴 Dashboard SSE: Received: {decoded[:100]}")
-                    yield decoded + '\n'
-                else:
-                    yield '\n'
-                    
-        except Exception as e:
-            print(f"🔴 Dashboard SSE: Error: {e}")
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
-    
-    return Response(generate(), mimetype='text/event-stream')
+    # Resume after a reconnect: EventSource sends Last-Event-ID itself, our
+    # reconnect code passes it as ?lastEventId= when it opens a new EventSource
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('lastEventId'))
+    subscription = order_hub.subscribe(token, last_event_id)
+    response = Response(order_hub.stream(subscription), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/transport-stats')
+@login_required
+def transport_stats():
+    """Upstream connection pool reuse and revalidation metrics"""
+    return jsonify({**transport.stats(),
+                    'validator_cache': api_client.validator_cache.stats(),
+                    'policy_cache': api_client.policy_cache.stats(),
+                    'product_cache': api_client.product_cache.stats(),
+                    'order_index': order_index.stats(),
+                    'sse_hub': order_hub.stats()})
 
 # DEPRECATED: Polling replaced with real-time Firestore listeners
 # @app.route('/api/poll-orders')
@@ -371,32 +426,43 @@ def save_fcm_token():
 
 # ==================== ORDERS ====================
 
+ORDER_INDEX_PAGE_SIZE = 100  # orders per page when catching the index up
+
+def _order_index_loaders():
+    """(loader, since_loader) for a background index refresh, sent with the current admin's token"""
+    token = _current_token()
+
+    def load_all():
+        with api_client.using_token(token):
+            yield from api_client.iter_all_orders(fields=ORDER_LIST_FIELDS)
+
+    def load_since(since):
+        # Newest-first cursor pages, up to the first order older than ``since``
+        with api_client.using_token(token):
+            for page in api_client.iter_pages(api_client.get_orders_page, limit=ORDER_INDEX_PAGE_SIZE,
+                                              fields=ORDER_LIST_FIELDS):
+                if not page.paged:
+                    raise ValueError("Orders page request failed")
+                for order in page.items:
+                    if sort_timestamp(order) < since:
+                        return
+                    yield order
+
+    # Without cursor pagination a page is cut from the full list anyway
+    return load_all, load_since if api_client.supports('cursor_pagination') else None
+
 @app.route('/orders')
 @login_required
 def orders():
-    result = api_request('GET', '/api/admin/orders')
-    orders_list = result.get('orders', []) if result else []
-    
-    # Format timestamps for all orders
-    for order in orders_list:
-        if 'timestamp' in order and order['timestamp']:
-            try:
-                ts = order['timestamp']
-                if ts > 1e12:  # Milliseconds
-                    ts = ts / 1000
-                from datetime import datetime
-                order['createdAt'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                order['createdAt'] = 'N/A'
-        elif 'createdAt' not in order:
-            order['createdAt'] = 'N/A'
-    
-    # Sort by timestamp
-    orders_list = sorted(orders_list, key=lambda x: x.get('timestamp', 0), reverse=True)
-    
-    # Pagination
+    # Slice the in-memory index when it is current, else request just this page.
+    # Timestamps are formatted by the template filter for the rendered rows only.
     page = request.args.get('page', 1, type=int)
-    pagination = paginate_list(orders_list, page=page, per_page=20)
+    indexed = order_index.page((page - 1) * PER_PAGE, PER_PAGE) if order_index.is_fresh() else None
+    if indexed is not None:
+        pagination = paginate_list(indexed[0], page=page, per_page=PER_PAGE, total=indexed[1])
+    else:
+        order_index.refresh_async(*_order_index_loaders())
+        pagination = fetch_list_page('orders', functools.partial(api_client.get_orders_page, fields=ORDER_LIST_FIELDS), page)
     
     return render_template('orders.html', 
                          orders=pagination.items,
@@ -406,7 +472,12 @@ def orders():
 @app.route('/orders/<order_id>')
 @login_required
 def order_detail(order_id):
-    result = api_request('GET', f'/api/admin/orders/{order_id}')
+    # Fetch the order and the driver list concurrently
+    results = api_async.gather(
+        order=lambda: api_request('GET', f'/api/admin/orders/{order_id}'),
+        drivers=get_available_drivers
+    )
+    result = results['order']
     order = result.get('order') if result else None
     
     if not order:
@@ -414,32 +485,22 @@ def order_detail(order_id):
         return redirect(url_for('orders'))
     
     # Format timestamp to readable date
-    if 'timestamp' in order and order['timestamp']:
-        try:
-            # Handle milliseconds timestamp
-            ts = order['timestamp']
-            if ts > 1e12:  # Milliseconds
-                ts = ts / 1000
-            from datetime import datetime
-            order['createdAt'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            order['createdAt'] = 'N/A'
-    elif 'createdAt' not in order:
-        order['createdAt'] = 'N/A'
+    format_timestamps([order])
     
     return render_template('order_detail.html', 
                          order=order,
                          valid_statuses=VALID_ORDER_STATUSES,
-                         available_drivers=get_available_drivers())
+                         available_drivers=results['drivers'] or [])
 
 @app.route('/orders/<order_id>/update', methods=['POST'])
 @login_required
 def update_order_status(order_id):
     status = request.form.get('status')
     
-    result = api_request('PUT', f'/api/admin/orders/{order_id}', data={'status': status})
+    result = api_client.update_order_status(order_id, status)
     
     if result:
+        order_index.patch(order_id, {'status': status})
         flash('Order status updated successfully', 'success')
     else:
         flash('Failed to update order status', 'danger')
@@ -449,9 +510,10 @@ def update_order_status(order_id):
 @app.route('/orders/<order_id>/delete', methods=['POST'])
 @login_required
 def delete_order(order_id):
-    result = api_request('DELETE', f'/api/admin/orders/{order_id}')
+    result = api_client.delete_order(order_id)
     
     if result:
+        order_index.remove(order_id)
         flash('Order deleted successfully', 'success')
     else:
         flash('Failed to delete order', 'danger')
@@ -463,12 +525,9 @@ def delete_order(order_id):
 @app.route('/products')
 @login_required
 def products():
-    result = api_request('GET', '/api/products', params={'active': 'false', 'limit': 1000})
-    products_list = result.get('products', []) if result else []
-    
-    # Pagination
+    # One page per request (cached and revalidated by the client)
     page = request.args.get('page', 1, type=int)
-    pagination = paginate_list(products_list, page=page, per_page=20)
+    pagination = fetch_list_page('products', api_client.get_products_page, page, active_only=False)
     
     return render_template('products.html', 
                          products=pagination.items,
@@ -522,10 +581,8 @@ def edit_product(product_id):
         else:
             flash('Failed to update product', 'danger')
     
-    # Get product details
-    result = api_request('GET', '/api/products')
-    products_list = result.get('products', []) if result else []
-    product = next((p for p in products_list if p.get('id') == product_id), None)
+    # Get product details (single cached lookup, not the whole catalog)
+    product = api_client.get_product(product_id)
     
     if not product:
         flash('Product not found', 'danger')
@@ -538,7 +595,7 @@ def edit_product(product_id):
 @app.route('/products/<product_id>/delete', methods=['POST'])
 @login_required
 def delete_product(product_id):
-    result = api_request('DELETE', f'/api/products/{product_id}')
+    result = api_client.delete_product(product_id)
     
     if result:
         flash('Product deleted successfully', 'success')
@@ -552,14 +609,8 @@ def delete_product(product_id):
 @app.route('/users')
 @login_required
 def users():
-    result = api_request('GET', '/api/admin/users')
-    print(f"DEBUG: Users API result: {result}")
-    users_list = result.get('users', []) if result else []
-    print(f"DEBUG: Users list length: {len(users_list)}")
-    
-    # Pagination
     page = request.args.get('page', 1, type=int)
-    pagination = paginate_list(users_list, page=page, per_page=20)
+    pagination = fetch_list_page('users', functools.partial(api_client.get_users_page, fields=USER_LIST_FIELDS), page)
     
     return render_template('users.html', 
                          users=pagination.items,
@@ -745,7 +796,12 @@ def delete_driver(driver_id):
 @login_required
 @role_required(['admin', 'order_manager', 'viewer'])
 def driver_detail(driver_id):
-    driver = api_client.get_driver(driver_id)
+    # Driver profile and delivery history are independent - fetch concurrently
+    results = api_async.gather(
+        driver=functools.partial(api_client.get_driver, driver_id),
+        deliveries=functools.partial(api_client.get_orders_by_driver, driver_id)
+    )
+    driver = results['driver']
     if not driver:
         flash('Driver not found', 'danger')
         return redirect(url_for('drivers'))
@@ -753,7 +809,7 @@ def driver_detail(driver_id):
     # Get driver's delivery history via API
     deliveries = []
     try:
-        api_deliveries = api_client.get_orders_by_driver(driver_id)
+        api_deliveries = results['deliveries'] or []
         for order_data in api_deliveries:
             # Ensure order_data has an 'id' field, which the API should provide
             if 'id' not in order_data and 'orderId' in order_data:
@@ -783,16 +839,7 @@ def notifications():
         all_notifications = api_client.get_notifications()
         
         # Format timestamps for display if needed (assuming API returns raw timestamps)
-        for notif in all_notifications:
-            if 'timestamp' in notif and notif['timestamp']:
-                try:
-                    # Assuming timestamp is in milliseconds
-                    ts = notif['timestamp'] / 1000
-                    notif['createdAt'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    notif['createdAt'] = 'N/A'
-            elif 'createdAt' not in notif:
-                notif['createdAt'] = 'N/A'
+        format_timestamps(all_notifications)
 
         return render_template('notifications.html', notifications=all_notifications)
     except Exception as e:
@@ -831,16 +878,7 @@ def activity_logs():
         logs = api_client.get_activity_logs()
         
         # Format timestamps for display if needed (assuming API returns raw timestamps)
-        for log_entry in logs:
-            if 'timestamp' in log_entry and log_entry['timestamp']:
-                try:
-                    # Assuming timestamp is in milliseconds
-                    ts = log_entry['timestamp'] / 1000
-                    log_entry['createdAt'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    log_entry['createdAt'] = 'N/A'
-            elif 'createdAt' not in log_entry:
-                log_entry['createdAt'] = 'N/A'
+        format_timestamps(logs)
 
         return render_template('activity_logs.html', logs=logs)
     except Exception as e:
@@ -892,41 +930,11 @@ def user_detail(user_id):
     user = result['user']
     orders = result.get('orders', [])
     
-    # Format createdAt timestamp
-    if 'createdAt' in user and user['createdAt']:
-        try:
-            ts = user['createdAt']
-            if ts > 1e12:  # Milliseconds
-                ts = ts / 1000
-            user['createdAt'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            user['createdAt'] = 'N/A'
-    else:
-        user['createdAt'] = 'N/A'
-    
-    # Format lastLogin timestamp
-    if 'lastLogin' in user and user['lastLogin']:
-        try:
-            # Handle Firestore Timestamp object
-            if isinstance(user['lastLogin'], dict) and '_seconds' in user['lastLogin']:
-                ts = user['lastLogin']['_seconds']
-            else:
-                ts = user['lastLogin']
-            if ts > 1e12:
-                ts = ts / 1000
-            user['lastLogin'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            pass
-    
-    # Format lastSignIn timestamp
-    if 'lastSignIn' in user and user['lastSignIn']:
-        try:
-            ts = user['lastSignIn']
-            if ts > 1e12:
-                ts = ts / 1000
-            user['lastSignIn'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            pass
+    # Format timestamps (lastLogin/lastSignIn are left as-is if unparseable)
+    user['createdAt'] = format_timestamp(user.get('createdAt'))
+    for field in ('lastLogin', 'lastSignIn'):
+        if user.get(field):
+            user[field] = format_timestamp(user[field], default=user[field])
     
     # Ensure phone is available
     if 'phone' not in user or not user['phone']:
@@ -938,13 +946,13 @@ def user_detail(user_id):
 @login_required
 def export_orders():
     try:
-        csv_data = api_client.export_orders()
-        if csv_data:
+        # Stream the CSV straight through; read the first chunk so API errors still redirect
+        chunks = api_client.iter_export_orders()
+        first_chunk = next(chunks, None)
+        if first_chunk:
             log_activity('EXPORT_ORDERS', 'Exported orders CSV')
-            from flask import make_response
-            output = make_response(csv_data)
+            output = Response(stream_with_context(itertools.chain([first_chunk], chunks)), mimetype='text/csv')
             output.headers["Content-Disposition"] = "attachment; filename=orders.csv"
-            output.headers["Content-type"] = "text/csv"
             return output
         else:
             flash('Failed to export orders via API', 'danger')
@@ -983,8 +991,12 @@ def filter_orders():
     min_amount = request.args.get('min_amount', type=float)
     max_amount = request.args.get('max_amount', type=float)
     
+    page = request.args.get('page', 1, type=int)
+    
     try:
-        orders_list = api_client.get_all_orders(
+        # Only the rendered page is requested (or kept, when the list is streamed in full)
+        pagination = fetch_list_page(
+            'filtered_orders', functools.partial(api_client.get_orders_page, stream=True, fields=ORDER_LIST_FIELDS), page,
             status=status,
             date_from=date_from,
             date_to=date_to,
@@ -992,24 +1004,7 @@ def filter_orders():
             max_amount=max_amount
         )
         
-        # Format timestamps for all orders
-        for order in orders_list:
-            if 'timestamp' in order and order['timestamp']:
-                try:
-                    ts = order['timestamp']
-                    if ts > 1e12:  # Milliseconds
-                        ts = ts / 1000
-                    from datetime import datetime
-                    order['createdAt'] = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    order['createdAt'] = 'N/A'
-            elif 'createdAt' not in order:
-                order['createdAt'] = 'N/A'
-        
-        # Pagination (client-side for filtered results, or API should handle)
-        page = request.args.get('page', 1, type=int)
-        pagination = paginate_list(orders_list, page=page, per_page=20)
-
+        # Timestamps are formatted by the template filter
         return render_template('orders.html', orders=pagination.items, pagination=pagination, valid_statuses=VALID_ORDER_STATUSES)
     except Exception as e:
         app.logger.exception("Error filtering orders via API")
@@ -1030,15 +1025,19 @@ def bulk_update_status():
         flash('Invalid status', 'danger')
         return redirect(url_for('orders'))
     
-    # Update each order
-    updated = 0
-    for order_id in order_ids:
-        result = api_request('PUT', f'/api/admin/orders/{order_id}', 
-                           data={'status': new_status})
-        if result:
-            updated += 1
+    # Concurrent per-order updates (or one batch call if the API supports it)
+    results = api_client.bulk_update_order_status(order_ids, new_status)
+    updated = sum(1 for r in results.values() if r['success'])
+    failed = len(results) - updated
+    for order_id, r in results.items():
+        if r['success']:
+            order_index.patch(order_id, {'status': new_status})
     
     flash(f'Updated {updated} order(s) to {new_status}', 'success')
+    if failed:
+        app.logger.warning(f"Bulk status update: {failed} order(s) failed: "
+                           f"{[oid for oid, r in results.items() if not r['success']]}")
+        flash(f'Failed to update {failed} order(s)', 'danger')
     return redirect(url_for('orders'))
 
 @app.route('/bulk/delete-products', methods=['POST'])
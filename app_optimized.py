@@ -6,20 +6,19 @@ Key improvements:
 3. Implemented caching
 4. Uses aggregation queries for counting
 """
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash
 import firebase_admin
 from firebase_admin import credentials, firestore, messaging
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
 import os
-import json
 import time
 import logging
 from logging.handlers import RotatingFileHandler
 from extensions import login_manager, firestore_extension
-from utils import User, admin_required, send_notification, VALID_ORDER_STATUSES
+from utils import User, send_notification, VALID_ORDER_STATUSES
+from formatting import format_timestamp
 from blueprints.auth import auth_bp
 
 app = Flask(__name__)
@@ -40,15 +39,8 @@ if not firebase_admin._apps:
 
 firestore_extension.init_app(app)
 
-@app.template_filter('timestamp_to_date')
-def timestamp_to_date(timestamp):
-    try:
-        if timestamp:
-            ts = timestamp / 1000 if timestamp > 1e12 else timestamp
-            return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-    except:
-        pass
-    return 'N/A'
+# Convert timestamp to readable date (shared, cached formatter)
+app.add_template_filter(format_timestamp, 'timestamp_to_date')
 
 login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
@@ -61,6 +53,8 @@ from blueprints.orders import orders_bp
 app.register_blueprint(orders_bp)
 from blueprints.products import products_bp
 app.register_blueprint(products_bp)
+from blueprints.revenue import revenue_bp
+app.register_blueprint(revenue_bp)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -107,107 +101,9 @@ def save_fcm_token():
         app.logger.error(f"Save FCM token error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
-# ============= SSE FOR REAL-TIME ORDERS =============
-
-@app.route('/api/stream-orders')
-@login_required
-def stream_orders():
-    import queue
-    
-    app.logger.info(f"SSE: New connection from user {current_user.id}")
-    
-    message_queue = queue.Queue(maxsize=100)
-    first_snapshot = True
-    
-    def on_snapshot(col_snapshot, changes, read_time):
-        nonlocal first_snapshot
-        
-        app.logger.info(f"SSE: Snapshot received with {len(changes)} changes, first={first_snapshot}")
-        
-        if first_snapshot:
-            first_snapshot = False
-            app.logger.info("SSE: Skipping initial snapshot")
-            return
-        
-        for change in changes:
-            app.logger.info(f"SSE: Change type={change.type.name}, doc={change.document.id}")
-            if change.type.name in ['ADDED', 'MODIFIED']:
-                doc = change.document
-                data = doc.to_dict()
-                event_data = {
-                    'id': doc.id,
-                    'orderId': data.get('orderId', doc.id),
-                    'totalAmount': data.get('totalAmount', 0),
-                    'status': data.get('status', 'PENDING'),
-                    'timestamp': data.get('timestamp', 0),
-                    'customerName': data.get('customerName', 'Unknown'),
-                    'type': 'new_order' if change.type.name == 'ADDED' else 'order_update'
-                }
-                try:
-                    message_queue.put_nowait(event_data)
-                    app.logger.info(f"SSE: Queued event for order {event_data['orderId']}")
-                except queue.Full:
-                    app.logger.warning("SSE: Queue full, dropping event")
-    
-    app.logger.info("SSE: Starting Firestore listener")
-    col_query = firestore_extension.db.collection('orders').order_by('timestamp', direction=firestore.Query.DESCENDING).limit(50)
-    doc_watch = col_query.on_snapshot(on_snapshot)
-    
-    def generate():
-        try:
-            app.logger.info("SSE: Sending connected message")
-            yield f"data: {json.dumps({'type': 'connected'})}\n\n"
-            
-            timeout_count = 0
-            max_timeouts = 120
-            
-            while timeout_count < max_timeouts:
-                try:
-                    event_data = message_queue.get(timeout=30)
-                    event_type = event_data.pop('type', 'message')
-                    app.logger.info(f"SSE: Sending {event_type} event")
-                    yield f"event: {event_type}\ndata: {json.dumps(event_data)}\n\n"
-                    timeout_count = 0
-                except queue.Empty:
-                    yield f": heartbeat\n\n"
-                    timeout_count += 1
-        except GeneratorExit:
-            app.logger.info("SSE: Client disconnected")
-        finally:
-            app.logger.info("SSE: Unsubscribing from Firestore")
-            doc_watch.unsubscribe()
-    
-    response = Response(generate(), mimetype='text/event-stream')
-    response.headers['Cache-Control'] = 'no-cache'
-    response.headers['X-Accel-Buffering'] = 'no'
-    return response
-
-@app.route('/api/dashboard-stats')
-@login_required
-def dashboard_stats():
-    """API endpoint for dashboard stats (cached)"""
-    try:
-        # Use aggregation queries
-        db = firestore_extension.db
-        
-        # Note: count() requires firebase-admin >= 6.0.0
-        # If not available, fall back to limited queries
-        try:
-            total_orders = db.collection('orders').count().get()[0][0].value
-            pending_orders = db.collection('orders').where('status', '==', 'PENDING').count().get()[0][0].value
-        except:
-            # Fallback: limit queries
-            total_orders = sum(1 for _ in db.collection('orders').limit(1000).stream())
-            pending_orders = sum(1 for _ in db.collection('orders').where('status', '==', 'PENDING').limit(100).stream())
-        
-        return jsonify({
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'success': True
-        })
-    except Exception as e:
-        app.logger.error(f"Dashboard stats error: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+# Order change feed, live streams and dashboard counters: order_feed.py
+# (routes in blueprints/orders.py and blueprints/dashboard.py)
+from order_feed import start_stats_writer
 
 # ============= USERS (OPTIMIZED WITH PAGINATION) =============
 
@@ -427,79 +323,7 @@ def update_stock(product_id):
 
 # ============= ANALYTICS & REPORTS (OPTIMIZED) =============
 
-@app.route('/revenue')
-@login_required
-def revenue():
-    try:
-        # Limit queries to recent data
-        thirty_days_ago = int((datetime.now() - timedelta(days=30)).timestamp() * 1000)
-        
-        all_orders = [d for d in firestore_extension.db.collection('orders').where('timestamp', '>=', thirty_days_ago).limit(500).stream()]
-        orders_data = [{'id': d.id, **d.to_dict()} for d in all_orders]
-
-        delivered_orders = [o for o in orders_data if o.get('status') == 'DELIVERED']
-        pending_orders = [o for o in orders_data if o.get('status') == 'PENDING']
-        
-        total_revenue = sum(o.get('totalAmount', 0) for o in delivered_orders)
-        completed_revenue = total_revenue
-        pending_revenue = sum(o.get('totalAmount', 0) for o in pending_orders)
-        delivered_count = len(delivered_orders)
-        avg_order_value = total_revenue / delivered_count if delivered_count > 0 else 0
-
-        daily_revenue = defaultdict(float)
-        today = datetime.now()
-        for i in range(30):
-            date = today - timedelta(days=i)
-            daily_revenue[date.strftime('%Y-%m-%d')] = 0.0
-
-        for order in delivered_orders:
-            if order.get('timestamp'):
-                ts = order['timestamp'] / 1000 if order['timestamp'] > 1e12 else order['timestamp']
-                order_date = datetime.fromtimestamp(ts)
-                date_str = order_date.strftime('%Y-%m-%d')
-                if date_str in daily_revenue:
-                    daily_revenue[date_str] += order.get('totalAmount', 0)
-        
-        sorted_daily_revenue = dict(sorted(daily_revenue.items()))
-
-        revenue_by_status = defaultdict(float)
-        for order in orders_data:
-            status = order.get('status', 'UNKNOWN')
-            revenue_by_status[status] += order.get('totalAmount', 0)
-        
-        product_revenue = defaultdict(float)
-        for order in delivered_orders:
-            for item in order.get('items', []):
-                product_name = item.get('name', 'Unknown Product')
-                product_revenue[product_name] += item.get('price', 0) * item.get('quantity', 1)
-        
-        top_products = sorted(product_revenue.items(), key=lambda item: item[1], reverse=True)[:5]
-
-        data = {
-            'total_revenue': total_revenue,
-            'completed_revenue': completed_revenue,
-            'pending_revenue': pending_revenue,
-            'avg_order_value': avg_order_value,
-            'delivered_count': delivered_count,
-            'daily_revenue': sorted_daily_revenue,
-            'revenue_by_status': dict(revenue_by_status),
-            'top_products': top_products
-        }
-        
-        return render_template('revenue.html', data=data, orders=orders_data)
-    except Exception as e:
-        app.logger.error(f"Revenue error: {e}")
-        return render_template('revenue.html', 
-                               data={
-                                   'total_revenue': 0, 
-                                   'completed_revenue': 0, 
-                                   'pending_revenue': 0, 
-                                   'avg_order_value': 0,
-                                   'daily_revenue': {},
-                                   'revenue_by_status': {},
-                                   'top_products': []
-                               }, 
-                               orders=[])
+# Revenue pages: blueprints/revenue.py (daily rollups, see revenue_rollups.py)
 
 @app.route('/analytics')
 @login_required
@@ -624,4 +448,7 @@ def send_bulk_notification():
     return redirect(url_for('notifications'))
 
 if __name__ == '__main__':
+    # The reloader's child serves requests (under gunicorn: post_worker_init)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_stats_writer()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,92 @@
+"""
+Async API Client for FRIZZLY Admin Dashboard
+Mirrors FrizzlyAPIClient as coroutines so independent upstream calls
+made by one page can run concurrently instead of one after another
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Union
+
+from api_client import FrizzlyAPIClient
+from http_transport import POOL_MAXSIZE
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFrizzlyAPIClient:
+    """Coroutine mirror of every public FrizzlyAPIClient method
+
+    Calls run on a small thread pool over the shared keep-alive transport, so
+    they reuse the same connections, token provider and error handling as the
+    sync client. The caller's context (Flask request, current_user) is copied
+    into each call.
+    """
+
+    def __init__(self, client: FrizzlyAPIClient, max_workers: int = POOL_MAXSIZE):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='api-fanout')
+
+    async def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run any blocking callable on the fan-out pool with the caller's context"""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self.call(attr, *args, **kwargs)
+        return method
+
+    def gather(self, **calls: Union[Awaitable, Callable[[], Any]]) -> Dict[str, Any]:
+        """Run named calls concurrently from sync code and return their results
+
+        Values may be zero-argument callables, which are run on the fan-out
+        pool, or coroutines (e.g. ``api_async.get_order(order_id)``). Page
+        latency becomes the slowest call instead of the sum of all calls.
+        Callables need no event loop, so only they are safe under gevent
+        workers (asyncio.run cannot nest across greenlets on one OS thread).
+        """
+        if any(asyncio.iscoroutine(c) for c in calls.values()):
+            async def _run():
+                names = list(calls)
+                aws = [c if asyncio.iscoroutine(c) else self.call(c) for c in calls.values()]
+                results = await asyncio.gather(*aws, return_exceptions=True)
+                return dict(zip(names, results))
+
+            results = asyncio.run(_run())
+        else:
+            results = self._gather_in_pool(calls)
+        for name, result in results.items():
+            if isinstance(result, Exception):
+                logger.error(f"Concurrent API call '{name}' failed: {result}")
+                results[name] = None
+        return results
+
+    def _gather_in_pool(self, calls: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """Run callables on the fan-out pool without an event loop; failures are returned, not raised
+
+        Under gevent workers all greenlets share one OS thread, so a second
+        page calling asyncio.run while another is awaiting its calls fails
+        with "asyncio.run() cannot be called from a running event loop".
+        Waiting on plain futures only blocks the calling greenlet.
+        """
+        futures = {name: self._executor.submit(contextvars.copy_context().run, fn)
+                   for name, fn in calls.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = e
+        return results
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
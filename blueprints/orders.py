@@ -4,9 +4,12 @@ import csv
 from io import StringIO
 from firebase_admin import firestore # Added firestore import
 from extensions import firestore_extension
+import request_memo
 from utils import admin_required, send_notification, VALID_ORDER_STATUSES
 from cache import cache
 from sync_service import sync_service
+from sse_hub import parse_last_event_id
+from order_feed import order_hub
 
 orders_bp = Blueprint('orders', __name__)
 
@@ -29,7 +32,7 @@ def orders():
         
         # Cursor-based pagination (efficient)
         if last_doc_id:
-            last_doc = firestore_extension.db.collection('orders').document(last_doc_id).get()
+            last_doc = firestore_extension.get_doc('orders', last_doc_id)
             if last_doc.exists:
                 orders_ref = orders_ref.start_after(last_doc)
         
@@ -59,7 +62,7 @@ def orders():
 @admin_required
 def order_detail(order_id):
     try:
-        doc = firestore_extension.db.collection('orders').document(order_id).get()
+        doc = firestore_extension.get_doc('orders', order_id)
         if not doc.exists:
             flash('Order not found', 'error')
             return redirect(url_for('orders.orders')) # Updated to blueprint
@@ -89,7 +92,7 @@ def update_order_status(order_id):
         user_id = request.form.get('user_id')  # Pass userId from form to avoid extra read
         
         # Update order status
-        firestore_extension.db.collection('orders').document(order_id).update({
+        firestore_extension.update_doc('orders', order_id, {
             'status': new_status,
             'updatedAt': firestore.SERVER_TIMESTAMP
         })
@@ -139,7 +142,7 @@ def export_orders():
 def assign_driver(order_id):
     try:
         driver_id = request.form.get('driver_id')
-        firestore_extension.db.collection('orders').document(order_id).update({
+        firestore_extension.update_doc('orders', order_id, {
             'driverId': driver_id,
             'updatedAt': firestore.SERVER_TIMESTAMP
         })
@@ -171,6 +174,7 @@ def bulk_update_status():
                 'updatedAt': firestore.SERVER_TIMESTAMP
             })
         batch.commit()
+        request_memo.forget('firestore', 'orders')  # batched writes bypass update_doc
         
         # Send notifications using passed user_ids (no extra reads)
         for i, order_id in enumerate(order_ids):
@@ -198,3 +202,16 @@ def sync_orders_api():
     except Exception as e:
         current_app.logger.error(f"Sync error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
+
+@orders_bp.route('/api/stream-orders')
+@login_required
+def stream_orders():
+    """Server-Sent Events for real-time order updates"""
+    current_app.logger.info(f"SSE: New connection from user {current_user.id}")
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('lastEventId'))
+    subscription = order_hub.subscribe(current_user.id, last_event_id)
+    
+    response = Response(order_hub.stream(subscription), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
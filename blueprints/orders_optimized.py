@@ -98,13 +98,15 @@ def update_order_status(order_id):
     try:
         new_status = request.form.get('status')
         
-        firestore_extension.db.collection('orders').document(order_id).update({
+        # Read once up front: userId doesn't change with the status update
+        order_doc = firestore_extension.get_doc('orders', order_id)
+        
+        firestore_extension.update_doc('orders', order_id, {
             'status': new_status,
             'updatedAt': firestore.SERVER_TIMESTAMP
         })
         
         # Send notification to user
-        order_doc = firestore_extension.db.collection('orders').document(order_id).get()
         if order_doc.exists:
             user_id = order_doc.to_dict().get('userId')
             if user_id:
@@ -175,10 +177,10 @@ def bulk_update_status():
             return redirect(url_for('orders.orders'))
         
         for order_id in order_ids:
-            firestore_extension.db.collection('orders').document(order_id).update({'status': new_status})
+            order_doc = firestore_extension.get_doc('orders', order_id)
+            firestore_extension.update_doc('orders', order_id, {'status': new_status})
             
             # Send notification to user
-            order_doc = firestore_extension.db.collection('orders').document(order_id).get()
             if order_doc.exists:
                 user_id = order_doc.to_dict().get('userId')
                 if user_id:
@@ -0,0 +1,97 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
+from flask_login import login_required
+from collections import defaultdict
+from datetime import datetime, timedelta
+from extensions import firestore_extension
+from utils import admin_required
+from cache import cache
+from revenue_rollups import REVENUE_MAX_RANGE_DAYS, parse_day, revenue_rollups
+
+revenue_bp = Blueprint('revenue', __name__)
+
+def _revenue_range(args):
+    """Requested start/end days (YYYY-MM-DD), the last 30 days by default"""
+    end = parse_day(args.get('end')) or datetime.now().date()
+    start = parse_day(args.get('start')) or end - timedelta(days=29)
+    if start > end:
+        start, end = end, start
+    return start, end
+
+@revenue_bp.route('/revenue')
+@login_required
+def revenue():
+    start, end = _revenue_range(request.args)
+    start = max(start, end - timedelta(days=REVENUE_MAX_RANGE_DAYS - 1))
+    try:
+        # Check cache first (5 minute TTL; the rollups themselves are live)
+        cache_key = f'revenue_data:{start}:{end}'
+        cached_revenue = cache.get(cache_key)
+        if cached_revenue:
+            return render_template('revenue.html', data=cached_revenue, orders=[])
+        
+        # Exact totals and daily series from the daily rollups (one read per day)
+        data = revenue_rollups.query(start, end)
+        
+        # Top products need order items: up to 500 orders of the range
+        start_ms = int(datetime.combine(start, datetime.min.time()).timestamp() * 1000)
+        end_ms = int(datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp() * 1000)
+        range_orders = firestore_extension.db.collection('orders').where('timestamp', '>=', start_ms).where('timestamp', '<', end_ms).limit(500).stream()
+        orders_data = [{'id': d.id, **d.to_dict()} for d in range_orders]
+        
+        product_revenue = defaultdict(float)
+        for order in orders_data:
+            if order.get('status') != 'DELIVERED':
+                continue
+            for item in order.get('items', []):
+                product_name = item.get('name', 'Unknown Product')
+                product_revenue[product_name] += item.get('price', 0) * item.get('quantity', 1)
+        
+        data['top_products'] = sorted(product_revenue.items(), key=lambda item: item[1], reverse=True)[:5]
+        
+        cache.set(cache_key, data, ttl_seconds=300)
+        
+        return render_template('revenue.html', data=data, orders=orders_data)
+    except Exception as e:
+        current_app.logger.error(f"Revenue error: {e}")
+        return render_template('revenue.html', 
+                               data={
+                                   'start': start.strftime('%Y-%m-%d'),
+                                   'end': end.strftime('%Y-%m-%d'),
+                                   'total_revenue': 0, 
+                                   'completed_revenue': 0, 
+                                   'pending_revenue': 0, 
+                                   'avg_order_value': 0,
+                                   'daily_revenue': {},
+                                   'revenue_by_status': {},
+                                   'top_products': []
+                               }, 
+                               orders=[])
+
+@revenue_bp.route('/api/revenue')
+@login_required
+def revenue_api():
+    """Revenue summary of ?start=&end= from the daily rollups"""
+    start, end = _revenue_range(request.args)
+    try:
+        return jsonify({**revenue_rollups.query(start, end), 'success': True})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Revenue API error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@revenue_bp.route('/revenue/rebuild', methods=['POST'])
+@admin_required
+def rebuild_revenue():
+    """Backfill or repair the daily revenue rollups of a date range from the orders"""
+    start, end = _revenue_range(request.form)
+    # Rebuilt synchronously: keep the range to what /revenue shows
+    start = max(start, end - timedelta(days=REVENUE_MAX_RANGE_DAYS - 1))
+    try:
+        orders_read = revenue_rollups.rebuild(start, end)
+        cache.invalidate_pattern('revenue_data')
+        flash(f'Revenue rebuilt for {start} to {end} ({orders_read} orders)', 'success')
+    except Exception as e:
+        current_app.logger.error(f"Revenue rebuild error: {e}")
+        flash('Failed to rebuild revenue', 'error')
+    return redirect(url_for('revenue.revenue', start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d')))
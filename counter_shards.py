@@ -0,0 +1,249 @@
+"""
+Sharded order counter documents in Firestore
+Per-status order counts and delivered revenue, spread over N shard documents
+(stats/orders/shards/{n}) so concurrent increments rarely hit the same one.
+One background writer, elected through a lease (event bus or Firestore
+document), runs the order feed that turns every order change into
+increments; every instance reads the same totals with a single get_all of
+the shards
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from firebase_admin import firestore
+from extensions import firestore_extension
+from event_bus import BusSubscription, LeaderElection
+from order_stats import DASHBOARD_COUNTERS, REVENUE_STATUS, status_counter
+from utils import VALID_ORDER_STATUSES
+
+logger = logging.getLogger(__name__)
+
+COUNTER_SHARDS = int(os.environ.get('COUNTER_SHARDS', 10))              # shard documents (0 = no sharded counters)
+COUNTER_SHARDS_PATH = os.environ.get('COUNTER_SHARDS_PATH', 'stats/orders')
+COUNTER_RECONCILE_INTERVAL = float(os.environ.get('COUNTER_RECONCILE_INTERVAL', 900))  # seconds between aggregation checks
+COUNTER_LEASE_TTL = float(os.environ.get('COUNTER_LEASE_TTL', 30))     # seconds a Firestore writer lease lasts without renewal
+LEASES_COLLECTION = 'leases'
+
+
+def aggregate_order_counts() -> Dict[str, Any]:
+    """Order counters and per-status counts from Firestore aggregation queries"""
+    orders = firestore_extension.db.collection('orders')
+
+    def count(query):
+        return query.count().get()[0][0].value
+
+    by_status = {status: count(orders.where('status', '==', status)) for status in VALID_ORDER_STATUSES}
+    counts = dict.fromkeys(DASHBOARD_COUNTERS, 0)
+    for status, value in by_status.items():
+        counter = status_counter(status)
+        if counter:
+            counts[counter] += value
+    revenue = orders.where('status', '==', REVENUE_STATUS).sum('totalAmount').get()[0][0].value
+    counts.update({
+        'total_orders': count(orders),
+        'total_revenue': round(revenue or 0, 2),
+        'by_status': {status: value for status, value in by_status.items() if value},
+    })
+    return counts
+
+
+class ShardedCounter:
+    """Counter fields summed over ``shards`` documents under ``path``/shards
+
+    Shards hold the DASHBOARD_COUNTERS fields and a ``by_status`` map.
+    ``increment`` adds one stats delta (order_stats.stats_delta) to a random
+    shard, optionally inside a transaction; ``read`` sums all of them.
+    """
+
+    def __init__(self, path: str = COUNTER_SHARDS_PATH, shards: int = COUNTER_SHARDS):
+        self.path = path
+        self.shards = shards
+        self.increments = 0
+
+    def _refs(self):
+        db = firestore_extension.db
+        return [db.document(f'{self.path}/shards/{n}') for n in range(self.shards)]
+
+    def increment(self, delta: Dict[str, Any], shard: Optional[int] = None, transaction: Any = None):
+        if not self.shards:
+            return
+        fields = {key: firestore.Increment(value) for key, value in delta.items()
+                  if key in DASHBOARD_COUNTERS and value}
+        by_status = {status: firestore.Increment(value) for status, value in delta.get('by_status', {}).items() if value}
+        if by_status:
+            fields['by_status'] = by_status
+        if not fields:
+            return
+        if shard is None:
+            shard = random.randrange(self.shards)
+        ref = self._refs()[shard]
+        if transaction is not None:
+            transaction.set(ref, fields, merge=True)
+        else:
+            ref.set(fields, merge=True)
+        self.increments += 1
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Totals over all shards (one get_all); None until a shard exists"""
+        if not self.shards:
+            return None
+        totals = dict.fromkeys(DASHBOARD_COUNTERS, 0)
+        totals['by_status'] = {}
+        found = False
+        for snapshot in firestore_extension.db.get_all(self._refs()):
+            if not snapshot.exists:
+                continue
+            found = True
+            data = snapshot.to_dict()
+            for key in DASHBOARD_COUNTERS:
+                totals[key] += data.get(key) or 0
+            for status, value in (data.get('by_status') or {}).items():
+                totals['by_status'][status] = totals['by_status'].get(status, 0) + value
+        if not found:
+            return None
+        totals['total_revenue'] = round(totals['total_revenue'], 2)
+        return totals
+
+    def reconcile(self, counts: Dict[str, Any]) -> Dict[str, Any]:
+        """Bring the totals to ``counts`` by writing the difference to shard 0"""
+        current = self.read() or {}
+        drift = {}
+        for key in DASHBOARD_COUNTERS:
+            if key in counts:
+                diff = round(counts[key] - (current.get(key) or 0), 2)
+                if diff:
+                    drift[key] = diff
+        if 'by_status' in counts:
+            current_by_status = current.get('by_status', {})
+            by_status = {status: counts['by_status'].get(status, 0) - current_by_status.get(status, 0)
+                         for status in set(counts['by_status']) | set(current_by_status)}
+            by_status = {status: value for status, value in by_status.items() if value}
+            if by_status:
+                drift['by_status'] = by_status
+        if drift:
+            # Increments that land between the read and this write are kept
+            self.increment(drift, shard=0)
+        return drift
+
+    def stats(self) -> Dict[str, Any]:
+        return {'path': self.path, 'shards': self.shards, 'increments': self.increments}
+
+
+class FirestoreLeases:
+    """Leader leases stored as Firestore documents (leases/{name})
+
+    Same ``acquire_leadership`` / ``release_leadership`` shape as the event
+    buses, for deployments without one. A transaction takes the lease when
+    it is free, expired or already ours, so exactly one instance holds it.
+    Expiry uses the instances' clocks; keep their skew well under the ttl.
+    """
+
+    def __init__(self, collection: str = LEASES_COLLECTION):
+        self.collection = collection
+        self.identity = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    def _ref(self, name: str):
+        return firestore_extension.db.collection(self.collection).document(name)
+
+    def acquire_leadership(self, name: str, ttl: float) -> bool:
+        ref = self._ref(name)
+
+        @firestore.transactional
+        def claim(transaction):
+            snapshot = ref.get(transaction=transaction)
+            lease = snapshot.to_dict() if snapshot.exists else {}
+            now = time.time()
+            if lease.get('holder') not in (None, self.identity) and lease.get('expires', 0) > now:
+                return False
+            transaction.set(ref, {'holder': self.identity, 'expires': now + ttl})
+            return True
+
+        return claim(firestore_extension.db.transaction())
+
+    def release_leadership(self, name: str):
+        ref = self._ref(name)
+
+        @firestore.transactional
+        def release(transaction):
+            snapshot = ref.get(transaction=transaction)
+            if snapshot.exists and snapshot.to_dict().get('holder') == self.identity:
+                transaction.delete(ref)
+
+        release(firestore_extension.db.transaction())
+
+
+class ShardWriter:
+    """Keeps a ShardedCounter current from the order feed
+
+    ``start_feed()`` starts the listener that increments the shards, e.g.
+    RevenueRollups.follow, which applies each order change to the shards in
+    the same transaction as its ledger entry, so every order counts once
+    however old it is. The totals are checked against ``load_counts`` when
+    the writer starts and every ``reconcile_interval`` seconds, which covers
+    changes the feed cannot see; ``repair`` (e.g. the revenue rollup repair)
+    runs on the same schedule. Only one process may write: run it with ``elect``.
+    """
+
+    def __init__(self, counter: ShardedCounter, start_feed: Callable[[], Any],
+                 load_counts: Callable[[], Dict[str, Any]] = aggregate_order_counts,
+                 reconcile_interval: float = COUNTER_RECONCILE_INTERVAL,
+                 repair: Optional[Callable[[], Any]] = None):
+        self.counter = counter
+        self.start_feed = start_feed
+        self.load_counts = load_counts
+        self.reconcile_interval = reconcile_interval
+        self.repair = repair
+        self.running = False
+        self._election = None
+        self.reconciles = 0
+        self.last_drift = {}
+
+    def _reconcile_loop(self, stop: threading.Event):
+        while not stop.is_set():
+            if self.counter.shards:
+                try:
+                    self.last_drift = self.counter.reconcile(self.load_counts())
+                    self.reconciles += 1
+                    if self.last_drift:
+                        logger.warning(f"Counter shards: corrected drift {self.last_drift}")
+                except Exception as e:
+                    logger.warning(f"Counter shards: reconciliation failed: {e}")
+            if self.repair:
+                try:
+                    self.repair()
+                except Exception as e:
+                    logger.warning(f"Counter shards: repair failed: {e}")
+            stop.wait(self.reconcile_interval)
+
+    def start(self) -> BusSubscription:
+        stop = threading.Event()
+        feed = self.start_feed()
+        threading.Thread(target=self._reconcile_loop, args=(stop,), name='counter-shards',
+                         daemon=True).start()
+        self.running = True
+        logger.info(f"Counter shards: writing {self.counter.path} ({self.counter.shards} shards)")
+
+        def close():
+            stop.set()
+            self.running = False
+            feed.unsubscribe()
+        return BusSubscription(close)
+
+    def elect(self, leases: Any, ttl: float = COUNTER_LEASE_TTL) -> BusSubscription:
+        """Write only while holding the writer lease of ``leases`` (an event bus or FirestoreLeases)"""
+        self._election = LeaderElection(leases, 'frizzly_counter_shards', self.start, ttl)
+        return self._election.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counter.stats(), 'running': self.running,
+                'leading': bool(self._election and self._election.leading), 'reconciles': self.reconciles, 'last_drift': self.last_drift}
+
+
+# Global instance
+order_shards = ShardedCounter()
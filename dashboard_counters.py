@@ -0,0 +1,167 @@
+"""
+In-process dashboard counters
+Seeded once from the order counter shards (counter_shards.py) and catalog
+aggregations, then kept current by the stats_delta events of the order
+change feed, so a dashboard read is a dict copy. A periodic drift check
+reloads them and corrects what this process's feed cannot see (orders
+changed outside the listener's window, products, users).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from extensions import firestore_extension
+from counter_shards import aggregate_order_counts, order_shards
+from order_stats import DASHBOARD_COUNTERS
+
+logger = logging.getLogger(__name__)
+
+COUNTER_DRIFT_INTERVAL = float(os.environ.get('COUNTER_DRIFT_INTERVAL', 300))  # seconds between aggregation checks
+LOW_STOCK_THRESHOLD = 10
+
+
+def load_firestore_counts() -> Dict[str, Any]:
+    """All dashboard counters: orders from the counter shards, catalog from aggregations"""
+    db = firestore_extension.db
+    products = db.collection('products')
+
+    def count(query):
+        return query.count().get()[0][0].value
+
+    # Aggregations only until the shard writer has seeded the shards
+    orders = order_shards.read() or aggregate_order_counts()
+    counts = {key: orders[key] for key in DASHBOARD_COUNTERS}
+    counts.update({
+        'total_products': count(products),
+        'total_users': count(db.collection('users')),
+        'low_stock_products': count(products.where('stock', '<', LOW_STOCK_THRESHOLD)),
+    })
+    return counts
+
+
+class DashboardCounters:
+    """Dashboard counters maintained from order transitions
+
+    ``load()`` returns every counter (shards and aggregations); deltas from the feed
+    are added to the order counters in between. While the attached hub's
+    watch has run without a break since the last load, reads never wait on
+    Firestore: the drift check runs in the background. Otherwise the
+    counters are trusted for ``drift_interval`` seconds, like a cache entry.
+    """
+
+    def __init__(self, load: Callable[[], Dict[str, Any]], drift_interval: float = COUNTER_DRIFT_INTERVAL):
+        self.load = load
+        self.drift_interval = drift_interval
+        self._counts = None  # type: Optional[Dict[str, Any]]
+        self._loaded_at = 0.0
+        self._loaded_feed = (False, 0)  # feed state when the counters were loaded
+        self._pending = None  # deltas seen while a load is running
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._feed_state = lambda: (False, 0)  # type: Callable[[], Tuple[bool, int]]
+        self.deltas_applied = 0
+        self.drift_checks = 0
+        self.last_drift = {}
+
+    def attach(self, hub):
+        """Follow ``hub``'s stats_delta events (a WatchHub, see sse_hub.py)"""
+        hub.add_listener(self._on_event)
+        self._feed_state = lambda: (hub.watching, hub.watch_starts)
+
+    def _live(self) -> bool:
+        # A restarted watch missed the changes made while it was down
+        return self._loaded_feed[0] and self._feed_state() == self._loaded_feed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters; loads them on first use"""
+        with self._lock:
+            counts = self._counts
+            stale = time.time() - self._loaded_at >= self.drift_interval
+            live = self._live()
+        if counts is None:
+            self.reload()
+        elif stale and live:
+            self._reload_async()
+        elif stale:
+            try:
+                self.reload()
+            except Exception as e:
+                logger.warning(f"Dashboard counters: reload failed, serving last values: {e}")
+        with self._lock:
+            return dict(self._counts)
+
+    def apply(self, delta: Dict[str, Any]):
+        """Add one order transition's counter changes (see order_stats.stats_delta)"""
+        with self._lock:
+            if self._counts is None:
+                return
+            for key, value in delta.items():
+                if key in self._counts and isinstance(value, (int, float)):
+                    self._counts[key] = round(self._counts[key] + value, 2)
+                    if self._pending is not None:
+                        self._pending[key] = self._pending.get(key, 0) + value
+            self.deltas_applied += 1
+
+    def _on_event(self, event_type: str, data: str):
+        if event_type == 'stats_delta':
+            self.apply(json.loads(data))
+
+    def reload(self) -> Dict[str, Any]:
+        """Replace the counters with fresh aggregations; returns the drift that was corrected"""
+        with self._reload_lock:
+            feed = self._feed_state()
+            with self._lock:
+                self._pending = {}
+            try:
+                fresh = self.load()
+            finally:
+                with self._lock:
+                    pending, self._pending = self._pending, None
+            with self._lock:
+                # Changes that arrived during the load; one the aggregation already
+                # counted is counted twice until the next check
+                for key, value in pending.items():
+                    if key in fresh:
+                        fresh[key] = round(fresh[key] + value, 2)
+                drift = {}
+                if self._counts is not None:
+                    for key, value in fresh.items():
+                        diff = round(value - self._counts.get(key, 0), 2)
+                        if diff:
+                            drift[key] = diff
+                self._counts = fresh
+                self._loaded_at = time.time()
+                self._loaded_feed = feed
+                self.drift_checks += 1
+                self.last_drift = drift
+        if drift:
+            logger.warning(f"Dashboard counters: corrected drift {drift}")
+        return drift
+
+    def _reload_async(self):
+        if self._reload_lock.locked():
+            return
+        def run():
+            try:
+                self.reload()
+            except Exception as e:
+                logger.warning(f"Dashboard counters: drift check failed: {e}")
+        threading.Thread(target=run, name='dashboard-counters', daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'loaded': self._counts is not None,
+                'age': round(time.time() - self._loaded_at, 1) if self._counts is not None else None,
+                'live': self._live(),
+                'deltas_applied': self.deltas_applied,
+                'drift_checks': self.drift_checks,
+                'last_drift': self.last_drift,
+            }
+
+
+# Global instance
+dashboard_counters = DashboardCounters(load_firestore_counts)
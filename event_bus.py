@@ -0,0 +1,423 @@
+"""
+Cross-process event bus for the SSE hubs
+With several gunicorn workers, one elected leader process owns the event
+source (e.g. the Firestore order listener) and broadcasts its events; every
+worker feeds its own hub from the bus. Backends: Redis pub/sub, Postgres
+LISTEN/NOTIFY and an in-process broker for single-process runs and tests
+"""
+import json
+import logging
+import os
+import re
+import select
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+from resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+EVENT_BUS_URL = os.environ.get('EVENT_BUS_URL', '')                  # redis://, postgres:// or local://; empty = no bus
+BUS_LEADER_TTL = float(os.environ.get('BUS_LEADER_TTL', 15))        # seconds a leader lease lasts without renewal
+BUS_POLL_TIMEOUT = 5.0                                               # seconds a LISTEN connection waits per poll
+
+_CHANNEL_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def _process_identity() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+class BusSubscription:
+    """Handle for one channel subscription; ``close()`` stops delivery"""
+
+    def __init__(self, close: Callable[[], None]):
+        self._close = close
+        self.closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._close()
+
+    def unsubscribe(self):
+        """Same shape as a Firestore watch, so WatchHub can stop either"""
+        self.close()
+
+
+# ==================== LOCAL ====================
+
+class LocalBroker:
+    """Shared in-memory state for LocalBus instances (one instance = one 'process')"""
+
+    def __init__(self):
+        self.channels = defaultdict(list)   # channel -> [callback]
+        self.leases = {}                     # name -> (identity, monotonic expiry)
+        self.lock = threading.Lock()
+
+
+class LocalBus:
+    """In-process bus; several instances sharing a broker stand in for workers"""
+
+    def __init__(self, broker: Optional[LocalBroker] = None):
+        self.broker = broker or LocalBroker()
+        self.identity = _process_identity()
+
+    def publish(self, channel: str, message: str):
+        with self.broker.lock:
+            callbacks = list(self.broker.channels[channel])
+        for callback in callbacks:
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> BusSubscription:
+        with self.broker.lock:
+            self.broker.channels[channel].append(callback)
+
+        def close():
+            with self.broker.lock:
+                self.broker.channels[channel].remove(callback)
+        return BusSubscription(close)
+
+    def acquire_leadership(self, name: str, ttl: float) -> bool:
+        now = time.monotonic()
+        with self.broker.lock:
+            holder, expires = self.broker.leases.get(name, (None, 0.0))
+            if holder not in (None, self.identity) and expires > now:
+                return False
+            self.broker.leases[name] = (self.identity, now + ttl)
+            return True
+
+    def release_leadership(self, name: str):
+        with self.broker.lock:
+            if self.broker.leases.get(name, (None,))[0] == self.identity:
+                del self.broker.leases[name]
+
+
+# ==================== REDIS ====================
+
+# Renew / release only while the lease is still ours (compare-and-set)
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBus:
+    """Redis pub/sub broadcast with SET NX PX leader leases
+
+    ``client`` is a redis-py client (or anything with the same ``publish``,
+    ``pubsub``, ``set`` and ``eval`` methods); by default one is created from
+    ``url``.
+    """
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, key_prefix: str = 'frizzly:'):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("EVENT_BUS_URL is a redis:// URL but the redis package is not installed")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.key_prefix = key_prefix
+        self.identity = _process_identity()
+
+    def publish(self, channel: str, message: str):
+        self.client.publish(self.key_prefix + channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> BusSubscription:
+        stop = threading.Event()
+
+        def run():
+            attempt = 0
+            while not stop.is_set():
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.subscribe(self.key_prefix + channel)
+                    attempt = 0
+                    while not stop.is_set():
+                        message = pubsub.get_message(timeout=1.0)
+                        if message and message.get('type') == 'message':
+                            data = message['data']
+                            callback(data.decode('utf-8') if isinstance(data, bytes) else data)
+                except Exception as e:
+                    logger.warning(f"Redis bus: subscription to {channel} failed: {e}")
+                    attempt += 1
+                    stop.wait(backoff_delay(min(attempt - 1, 5), base=1.0, cap=30.0))
+                finally:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+        threading.Thread(target=run, name=f'redis-bus-{channel}', daemon=True).start()
+        return BusSubscription(stop.set)
+
+    def acquire_leadership(self, name: str, ttl: float) -> bool:
+        key, ttl_ms = f'{self.key_prefix}leader:{name}', int(ttl * 1000)
+        if self.client.set(key, self.identity, nx=True, px=ttl_ms):
+            return True
+        return bool(self.client.eval(_RENEW_SCRIPT, 1, key, self.identity, ttl_ms))
+
+    def release_leadership(self, name: str):
+        self.client.eval(_RELEASE_SCRIPT, 1, f'{self.key_prefix}leader:{name}', self.identity)
+
+
+# ==================== POSTGRES ====================
+
+class PostgresBus:
+    """Postgres LISTEN/NOTIFY broadcast with session advisory-lock leadership
+
+    ``connect()`` returns a new DB-API connection (psycopg2 by default, from
+    ``dsn``). NOTIFY payloads are limited to 8000 bytes, which order events
+    stay well under. A leader holds its lock on a dedicated connection, so a
+    crashed leader's lock is released with its session.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, connect: Optional[Callable[[], Any]] = None):
+        if connect is None:
+            try:
+                import psycopg2
+            except ImportError:
+                raise RuntimeError("EVENT_BUS_URL is a postgres:// URL but psycopg2 is not installed")
+            connect = lambda: psycopg2.connect(dsn)
+        self.connect = connect
+        self._publish_conn = None
+        self._leader_conns = {}  # name -> connection holding the advisory lock
+        self._lock = threading.Lock()
+
+    def _autocommit(self):
+        conn = self.connect()
+        conn.autocommit = True
+        return conn
+
+    def publish(self, channel: str, message: str):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._publish_conn is None:
+                        self._publish_conn = self._autocommit()
+                    with self._publish_conn.cursor() as cur:
+                        cur.execute('SELECT pg_notify(%s, %s)', (channel, message))
+                    return
+                except Exception:
+                    self._close_quietly(self._publish_conn)
+                    self._publish_conn = None
+                    if attempt:
+                        raise
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> BusSubscription:
+        if not _CHANNEL_RE.match(channel):
+            raise ValueError(f"Invalid channel name: {channel!r}")
+        stop = threading.Event()
+
+        def run():
+            attempt = 0
+            while not stop.is_set():
+                conn = None
+                try:
+                    conn = self._autocommit()
+                    with conn.cursor() as cur:
+                        cur.execute(f'LISTEN {channel}')
+                    attempt = 0
+                    while not stop.is_set():
+                        if select.select([conn], [], [], BUS_POLL_TIMEOUT) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            callback(conn.notifies.pop(0).payload)
+                except Exception as e:
+                    logger.warning(f"Postgres bus: LISTEN {channel} failed: {e}")
+                    attempt += 1
+                    stop.wait(backoff_delay(min(attempt - 1, 5), base=1.0, cap=30.0))
+                finally:
+                    self._close_quietly(conn)
+
+        threading.Thread(target=run, name=f'pg-bus-{channel}', daemon=True).start()
+        return BusSubscription(stop.set)
+
+    def acquire_leadership(self, name: str, ttl: float) -> bool:
+        conn = self._leader_conns.get(name)
+        try:
+            if conn is not None:
+                with conn.cursor() as cur:
+                    cur.execute('SELECT 1')  # the lock lives as long as this session
+                return True
+            conn = self._autocommit()
+            with conn.cursor() as cur:
+                cur.execute('SELECT pg_try_advisory_lock(hashtext(%s))', (name,))
+                acquired = cur.fetchone()[0]
+        except Exception as e:
+            logger.warning(f"Postgres bus: leadership check failed: {e}")
+            acquired = False
+        if acquired:
+            self._leader_conns[name] = conn
+        else:
+            self._leader_conns.pop(name, None)
+            self._close_quietly(conn)
+        return acquired
+
+    def release_leadership(self, name: str):
+        self._close_quietly(self._leader_conns.pop(name, None))
+
+    @staticmethod
+    def _close_quietly(conn):
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def make_bus(url: str = EVENT_BUS_URL):
+    """Bus for ``url`` (None when no bus is configured)"""
+    if not url:
+        return None
+    scheme = url.split(':', 1)[0]
+    if scheme in ('redis', 'rediss', 'unix'):
+        return RedisBus(url)
+    if scheme in ('postgres', 'postgresql'):
+        return PostgresBus(url)
+    if scheme == 'local':
+        return LocalBus()
+    raise ValueError(f"Unsupported EVENT_BUS_URL scheme: {scheme}")
+
+
+# ==================== LEADER-OWNED SOURCE ====================
+
+class LeaderElection:
+    """Runs ``start_source()`` only in the process that holds the ``name`` lease
+
+    ``leases`` is anything with ``acquire_leadership(name, ttl)`` and
+    ``release_leadership(name)``: a bus above, or a lease document store.
+    The lease is renewed every ``ttl / 3`` seconds; a process that loses it
+    stops its source, and a stopped election releases it.
+    """
+
+    def __init__(self, leases: Any, name: str, start_source: Callable[[], Any], ttl: float = BUS_LEADER_TTL):
+        self.leases = leases
+        self.name = name
+        self.start_source = start_source
+        self.ttl = ttl
+        self.leading = False
+
+    def start(self) -> BusSubscription:
+        stop = threading.Event()
+        threading.Thread(target=self.run, args=(stop,), name=f'bus-leader-{self.name}', daemon=True).start()
+        return BusSubscription(stop.set)
+
+    def run(self, stop: threading.Event):
+        source = None
+        try:
+            while not stop.is_set():
+                try:
+                    leading = self.leases.acquire_leadership(self.name, self.ttl)
+                except Exception as e:
+                    logger.warning(f"Event bus: lease check failed: {e}")
+                    leading = False
+                if leading and source is None:
+                    logger.info(f"Event bus: leading {self.name}, starting source")
+                    try:
+                        source = self.start_source()
+                    except Exception as e:
+                        # Let another process try rather than hold an idle lease
+                        logger.error(f"Event bus: could not start source: {e}")
+                        self.leases.release_leadership(self.name)
+                elif not leading and source is not None:
+                    logger.info(f"Event bus: lost {self.name} lease, stopping source")
+                    source.unsubscribe()
+                    source = None
+                self.leading = source is not None
+                stop.wait(self.ttl / 3)
+        except Exception as e:
+            logger.error(f"Event bus: leader loop for {self.name} failed: {e}")
+        finally:
+            if source is not None:
+                source.unsubscribe()
+                try:
+                    self.leases.release_leadership(self.name)
+                except Exception:
+                    pass
+            self.leading = False
+
+
+class BusWatch:
+    """Runs an event source in one elected process and relays it to all of them
+
+    ``start`` has the ``WatchHub`` start_watch signature, so a hub that would
+    own ``start_source`` itself gets its events from the bus instead. While a
+    process has subscribers it listens on ``channel`` and campaigns for the
+    lease; the leader runs ``start_source(publish)`` and broadcasts every
+    event. A leader whose last subscriber leaves releases the lease, and a
+    process that still has subscribers takes over (changes during that
+    hand-over are not replayed).
+
+    The leader gives each event its id (``max(now in ms, last id seen + 1)``)
+    and sends it along, so Last-Event-ID means the same event on every
+    worker and a new leader continues above the old one's ids.
+    """
+
+    def __init__(self, bus: Any, channel: str, start_source: Callable[[Callable], Any],
+                 lease_ttl: float = BUS_LEADER_TTL):
+        self.bus = bus
+        self.channel = channel
+        self.start_source = start_source
+        self.lease_ttl = lease_ttl
+        self._election = None
+        self._last_id = 0
+        self._id_lock = threading.Lock()
+        self.relayed = 0
+        self.received = 0
+
+    @property
+    def leading(self) -> bool:
+        return self._election is not None and self._election.leading
+
+    def start(self, publish: Callable) -> BusSubscription:
+        def on_message(message: str):
+            try:
+                event = json.loads(message)
+            except ValueError:
+                return
+            self.received += 1
+            key = event.get('key')
+            event_id = event.get('id')
+            if isinstance(event_id, int):
+                with self._id_lock:
+                    self._last_id = max(self._last_id, event_id)
+            else:
+                event_id = None
+            publish(event.get('event'), event.get('data', ''), tuple(key) if isinstance(key, list) else key,
+                    event_id=event_id)
+
+        subscription = self.bus.subscribe(self.channel, on_message)
+        self._election = LeaderElection(self.bus, self.channel, lambda: self.start_source(self._broadcast),
+                                        self.lease_ttl)
+        election = self._election.start()
+
+        def close():
+            election.close()
+            subscription.close()
+        return BusSubscription(close)
+
+    def _broadcast(self, event_type: Optional[str], data: str, dedupe_key: Any = None):
+        with self._id_lock:
+            self._last_id = max(int(time.time() * 1000), self._last_id + 1)
+            event_id = self._last_id
+        self.bus.publish(self.channel, json.dumps({'id': event_id, 'event': event_type, 'data': data,
+                                                   'key': dedupe_key}))
+        self.relayed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {'leading': self.leading, 'relayed': self.relayed, 'received': self.received}
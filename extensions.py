@@ -1,6 +1,7 @@
 from flask_login import LoginManager
 import firebase_admin
 from firebase_admin import firestore
+import request_memo
 
 class _FirestoreExtension:
     def __init__(self):
@@ -13,6 +14,18 @@ class _FirestoreExtension:
         self.db = firestore.client()
         app.extensions['firestore'] = self.db
 
+    def get_doc(self, collection, doc_id):
+        """Document snapshot, fetched at most once per request"""
+        return request_memo.get_or_load(
+            ('firestore', collection, doc_id),
+            lambda: self.db.collection(collection).document(doc_id).get()
+        )
+
+    def update_doc(self, collection, doc_id, data):
+        """Update a document and drop its memoized snapshot"""
+        self.db.collection(collection).document(doc_id).update(data)
+        request_memo.forget('firestore', collection, doc_id)
+
 # Flask-Login setup
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
@@ -0,0 +1,73 @@
+"""
+Timestamp display formatting shared by the dashboard apps
+Accepts epoch seconds or milliseconds, datetimes, Firestore Timestamps and
+serialized {'_seconds': ...} values; formatted strings are cached per second
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+DISPLAY_FORMAT = '%Y-%m-%d %H:%M:%S'
+FORMAT_CACHE_SIZE = 8192
+
+
+def to_epoch_seconds(value: Any) -> Optional[float]:
+    """Epoch seconds for any timestamp representation we receive, or None"""
+    if not value or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e12 else value
+    if isinstance(value, dict):
+        # Firestore Timestamp serialized by the API (or by protobuf JSON)
+        seconds = value.get('_seconds', value.get('seconds'))
+        return float(seconds) if seconds is not None else None
+    if hasattr(value, 'timestamp'):
+        # datetime / DatetimeWithNanoseconds from the Firestore SDK
+        return value.timestamp()
+    if hasattr(value, 'seconds'):
+        # protobuf Timestamp
+        return float(value.seconds)
+    if isinstance(value, str):
+        try:
+            return to_epoch_seconds(float(value))
+        except ValueError:
+            return None
+    return None
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def _format_second(second: int) -> str:
+    return datetime.fromtimestamp(second).strftime(DISPLAY_FORMAT)
+
+
+def format_timestamp(value: Any, default: Any = 'N/A') -> Any:
+    """Display string for a timestamp (``default`` if missing or invalid)"""
+    seconds = to_epoch_seconds(value)
+    if seconds is None:
+        return default
+    try:
+        return _format_second(int(seconds))
+    except (OverflowError, OSError, ValueError):
+        return default
+
+
+def format_timestamps(items: Iterable[Dict], field: str = 'timestamp', target: str = 'createdAt',
+                      default: str = 'N/A') -> List[Dict]:
+    """Set ``target`` to the formatted ``field`` on every dict of a list
+
+    Each distinct second is formatted once per call; items without ``field``
+    keep an existing ``target`` or get ``default``.
+    """
+    items = list(items)
+    formatted = {}
+    for item in items:
+        value = item.get(field)
+        if not value:
+            item.setdefault(target, default)
+            continue
+        seconds = to_epoch_seconds(value)
+        second = int(seconds) if seconds is not None else None
+        if second not in formatted:
+            formatted[second] = format_timestamp(second, default)
+        item[target] = formatted[second]
+    return items
@@ -0,0 +1,47 @@
+"""
+Gunicorn settings for the admin dashboard
+Runs gevent workers by default, so each open SSE stream (/api/stream-orders)
+is a cheap greenlet instead of a pinned sync worker thread
+Set WORKER_CLASS=gthread (or sync) to opt out
+"""
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = os.environ.get('WORKER_CLASS', 'gevent')
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# gevent: concurrent connections per worker (idle SSE streams included)
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+# gthread: threads per worker (each open SSE stream holds one)
+threads = int(os.environ.get('GUNICORN_THREADS', 10))
+
+# SSE responses send a heartbeat well inside this; it only bounds stuck requests
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Make the Firestore (gRPC) client cooperate with gevent's event loop
+
+    The gevent worker monkey-patches the process itself as it starts; gRPC
+    only needs its own hook, installed before the app creates any channels
+    """
+    if worker_class != 'gevent':
+        return
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+    except ImportError:
+        pass  # app_api does not use gRPC
+
+
+def post_worker_init(worker):
+    """Start the app's background writers once it is loaded in this worker"""
+    order_feed = sys.modules.get('order_feed')  # the Firestore apps; app_api has none
+    if order_feed is not None:
+        order_feed.start_stats_writer()
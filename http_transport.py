@@ -0,0 +1,192 @@
+"""
+Shared HTTP transport for upstream API calls
+One pooled keep-alive session per process, sized to the worker threads,
+so every page view reuses connections instead of paying a TLS handshake per call
+"""
+import os
+import threading
+import time
+import logging
+from typing import Optional, Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from resilience import (BreakerRegistry, CircuitOpenError, Deadline, DeadlineExceeded,
+                        GET_RETRIES, RETRYABLE_STATUS, backoff_delay, endpoint_key)
+
+logger = logging.getLogger(__name__)
+
+# Pool sizing: one connection per thread that can issue upstream calls
+POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', os.environ.get('GUNICORN_THREADS', 10)))
+POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 4))  # distinct upstream hosts
+# Compressed bodies: urllib3 decodes gzip/deflate transparently
+ACCEPT_ENCODING = 'gzip, deflate'
+# Sentinel: derive per-attempt timeouts from the call's Deadline
+USE_DEADLINE = object()
+
+
+class HTTPTransport:
+    """Thread-safe pooled session with per-token auth headers and reuse metrics"""
+
+    def __init__(self, pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE):
+        self.session = requests.Session()
+        self.session.headers.update({'Connection': 'keep-alive', 'Accept-Encoding': ACCEPT_ENCODING})
+        self.adapter = HTTPAdapter(pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize,
+                                   pool_block=False)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.breakers = BreakerRegistry()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._retries = 0
+        self._short_circuited = 0
+        self._payloads = {}
+
+    def _headers(self, token: Optional[str] = None, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def request(self, method: str, url: str, token: Optional[str] = None,
+                headers: Optional[Dict[str, str]] = None, timeout: Any = USE_DEADLINE,
+                deadline: Optional[Deadline] = None, retries: Optional[int] = None,
+                **kwargs) -> requests.Response:
+        """Send a request over the shared pool (raises requests exceptions)
+
+        Regular calls run under a Deadline budget and the endpoint's circuit
+        breaker; GETs are retried with jittered backoff while budget remains
+        (for streamed bodies the budget covers getting the response headers).
+        An explicit ``timeout`` (e.g. None for long-lived SSE) bypasses both.
+        """
+        headers = self._headers(token, headers)
+        if timeout is not USE_DEADLINE:
+            return self._send(method, url, headers=headers, timeout=timeout, **kwargs)
+        
+        deadline = deadline or Deadline()
+        breaker = self.breakers.get(endpoint_key(url))
+        if not breaker.allow():
+            with self._lock:
+                self._short_circuited += 1
+            raise CircuitOpenError(f"Circuit open for {endpoint_key(url)}")
+        
+        attempts = 1 + (GET_RETRIES if retries is None else retries) if method == 'GET' else 1
+        for attempt in range(attempts):
+            if attempt and breaker.state == breaker.OPEN:
+                raise CircuitOpenError(f"Circuit opened for {endpoint_key(url)} while retrying")
+            last_attempt = attempt + 1 >= attempts
+            try:
+                timeout = deadline.timeout()
+            except DeadlineExceeded:
+                # The caller's budget ran out, not the endpoint: no verdict for the breaker
+                breaker.release()
+                raise
+            try:
+                response = self._send(method, url, headers=headers, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                breaker.record_failure()
+                if last_attempt or deadline.expired():
+                    raise
+            except requests.exceptions.RequestException:
+                # e.g. a body cut off mid-read (ChunkedEncodingError): a failure, not retried
+                breaker.record_failure()
+                raise
+            except BaseException:
+                # Not an upstream error: no verdict, but a half-open trial must not stay taken
+                breaker.release()
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS and response.status_code < 500:
+                    breaker.record_success()
+                    return response
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                elif last_attempt or deadline.expired():
+                    # Throttled (429): the endpoint is up but busy, so neither success nor failure
+                    breaker.release()
+                if last_attempt or response.status_code not in RETRYABLE_STATUS or deadline.expired():
+                    return response
+                response.close()
+            
+            delay = min(backoff_delay(attempt), max(0.0, deadline.remaining()))
+            with self._lock:
+                self._retries += 1
+            time.sleep(delay)
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        with self._lock:
+            self._requests += 1
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+        if not kwargs.get('stream'):
+            self.record_payload(response, len(response.content))
+        return response
+
+    def record_payload(self, response: requests.Response, decoded_bytes: int):
+        """Count a consumed body's wire (possibly compressed) and decoded size per endpoint"""
+        try:
+            wire_bytes = response.raw.tell()
+        except (AttributeError, ValueError, OSError):
+            wire_bytes = decoded_bytes
+        key = endpoint_key(response.url)
+        with self._lock:
+            entry = self._payloads.setdefault(key, {'responses': 0, 'compressed': 0,
+                                                    'wire_bytes': 0, 'decoded_bytes': 0})
+            entry['responses'] += 1
+            if response.headers.get('Content-Encoding') in ('gzip', 'deflate'):
+                entry['compressed'] += 1
+            entry['wire_bytes'] += wire_bytes
+            entry['decoded_bytes'] += decoded_bytes
+
+    def payload_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Wire vs decoded bytes per endpoint (ratio > 1 means compression is paying off)"""
+        with self._lock:
+            payloads = {key: dict(entry) for key, entry in self._payloads.items()}
+        for entry in payloads.values():
+            entry['avg_decoded_bytes'] = entry['decoded_bytes'] // entry['responses']
+            entry['ratio'] = round(entry['decoded_bytes'] / entry['wire_bytes'], 2) if entry['wire_bytes'] else None
+        return payloads
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection reuse metrics across all pooled hosts"""
+        connections = 0
+        pool_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            pool_requests += pool.num_requests
+        with self._lock:
+            total, errors = self._requests, self._errors
+            retries, short_circuited = self._retries, self._short_circuited
+        reused = max(0, pool_requests - connections)
+        return {
+            'requests': total,
+            'errors': errors,
+            'connections_opened': connections,
+            'connections_reused': reused,
+            'reuse_ratio': round(reused / pool_requests, 3) if pool_requests else 0.0,
+            'pool_maxsize': self.adapter._pool_maxsize,
+            'retries': retries,
+            'short_circuited': short_circuited,
+            'breakers': self.breakers.states(),
+            'payloads': self.payload_stats(),
+        }
+
+    def close(self):
+        self.session.close()
+
+
+# Global transport instance shared by api_client and app_api
+transport = HTTPTransport()
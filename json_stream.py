@@ -0,0 +1,109 @@
+"""
+Incremental JSON array decoding for streamed API responses
+Yields the items of a (possibly nested) JSON array as the bytes arrive,
+so large order/user lists are processed with constant memory
+"""
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_COMPACT_AT = 64 * 1024  # drop consumed text once this much has been parsed
+
+
+class _NeedMore(Exception):
+    """The buffer ends before the next complete token"""
+
+
+def iter_json_array(chunks: Iterable[bytes], key: Optional[str] = None,
+                    encoding: str = 'utf-8', members: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """Yield array items from a stream of JSON bytes
+
+    With ``key`` the document must be an object and the items of its
+    top-level ``key`` array are yielded (``{"orders": [...], ...}``); other
+    members are skipped, or stored in ``members`` when a dict is given (e.g.
+    ``nextCursor``). Without ``key`` the document itself must be an array.
+    Raises ValueError on malformed or truncated input.
+    """
+    text = codecs.getincrementaldecoder(encoding)()
+    chunks = iter(chunks)
+    buf = ''
+    pos = 0
+    eof = False
+    state = 'object_start' if key else 'array_start'
+
+    def skip_ws(i):
+        while i < len(buf) and buf[i] in _WHITESPACE:
+            i += 1
+        if i >= len(buf):
+            raise _NeedMore
+        return i
+
+    def decode_value(i):
+        try:
+            value, end = _decoder.raw_decode(buf, i)
+        except json.JSONDecodeError:
+            raise _NeedMore
+        # A number at the very end of the buffer may continue in the next chunk
+        if end >= len(buf) and not eof:
+            raise _NeedMore
+        return value, end
+
+    while True:
+        try:
+            while True:
+                if state == 'object_start':
+                    pos = skip_ws(pos)
+                    if buf[pos] != '{':
+                        raise ValueError(f"Expected JSON object, got {buf[pos]!r}")
+                    pos += 1
+                    state = 'member'
+                elif state == 'member':
+                    pos = skip_ws(pos)
+                    if buf[pos] == '}':
+                        return
+                    if buf[pos] == ',':
+                        pos = skip_ws(pos + 1)
+                    name, end = decode_value(pos)
+                    colon = skip_ws(end)
+                    if buf[colon] != ':':
+                        raise ValueError(f"Expected ':' after member name {name!r}")
+                    pos = colon + 1
+                    state = 'array_start' if name == key else 'skip_member'
+                elif state == 'skip_member':
+                    pos = skip_ws(pos)
+                    value, pos = decode_value(pos)
+                    if members is not None:
+                        members[name] = value
+                    state = 'member'
+                elif state == 'array_start':
+                    pos = skip_ws(pos)
+                    if buf[pos] != '[':
+                        raise ValueError(f"Expected JSON array, got {buf[pos]!r}")
+                    pos += 1
+                    state = 'item'
+                elif state == 'item':
+                    pos = skip_ws(pos)
+                    if buf[pos] == ']':
+                        pos += 1
+                        if not key:
+                            return
+                        state = 'member'
+                        continue
+                    if buf[pos] == ',':
+                        pos = skip_ws(pos + 1)
+                    item, pos = decode_value(pos)
+                    yield item
+                    if pos > _COMPACT_AT:
+                        buf = buf[pos:]
+                        pos = 0
+        except _NeedMore:
+            if eof:
+                raise ValueError('Truncated JSON stream')
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+                buf += text.decode(b'', final=True)
+            else:
+                buf += text.decode(chunk)
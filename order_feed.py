@@ -0,0 +1,123 @@
+"""
+Order change feed shared by the Firestore apps (app.py, app_optimized.py)
+One Firestore listener behind order_hub serves every SSE stream and the
+dashboard counters; with EVENT_BUS_URL set only the elected leader worker
+runs it and every worker receives its events over the bus. The stats
+writer keeps the counter shards and daily revenue rollups current
+"""
+import json
+import logging
+import threading
+import time
+
+from firebase_admin import firestore
+from extensions import firestore_extension
+from sse_hub import WatchHub
+from event_bus import BusWatch, make_bus
+from order_stats import OrderStateTracker, stats_delta
+from dashboard_counters import dashboard_counters
+from counter_shards import FirestoreLeases, ShardWriter, order_shards
+from revenue_rollups import revenue_rollups
+
+logger = logging.getLogger(__name__)
+
+ORDER_FEED_WINDOW = 50  # newest orders the live listener follows
+
+
+def _watch_orders(publish):
+    """Start the process-wide Firestore listener behind order_hub"""
+    first_snapshot = True
+    started_at = time.time()
+    order_states = OrderStateTracker()  # last status per order, for stats_delta events
+
+    def created_since_start(doc):
+        return doc.create_time is not None and doc.create_time.timestamp() >= started_at
+
+    def publish_transition(order_id, transition, version):
+        delta = stats_delta(*transition)
+        if delta:
+            publish('stats_delta', json.dumps(delta), dedupe_key=('stats', order_id, version))
+
+    def on_snapshot(col_snapshot, changes, read_time):
+        """Firestore snapshot callback"""
+        nonlocal first_snapshot
+
+        logger.info(f"SSE: Snapshot received with {len(changes)} changes, first={first_snapshot}")
+
+        # Initial snapshot (all existing orders): remember their states, send nothing
+        if first_snapshot:
+            first_snapshot = False
+            for doc in col_snapshot:
+                order_states.seed(doc.id, doc.to_dict())
+            logger.info("SSE: Skipping initial snapshot")
+            return
+
+        # Orders leave the newest-50 window as newer ones arrive; more removals than
+        # new orders means some were deleted, which only a lookup can tell apart
+        new_orders = sum(1 for change in changes if change.type.name == 'ADDED' and created_since_start(change.document))
+        check_deleted = sum(1 for change in changes if change.type.name == 'REMOVED') > new_orders
+
+        for change in changes:
+            if change.type.name == 'REMOVED':
+                doc = change.document
+                if check_deleted and not doc.reference.get().exists:
+                    publish_transition(doc.id, order_states.remove(doc.id, doc.to_dict()), 'deleted')
+                else:
+                    order_states.forget(doc.id)
+            elif change.type.name in ['ADDED', 'MODIFIED']:
+                doc = change.document
+                data = doc.to_dict()
+                event_data = {
+                    'id': doc.id,
+                    'orderId': data.get('orderId', doc.id),
+                    'totalAmount': data.get('totalAmount', 0),
+                    'status': data.get('status', 'PENDING'),
+                    'timestamp': data.get('timestamp', 0),
+                    'userId': data.get('userId'),
+                    'customerName': data.get('customerName', 'Unknown')
+                }
+                event_type = 'new_order' if change.type.name == 'ADDED' else 'order_update'
+                publish(event_type, json.dumps(event_data), dedupe_key=(doc.id, str(doc.update_time)))
+                # ADDED also covers older orders entering the window; only ones created since the start are new
+                is_new = change.type.name == 'ADDED' and created_since_start(doc)
+                transition = order_states.transition(doc.id, event_data, is_new=is_new)
+                if transition:
+                    publish_transition(doc.id, transition, str(doc.update_time))
+
+    # Order by timestamp to catch new orders
+    logger.info("SSE: Starting shared Firestore listener")
+    col_query = (firestore_extension.db.collection('orders')
+                 .order_by('timestamp', direction=firestore.Query.DESCENDING)
+                 .limit(ORDER_FEED_WINDOW))
+    return col_query.on_snapshot(on_snapshot)
+
+
+# One Firestore listener for all open streams: started by the first client,
+# stopped when the last one leaves; keeps recent events for Last-Event-ID resume
+event_bus = make_bus()
+if event_bus:
+    order_hub = WatchHub(BusWatch(event_bus, 'frizzly_orders', _watch_orders).start)
+else:
+    order_hub = WatchHub(_watch_orders)
+
+# Dashboard counters follow the stats_delta events of the same feed
+dashboard_counters.attach(order_hub)
+
+# Sharded counter documents and daily revenue rollups shared by every instance
+# (counter_shards.py, revenue_rollups.py), both fed by the ledgered feed of all
+# created and updated orders. Exactly one process writes them: the holder of a
+# lease on the event bus, or on a Firestore document without one. The election
+# starts once the app is serving (gunicorn post_worker_init, or app.run), not on
+# import, so scripts, tests and a preloading master start no threads.
+stats_writer = ShardWriter(order_shards, revenue_rollups.follow, repair=revenue_rollups.repair_recent)
+_stats_election = None
+_stats_election_lock = threading.Lock()
+
+
+def start_stats_writer():
+    """Campaign for the stats writer lease in this process (once)"""
+    global _stats_election
+    with _stats_election_lock:
+        if _stats_election is None:
+            _stats_election = stats_writer.elect(event_bus or FirestoreLeases())
+        return _stats_election
@@ -0,0 +1,298 @@
+"""
+In-memory order index for the dashboard orders list
+Keeps the newest orders sorted by timestamp and applies stream events
+incrementally, so a page of /orders is a slice instead of a full fetch and sort
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from order_stats import stats_delta
+
+logger = logging.getLogger(__name__)
+
+ORDER_INDEX_SIZE = int(os.environ.get('ORDER_INDEX_SIZE', 5000))       # newest orders kept in memory
+ORDER_INDEX_MAX_AGE = float(os.environ.get('ORDER_INDEX_MAX_AGE', 30))  # seconds trusted without a live stream
+ORDER_INDEX_FULL_REFRESH = float(os.environ.get('ORDER_INDEX_FULL_REFRESH', 900))  # seconds between full reloads
+
+
+def sort_timestamp(order: Dict) -> float:
+    """Order timestamp in milliseconds (0 if missing or not numeric)"""
+    ts = order.get('timestamp')
+    if not isinstance(ts, (int, float)):
+        return 0
+    return ts if ts > 1e12 else ts * 1000
+
+
+class OrderIndex:
+    """Newest-first window of orders with O(log n) inserts and O(page) reads
+
+    Seeded by ``load`` (normally in the background via ``refresh_async``) and
+    kept current by ``apply_event`` from the order stream. It is only trusted
+    while a stream is feeding it or for ``max_age`` seconds after a load.
+    Refreshes in between only ``merge`` the orders newer than the newest one
+    indexed; changes to older orders made while no stream was open are
+    picked up by the next full load, every ``full_refresh`` seconds.
+    Delta listeners get the dashboard counter changes of every transition
+    the index sees (write-through or stream), once per process.
+    """
+
+    def __init__(self, max_size: int = ORDER_INDEX_SIZE, max_age: float = ORDER_INDEX_MAX_AGE,
+                 full_refresh: float = ORDER_INDEX_FULL_REFRESH):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.full_refresh = full_refresh
+        self._keys = []      # sorted (-timestamp, id)
+        self._orders = {}    # id -> order
+        self.total = 0       # all orders, including those older than the window
+        self.loaded_at = 0.0
+        self.full_loaded_at = 0.0
+        self.live_streams = 0
+        self._lock = threading.RLock()
+        self._loading = False
+        self._pending = []   # events received while a load is running
+        self._delta_listeners = []
+
+    def add_delta_listener(self, listener: Callable[[Dict], None]):
+        """Call ``listener(delta)`` with the counter changes of each order transition"""
+        self._delta_listeners.append(listener)
+
+    def _emit(self, delta: Dict):
+        if not delta:
+            return
+        for listener in self._delta_listeners:
+            try:
+                listener(delta)
+            except Exception as e:
+                logger.error(f"Order index delta listener failed: {e}")
+
+    # ---- freshness ----
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            if not self.loaded_at:
+                return False
+            return self.live_streams > 0 or time.time() - self.loaded_at < self.max_age
+
+    def stream_opened(self):
+        with self._lock:
+            if not self.live_streams and self.loaded_at and time.time() - self.loaded_at >= self.max_age:
+                self.loaded_at = 0.0  # events were missed while no stream was open
+            self.live_streams += 1
+
+    def stream_closed(self):
+        with self._lock:
+            self.live_streams = max(0, self.live_streams - 1)
+            if not self.live_streams and self.loaded_at:
+                # Current up to now; events may be missed from here on
+                self.loaded_at = time.time()
+
+    # ---- loading ----
+
+    def load(self, orders: Iterable[Dict]):
+        """Rebuild from an iterable of all orders (streamed; keeps only the newest window)"""
+        with self._lock:
+            self._loading = True
+        keys, by_id, total = [], {}, 0
+        try:
+            for order in orders:
+                order_id = order.get('id')
+                if not order_id:
+                    continue
+                total += 1
+                key = (-sort_timestamp(order), order_id)
+                if len(keys) >= self.max_size and key >= keys[-1]:
+                    continue
+                bisect.insort(keys, key)
+                by_id[order_id] = order
+                if len(keys) > self.max_size:
+                    by_id.pop(keys.pop()[1], None)
+        except Exception:
+            with self._lock:
+                self._loading = False
+                self._pending = []
+            raise
+        with self._lock:
+            self._keys, self._orders, self.total = keys, by_id, total
+            self.loaded_at = self.full_loaded_at = time.time()
+            self._finish_loading()
+        logger.info(f"Order index loaded: {len(keys)} of {total} orders")
+
+    def merge(self, orders: Iterable[Dict]):
+        """Add or update orders without dropping the rest (e.g. the ones created since the last load)"""
+        with self._lock:
+            self._loading = True
+        added = 0
+        try:
+            for order in orders:
+                if order.get('id'):
+                    with self._lock:
+                        added += self._upsert(order)
+        except Exception:
+            with self._lock:
+                self.total += added
+                self._finish_loading()
+            raise
+        with self._lock:
+            self.total += added
+            self.loaded_at = time.time()
+            self._finish_loading()
+        logger.info(f"Order index merged {added} new orders")
+
+    def _finish_loading(self):
+        self._loading = False
+        pending, self._pending = self._pending, []
+        for event_type, data in pending:
+            self._apply(event_type, data)
+
+    def newest_timestamp(self) -> Optional[float]:
+        """Timestamp (ms) of the newest indexed order, None if the index is empty"""
+        with self._lock:
+            return -self._keys[0][0] if self._keys else None
+
+    def refresh_async(self, loader: Callable[[], Iterable[Dict]],
+                      since_loader: Optional[Callable[[float], Iterable[Dict]]] = None) -> bool:
+        """Refresh in a background thread unless a load is already running
+
+        ``loader()`` yields every order; ``since_loader(ms)``, if given, yields
+        at least the orders with a timestamp at or after ``ms`` and is merged
+        instead while the last full load is under ``full_refresh`` seconds old.
+        """
+        with self._lock:
+            if self._loading:
+                return False
+            self._loading = True
+            newest = self.newest_timestamp()
+            incremental = (since_loader is not None and newest is not None
+                           and time.time() - self.full_loaded_at < self.full_refresh)
+
+        def run():
+            try:
+                if incremental:
+                    self.merge(since_loader(newest))
+                else:
+                    self.load(loader())
+            except Exception as e:
+                logger.error(f"Order index refresh failed: {e}")
+                with self._lock:
+                    self._loading = False
+
+        threading.Thread(target=run, name='order-index-refresh', daemon=True).start()
+        return True
+
+    # ---- reads ----
+
+    def page(self, offset: int, limit: int) -> Optional[Tuple[List[Dict], int]]:
+        """(orders, total) for one page, or None if the page is outside the window"""
+        with self._lock:
+            if offset + limit > len(self._keys) and len(self._keys) < self.total:
+                return None
+            keys = self._keys[offset:offset + limit]
+            return [dict(self._orders[order_id]) for _, order_id in keys], self.total
+
+    # ---- writes ----
+
+    def upsert(self, order: Dict) -> bool:
+        """Insert or merge an order; returns True if it was not indexed before"""
+        with self._lock:
+            return self._upsert(order)
+
+    def _upsert(self, order: Dict) -> bool:
+        order_id = order['id']
+        existing = self._orders.get(order_id)
+        if existing is not None:
+            old_key = (-sort_timestamp(existing), order_id)
+            merged = {**existing, **order}
+            new_key = (-sort_timestamp(merged), order_id)
+            if new_key != old_key:
+                del self._keys[bisect.bisect_left(self._keys, old_key)]
+                bisect.insort(self._keys, new_key)
+            self._orders[order_id] = merged
+            return False
+        if not self._in_window(order):
+            return True
+        key = (-sort_timestamp(order), order_id)
+        bisect.insort(self._keys, key)
+        self._orders[order_id] = dict(order)
+        if len(self._keys) > self.max_size:
+            self._orders.pop(self._keys.pop()[1], None)
+        return True
+
+    def patch(self, order_id: str, fields: Dict):
+        """Merge fields into an indexed order (no-op if it is not indexed)"""
+        delta = {}
+        with self._lock:
+            existing = self._orders.get(order_id)
+            if existing is not None:
+                self._upsert({**fields, 'id': order_id})
+                delta = stats_delta(existing, self._orders[order_id])
+        self._emit(delta)
+
+    def remove(self, order_id: str):
+        with self._lock:
+            order = self._orders.pop(order_id, None)
+            if order is not None:
+                del self._keys[bisect.bisect_left(self._keys, (-sort_timestamp(order), order_id))]
+            self.total = max(0, self.total - 1)
+        self._emit(stats_delta(order, None) if order is not None else {'total_orders': -1})
+
+    def apply_event(self, event_type: Optional[str], data: Any,
+                    fetch: Optional[Callable[[str], Optional[Dict]]] = None):
+        """Apply one stream event (``data`` is the JSON payload, str or dict)
+
+        Events only carry summary fields, so ``fetch`` (order id -> full order)
+        is used when an unseen order enters the window, to index everything the
+        list renders.
+        """
+        if isinstance(data, (str, bytes)):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                return
+        if not isinstance(data, dict) or not data.get('id'):
+            return
+        event_type = event_type or data.get('type')
+        if event_type not in ('new_order', 'order_update'):
+            return
+        with self._lock:
+            if self._loading:
+                self._pending.append((event_type, data))
+                return
+            needs_fetch = data['id'] not in self._orders and self._in_window(data)
+        if needs_fetch and fetch:
+            data = {**(fetch(data['id']) or {}), **data}
+        with self._lock:
+            if self._loading:
+                self._pending.append((event_type, data))
+                return
+            delta = self._apply(event_type, data)
+        self._emit(delta)
+
+    def _in_window(self, order: Dict) -> bool:
+        return len(self._keys) < self.max_size or (-sort_timestamp(order), order['id']) < self._keys[-1]
+
+    def _apply(self, event_type: str, data: Dict) -> Dict:
+        """Apply under the lock; returns the counter delta of the change"""
+        data = {k: v for k, v in data.items() if k != 'type'}
+        existing = self._orders.get(data['id'])
+        is_new = self._upsert(data)
+        if is_new and event_type == 'new_order':
+            self.total += 1
+        if existing is not None:
+            return stats_delta(existing, self._orders.get(data['id'], data))
+        return stats_delta(None, data) if is_new and event_type == 'new_order' else {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'indexed': len(self._keys), 'total': self.total, 'live_streams': self.live_streams,
+                    'age': round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+                    'full_age': round(time.time() - self.full_loaded_at, 1) if self.full_loaded_at else None,
+                    'fresh': self.is_fresh()}
+
+
+# Global order index for the API dashboard
+order_index = OrderIndex()
@@ -0,0 +1,121 @@
+"""
+Dashboard counter deltas from order changes
+Turns each order transition (created, status change, deleted) into the
+changes it makes to the dashboard counters, so browsers can update their
+numbers from the event stream instead of refetching the aggregates
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+IN_PROGRESS_STATUSES = ('CONFIRMED', 'PREPARING_ORDER', 'READY_FOR_PICKUP', 'ON_WAY', 'OUT_FOR_DELIVERY')
+REVENUE_STATUS = 'DELIVERED'
+TRACKED_ORDERS = 5000  # orders whose last status is remembered by a tracker
+DASHBOARD_COUNTERS = ('total_orders', 'pending_orders', 'in_progress_orders', 'delivered_orders', 'total_revenue')
+
+
+def status_counter(status: Optional[str]) -> Optional[str]:
+    """Dashboard counter an order with ``status`` is counted in (None for the others)"""
+    if status == 'PENDING':
+        return 'pending_orders'
+    if status in IN_PROGRESS_STATUSES:
+        return 'in_progress_orders'
+    if status == REVENUE_STATUS:
+        return 'delivered_orders'
+    return None
+
+
+def _revenue(order: Optional[Dict]) -> float:
+    if not order or order.get('status') != REVENUE_STATUS:
+        return 0.0
+    try:
+        return float(order.get('totalAmount') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def stats_delta(before: Optional[Dict], after: Optional[Dict]) -> Dict[str, Any]:
+    """Counter changes for one order going from ``before`` to ``after``
+
+    ``before=None`` is a new order, ``after=None`` a deleted one. Only
+    non-zero changes are returned; ``by_status`` holds per-status counts.
+    """
+    delta = {}
+    if before is None and after is not None:
+        delta['total_orders'] = 1
+    elif after is None and before is not None:
+        delta['total_orders'] = -1
+
+    old_status = before.get('status') if before else None
+    new_status = after.get('status') if after else None
+    if old_status != new_status:
+        by_status = {}
+        if old_status:
+            by_status[old_status] = -1
+        if new_status:
+            by_status[new_status] = 1
+        if by_status:
+            delta['by_status'] = by_status
+        old_counter, new_counter = status_counter(old_status), status_counter(new_status)
+        if old_counter != new_counter:
+            if old_counter:
+                delta[old_counter] = -1
+            if new_counter:
+                delta[new_counter] = 1
+
+    revenue = round(_revenue(after) - _revenue(before), 2)
+    if revenue:
+        delta['total_revenue'] = revenue
+    return delta
+
+
+class OrderStateTracker:
+    """Last known status, amount and timestamp per order, to derive deltas from change events
+
+    Events carry only the new state; the tracker supplies the old one. An
+    update for an order it has never seen yields no delta (the periodic
+    reconciliation in the browser covers it).
+    """
+
+    def __init__(self, max_size: int = TRACKED_ORDERS):
+        self.max_size = max_size
+        self._orders = OrderedDict()  # id -> {'status', 'totalAmount'}
+        self._lock = threading.Lock()
+
+    def seed(self, order_id: str, order: Dict):
+        """Remember an order's current state without producing a delta"""
+        with self._lock:
+            self._remember(order_id, order)
+
+    def observe(self, order_id: str, order: Dict, is_new: bool = False) -> Dict[str, Any]:
+        """Record the order's new state; returns the counter delta of the change"""
+        transition = self.transition(order_id, order, is_new)
+        return stats_delta(*transition) if transition else {}
+
+    def transition(self, order_id: str, order: Dict, is_new: bool = False) -> Optional[Tuple[Optional[Dict], Dict]]:
+        """Record the order's new state; returns ``(before, after)``, or None for an untracked update"""
+        with self._lock:
+            before = self._orders.get(order_id)
+            after = self._remember(order_id, order)
+        if before is None and not is_new:
+            return None
+        return before, after
+
+    def forget(self, order_id: str):
+        with self._lock:
+            self._orders.pop(order_id, None)
+
+    def remove(self, order_id: str, order: Dict) -> Tuple[Dict, None]:
+        """Forget a deleted order; returns its ``(before, None)`` transition"""
+        with self._lock:
+            before = self._orders.pop(order_id, None)
+        return before or order, None
+
+    def _remember(self, order_id: str, order: Dict) -> Dict:
+        state = {'status': order.get('status'), 'totalAmount': order.get('totalAmount'),
+                 'timestamp': order.get('timestamp')}
+        self._orders[order_id] = state
+        self._orders.move_to_end(order_id)
+        while len(self._orders) > self.max_size:
+            self._orders.popitem(last=False)
+        return dict(state)
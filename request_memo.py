@@ -0,0 +1,66 @@
+"""
+Request-scoped memo for upstream and Firestore lookups
+Repeated reads of the same document or endpoint inside one Flask request
+cost one fetch; the memo lives on flask.g and is dropped with the request
+"""
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+from flask import g, has_request_context
+
+from response_cache import detach
+
+_lock = threading.Lock()
+
+
+def _memo() -> Optional[dict]:
+    if not has_request_context():
+        # An app context alone (CLI, a background thread) may live for the whole process
+        return None
+    memo = g.get('_request_memo')
+    if memo is None:
+        with _lock:
+            memo = g.get('_request_memo')
+            if memo is None:
+                memo = g._request_memo = {}
+    return memo
+
+
+def get_or_load(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """Return the memoized value for ``key``, calling ``loader`` on the first lookup
+
+    ``key`` is a tuple namespaced by source, e.g. ('api', url) or
+    ('firestore', 'orders', order_id). Failed loads (exceptions or None) are
+    not memoized, and outside a request the loader is simply called.
+    Dict/list results are detached so views can annotate them without
+    affecting later lookups.
+    """
+    memo = _memo()
+    if memo is None:
+        return loader()
+    if key in memo:
+        return detach(memo[key])
+    value = loader()
+    if value is not None:
+        memo[key] = value
+    return detach(value)
+
+
+def put(key: Hashable, value: Any):
+    """Seed the memo with a value fetched some other way (e.g. from a list)"""
+    memo = _memo()
+    if memo is not None:
+        memo[key] = value
+
+
+def forget(*prefix: Hashable):
+    """Drop memoized entries whose key starts with ``prefix`` (all entries if empty)
+
+    Writes call this so a read after a write in the same request sees the new data.
+    """
+    memo = _memo()
+    if memo is None:
+        return
+    for key in list(memo):
+        if key[:len(prefix)] == prefix:
+            memo.pop(key, None)
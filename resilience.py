@@ -0,0 +1,132 @@
+"""
+Resilience primitives for upstream API calls
+Deadline budgets, jittered retry backoff and per-endpoint circuit breakers,
+so a slow API server cannot pin every worker for the full timeout
+"""
+import os
+import random
+import threading
+import time
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+CALL_BUDGET = float(os.environ.get('API_CALL_BUDGET', 8))          # seconds per upstream call, retries included
+CONNECT_TIMEOUT = float(os.environ.get('API_CONNECT_TIMEOUT', 3.05))
+GET_RETRIES = int(os.environ.get('API_GET_RETRIES', 2))
+BREAKER_THRESHOLD = int(os.environ.get('API_BREAKER_THRESHOLD', 5))  # consecutive failures before opening
+BREAKER_RESET = float(os.environ.get('API_BREAKER_RESET', 30))       # seconds open before a trial call
+RETRYABLE_STATUS = (429, 502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while an endpoint's breaker is open"""
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when a call's time budget is spent"""
+
+
+class Deadline:
+    """Time budget shared by every attempt of one call"""
+
+    def __init__(self, budget: float = CALL_BUDGET):
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self) -> Tuple[float, float]:
+        """(connect, read) timeout for the next attempt"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded('API call deadline exceeded')
+        return (min(CONNECT_TIMEOUT, remaining), remaining)
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 2.0) -> float:
+    """Full-jitter exponential backoff for the given retry number (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def endpoint_key(url: str) -> str:
+    """Breaker key: host plus the resource part of the path
+
+    '/api/admin/orders/abc/assign-driver' -> 'host/api/admin/orders',
+    '/api/products/123/stock' -> 'host/api/products'
+    """
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.split('/') if s]
+    depth = 3 if len(segments) > 1 and segments[1] == 'admin' else 2
+    return f"{parts.netloc}/{'/'.join(segments[:depth])}"
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open trial after a cool-down"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that says nothing about the endpoint (e.g. a 429) so a half-open trial can be retried"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class BreakerRegistry:
+    """One CircuitBreaker per endpoint key"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(self.threshold, self.reset_timeout)
+            return breaker
+
+    def states(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {key: {'state': b.state, 'failures': b.failures} for key, b in self._breakers.items()}
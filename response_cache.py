@@ -0,0 +1,239 @@
+"""
+Response caches for FrizzlyAPIClient
+ValidatorCache keeps ETag / Last-Modified validators and parsed bodies per URL
+so unchanged list endpoints come back as a 304 and are never re-parsed
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+VALIDATOR_CACHE_MAX_ENTRIES = int(os.environ.get('API_VALIDATOR_CACHE_ENTRIES', 256))
+VALIDATOR_CACHE_MAX_BYTES = int(os.environ.get('API_VALIDATOR_CACHE_BYTES', 32 * 1024 * 1024))
+POLICY_CACHE_MAX_ENTRIES = int(os.environ.get('API_POLICY_CACHE_ENTRIES', 512))
+POLICY_CACHE_STALE_SECONDS = float(os.environ.get('API_POLICY_CACHE_STALE_SECONDS', 600))  # keep expired bodies for serve-stale
+
+
+def detach(body: Any) -> Any:
+    """Cheap copy of a cached JSON body so callers can annotate it safely
+
+    Copies the top-level dict and any list of dicts one level deep, which covers
+    how views mutate API results (adding 'createdAt', 'id', ...). Deeper nested
+    values are still shared and must be treated as read-only.
+    """
+    if isinstance(body, dict):
+        return {k: detach(v) if isinstance(v, list) else (dict(v) if isinstance(v, dict) else v)
+                for k, v in body.items()}
+    if isinstance(body, list):
+        return [dict(item) if isinstance(item, dict) else item for item in body]
+    return body
+
+
+class ValidatorCache:
+    """Bounded LRU of {url: (etag, last_modified, parsed body, size)}"""
+
+    def __init__(self, max_entries: int = VALIDATOR_CACHE_MAX_ENTRIES,
+                 max_bytes: int = VALIDATOR_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a cached URL"""
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get(self, url: str) -> Optional[Any]:
+        """Cached parsed body for a URL (marks it recently used)"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            self._entries.move_to_end(url)
+            return entry['body']
+
+    def revalidated(self, url: str) -> Optional[Any]:
+        """Record a 304 and return a detached copy of the cached body"""
+        body = self.get(url)
+        with self._lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return detach(body) if body is not None else None
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], body: Any, size: int):
+        """Remember a 200 response that carried validators"""
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old:
+                self._bytes -= old['size']
+            if not (etag or last_modified) or size > self.max_bytes:
+                return
+            self._entries[url] = {'etag': etag, 'last_modified': last_modified, 'body': body, 'size': size}
+            self._bytes += size
+            self.misses += 1
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted['size']
+                self.evictions += 1
+
+    def invalidate(self, url_prefix: str):
+        """Drop entries whose URL starts with the prefix"""
+        with self._lock:
+            for url in [u for u in self._entries if u.startswith(url_prefix)]:
+                self._bytes -= self._entries.pop(url)['size']
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+
+class PolicyCache:
+    """Bounded LRU TTL cache of parsed read results, keyed by read method name and params
+
+    Keying by method lets a write drop every cached variant of a read (all
+    params, all tokens) in one call. Expired entries stay ``stale_seconds``
+    longer for ``get_stale`` (serving the last good body while an endpoint
+    fails) and are dropped after that when touched or on the next insert.
+    """
+
+    def __init__(self, max_entries: int = POLICY_CACHE_MAX_ENTRIES,
+                 stale_seconds: float = POLICY_CACHE_STALE_SECONDS):
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self._entries = OrderedDict()  # (name, key) -> (body, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _lookup(self, name: str, key: str, now: float) -> Optional[tuple]:
+        entry = self._entries.get((name, key))
+        if entry is None:
+            return None
+        if entry[1] + self.stale_seconds < now:
+            del self._entries[(name, key)]
+            return None
+        self._entries.move_to_end((name, key))
+        return entry
+
+    def get(self, name: str, key: str) -> Optional[Any]:
+        """Fresh cached body for a read, detached for the caller"""
+        now = time.time()
+        with self._lock:
+            entry = self._lookup(name, key, now)
+            if entry is None or entry[1] < now:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return detach(entry[0])
+
+    def get_stale(self, name: str, key: str) -> Optional[Any]:
+        """Last cached body for a read even if its TTL has passed (within ``stale_seconds``)"""
+        with self._lock:
+            entry = self._lookup(name, key, time.time())
+        return detach(entry[0]) if entry is not None else None
+
+    def set(self, name: str, key: str, body: Any, ttl_seconds: float):
+        now = time.time()
+        with self._lock:
+            self._entries.pop((name, key), None)
+            self._entries[(name, key)] = (body, now + ttl_seconds)
+            for cache_key in [k for k, entry in self._entries.items() if entry[1] + self.stale_seconds < now]:
+                del self._entries[cache_key]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *names: str):
+        """Drop every cached result of the named reads"""
+        with self._lock:
+            for name in names:
+                keys = [k for k in self._entries if k[0] == name]
+                for cache_key in keys:
+                    del self._entries[cache_key]
+                if keys:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'invalidations': self.invalidations, 'evictions': self.evictions}
+
+
+class EntityCache:
+    """TTL cache of single entities by id, filled from list and detail fetches
+
+    Lets a detail view (e.g. the product edit form) render from one lookup
+    instead of fetching and scanning the whole collection.
+    """
+
+    def __init__(self, ttl_seconds: float, id_field: str = 'id'):
+        self.ttl_seconds = ttl_seconds
+        self.id_field = id_field
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, entity_id: str) -> Optional[Dict]:
+        """Fresh cached entity, copied for the caller"""
+        with self._lock:
+            entry = self._entries.get(entity_id)
+            if entry is None or entry[1] < time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+        return dict(entry[0])
+
+    def set(self, entity: Dict):
+        entity_id = entity.get(self.id_field)
+        if entity_id:
+            with self._lock:
+                self._entries[entity_id] = (dict(entity), time.time() + self.ttl_seconds)
+
+    def set_many(self, entities: List[Dict]):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            for entity in entities:
+                entity_id = entity.get(self.id_field)
+                if entity_id:
+                    self._entries[entity_id] = (dict(entity), expires_at)
+
+    def invalidate(self, *entity_ids: str):
+        """Drop the given entities (all of them if no ids are given)"""
+        with self._lock:
+            if not entity_ids:
+                self._entries.clear()
+            for entity_id in entity_ids:
+                self._entries.pop(entity_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
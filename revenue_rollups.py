@@ -0,0 +1,310 @@
+"""
+Daily revenue rollups in Firestore
+One document per day (stats/revenue/days/{YYYY-MM-DD}) with order count,
+delivered count and revenue, pending revenue and revenue per status. A date
+range is answered by summing its day documents, one read per day.
+
+A ledger (stats/revenue/orders/{id}) keeps the state each order was last
+counted with, so every created, updated or deleted order is applied exactly
+once from ledger to current state, however old the order is. The same
+transaction applies the change to the order counter shards (counter_shards.py). The feed sees
+orders by their ``timestamp`` (creation) and ``updatedAt`` (status changes
+made through this dashboard); writers that change an order without touching
+``updatedAt`` are only caught by the periodic repair of the last
+REVENUE_REPAIR_DAYS days, or by a rebuild of the affected range.
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from firebase_admin import firestore
+from extensions import firestore_extension
+from event_bus import BusSubscription
+from counter_shards import ShardedCounter, order_shards
+from order_stats import REVENUE_STATUS, stats_delta
+
+logger = logging.getLogger(__name__)
+
+REVENUE_ROLLUPS_PATH = os.environ.get('REVENUE_ROLLUPS_PATH', 'stats/revenue/days')
+REVENUE_LEDGER_PATH = os.environ.get('REVENUE_LEDGER_PATH', 'stats/revenue/orders')
+REVENUE_REPAIR_DAYS = int(os.environ.get('REVENUE_REPAIR_DAYS', 7))            # covers the usual order-to-delivery lag
+REVENUE_REPAIR_INTERVAL = float(os.environ.get('REVENUE_REPAIR_INTERVAL', 21600))  # seconds between repairs
+REVENUE_FEED_WINDOW = float(os.environ.get('REVENUE_FEED_WINDOW', 3600))        # seconds before the feed queries restart
+REVENUE_FEED_OVERLAP = 300  # seconds a restarted feed looks back (re-recording is a no-op)
+REVENUE_MAX_RANGE_DAYS = 366
+ROLLUP_COUNTERS = ('order_count', 'delivered_count', 'delivered_revenue', 'pending_revenue')
+BATCH_SIZE = 400  # Firestore allows 500 writes per batch
+
+
+def day_of(order: Dict) -> Optional[str]:
+    """Local calendar day of the order's timestamp (seconds or milliseconds)"""
+    ts = order.get('timestamp')
+    if not isinstance(ts, (int, float)) or not ts:
+        return None
+    return datetime.fromtimestamp(ts / 1000 if ts > 1e12 else ts).strftime('%Y-%m-%d')
+
+
+def parse_day(value: Optional[str]) -> Optional[date]:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _amount(order: Dict) -> float:
+    try:
+        return float(order.get('totalAmount') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def counted_state(order: Dict) -> Dict[str, Any]:
+    """The fields of an order the rollups depend on, as kept in the ledger"""
+    return {'status': order.get('status') or 'UNKNOWN', 'totalAmount': _amount(order),
+            'timestamp': order.get('timestamp')}
+
+
+def _increments(changes: Dict[str, Any]) -> Dict[str, Any]:
+    fields = {key: firestore.Increment(value) for key, value in changes.items() if key != 'revenue_by_status'}
+    if 'revenue_by_status' in changes:
+        fields['revenue_by_status'] = {status: firestore.Increment(value)
+                                       for status, value in changes['revenue_by_status'].items()}
+    return fields
+
+
+def _add_order(bucket: Dict[str, Any], order: Dict, sign: int = 1):
+    amount = sign * _amount(order)
+    status = order.get('status') or 'UNKNOWN'
+    bucket['order_count'] = bucket.get('order_count', 0) + sign
+    if status == REVENUE_STATUS:
+        bucket['delivered_count'] = bucket.get('delivered_count', 0) + sign
+        bucket['delivered_revenue'] = bucket.get('delivered_revenue', 0) + amount
+    elif status == 'PENDING':
+        bucket['pending_revenue'] = bucket.get('pending_revenue', 0) + amount
+    by_status = bucket.setdefault('revenue_by_status', {})
+    by_status[status] = by_status.get(status, 0) + amount
+
+
+def rollup_delta(before: Optional[Dict], after: Optional[Dict]) -> Dict[str, Dict[str, Any]]:
+    """Day -> bucket changes for one order going from ``before`` to ``after``
+
+    ``before=None`` is a new order, ``after=None`` a deleted one; unchanged
+    fields are left out.
+    """
+    days = defaultdict(dict)
+    for order, sign in ((before, -1), (after, 1)):
+        day = day_of(order) if order else None
+        if day:
+            _add_order(days[day], order, sign)
+    delta = {}
+    for day, bucket in days.items():
+        by_status = {status: round(value, 2) for status, value in bucket.pop('revenue_by_status', {}).items()
+                     if round(value, 2)}
+        changes = {key: round(value, 2) for key, value in bucket.items() if round(value, 2)}
+        if by_status:
+            changes['revenue_by_status'] = by_status
+        if changes:
+            delta[day] = changes
+    return delta
+
+
+class RevenueRollups:
+    """Day documents under ``path`` and their ledger: updates, range queries, rebuilds
+
+    Recorded changes also increment ``counter`` (a ShardedCounter), if given.
+    """
+
+    def __init__(self, path: str = REVENUE_ROLLUPS_PATH, ledger_path: str = REVENUE_LEDGER_PATH,
+                 counter: Optional[ShardedCounter] = None):
+        self.path = path
+        self.ledger_path = ledger_path
+        self.counter = counter
+        self.updates = 0
+        self.write_errors = 0
+        self._repaired_at = 0.0
+
+    def _collection(self):
+        return firestore_extension.db.collection(self.path)
+
+    def record(self, order_id: str, order: Optional[Dict], created: bool = True) -> bool:
+        """Bring the rollups from the ledger's state of the order to ``order`` (None = deleted)
+
+        Runs in a transaction with the ledger entry, so recording the same
+        state twice changes nothing. Returns whether any day changed.
+        An order missing from the ledger is added to the counter only if it
+        was ``created`` since the feed started; the counter's state of an
+        older one is unknown, and reconciliation covers it.
+        """
+        db = firestore_extension.db
+        ledger_ref = db.collection(self.ledger_path).document(order_id)
+        after = counted_state(order) if order is not None else None
+
+        @firestore.transactional
+        def apply(transaction):
+            snapshot = ledger_ref.get(transaction=transaction)
+            before = snapshot.to_dict() if snapshot.exists else None
+            if before == after:
+                return False
+            delta = rollup_delta(before, after)
+            for day, changes in delta.items():
+                transaction.set(self._collection().document(day), {'date': day, **_increments(changes)}, merge=True)
+            if self.counter is not None and (before is not None or created):
+                self.counter.increment(stats_delta(before, after), transaction=transaction)
+            if after is None:
+                transaction.delete(ledger_ref)
+            else:
+                transaction.set(ledger_ref, after)
+            return bool(delta)
+
+        changed = apply(db.transaction())
+        if changed:
+            self.updates += 1
+        return changed
+
+    def follow(self, window: float = REVENUE_FEED_WINDOW) -> BusSubscription:
+        """Record every order created or updated from now on (the stats writer's feed)
+
+        Two listeners, on ``timestamp`` and ``updatedAt``. They are replaced
+        every ``window`` seconds so their result sets stay small; the new pair
+        starts before the old one stops and looks back REVENUE_FEED_OVERLAP
+        seconds, which also covers a writer hand-over.
+        """
+        stop = threading.Event()
+
+        started_at = time.time() - REVENUE_FEED_OVERLAP
+
+        def on_snapshot(col_snapshot, changes, read_time):
+            for change in changes:
+                doc = change.document
+                # Neither field moves an order out of its query, so REMOVED is a deletion
+                order = None if change.type.name == 'REMOVED' else doc.to_dict()
+                created = doc.create_time is not None and doc.create_time.timestamp() >= started_at
+                try:
+                    self.record(doc.id, order, created)
+                except Exception as e:
+                    # The next repair (or a rebuild) restores the lost change
+                    self.write_errors += 1
+                    logger.warning(f"Revenue rollups: recording {doc.id} failed: {e}")
+
+        def listen():
+            since = time.time() - REVENUE_FEED_OVERLAP
+            orders = firestore_extension.db.collection('orders')
+            return [
+                orders.where('timestamp', '>=', int(since * 1000)).on_snapshot(on_snapshot),
+                orders.where('updatedAt', '>=', datetime.fromtimestamp(since, timezone.utc)).on_snapshot(on_snapshot),
+            ]
+
+        def run():
+            watches = listen()
+            while not stop.wait(window):
+                try:
+                    replacement = listen()
+                except Exception as e:
+                    logger.warning(f"Revenue rollups: could not restart the feed: {e}")
+                    continue
+                for watch in watches:
+                    watch.unsubscribe()
+                watches = replacement
+            for watch in watches:
+                watch.unsubscribe()
+
+        threading.Thread(target=run, name='revenue-rollups', daemon=True).start()
+        return BusSubscription(stop.set)
+
+    def query(self, start: date, end: date) -> Dict[str, Any]:
+        """Revenue summary of the days ``start``..``end`` (inclusive), one read per stored day"""
+        if (end - start).days >= REVENUE_MAX_RANGE_DAYS:
+            raise ValueError(f"Date range is limited to {REVENUE_MAX_RANGE_DAYS} days")
+        daily_revenue = {(start + timedelta(days=i)).strftime('%Y-%m-%d'): 0.0
+                         for i in range((end - start).days + 1)}
+        totals = dict.fromkeys(ROLLUP_COUNTERS, 0)
+        revenue_by_status = defaultdict(float)
+        docs = (self._collection()
+                .where('date', '>=', start.strftime('%Y-%m-%d'))
+                .where('date', '<=', end.strftime('%Y-%m-%d'))
+                .stream())
+        for doc in docs:
+            data = doc.to_dict()
+            for key in ROLLUP_COUNTERS:
+                totals[key] += data.get(key) or 0
+            for status, value in (data.get('revenue_by_status') or {}).items():
+                revenue_by_status[status] += value
+            daily_revenue[data['date']] = round(data.get('delivered_revenue') or 0, 2)
+
+        total_revenue = round(totals['delivered_revenue'], 2)
+        delivered_count = totals['delivered_count']
+        return {
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
+            'total_revenue': total_revenue,
+            'completed_revenue': total_revenue,
+            'pending_revenue': round(totals['pending_revenue'], 2),
+            'avg_order_value': round(total_revenue / delivered_count, 2) if delivered_count > 0 else 0,
+            'delivered_count': delivered_count,
+            'order_count': totals['order_count'],
+            'daily_revenue': daily_revenue,
+            'revenue_by_status': {status: round(value, 2) for status, value in revenue_by_status.items()
+                                  if round(value, 2)},
+        }
+
+    def rebuild(self, start: date, end: date) -> int:
+        """Recompute the days ``start``..``end`` from the orders themselves; returns orders read
+
+        Used to backfill history and to repair days the change feed missed.
+        The ledger entries of the range are rewritten with the days. Changes
+        recorded while a day is rewritten are lost until its next rebuild.
+        """
+        start_ms = int(datetime.combine(start, datetime.min.time()).timestamp() * 1000)
+        end_ms = int(datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp() * 1000)
+        buckets = {(start + timedelta(days=i)).strftime('%Y-%m-%d'): {}
+                   for i in range((end - start).days + 1)}
+        ledger = []
+        orders = (firestore_extension.db.collection('orders')
+                  .where('timestamp', '>=', start_ms)
+                  .where('timestamp', '<', end_ms)
+                  .stream())
+        for doc in orders:
+            order = doc.to_dict()
+            day = day_of(order)
+            if day in buckets:
+                _add_order(buckets[day], order)
+                ledger.append((doc.id, counted_state(order)))
+        self._write(buckets.items(), ledger)
+        logger.info(f"Revenue rollups: rebuilt {len(buckets)} days from {len(ledger)} orders")
+        return len(ledger)
+
+    def _write(self, days: Iterable[Tuple[str, Dict[str, Any]]], ledger: Iterable[Tuple[str, Dict[str, Any]]]):
+        db = firestore_extension.db
+        writes = []
+        for day, bucket in days:
+            document = {key: round(bucket.get(key, 0), 2) for key in ROLLUP_COUNTERS}
+            document['revenue_by_status'] = {status: round(value, 2)
+                                             for status, value in bucket.get('revenue_by_status', {}).items()}
+            writes.append((self._collection().document(day), {'date': day, **document}))
+        for order_id, state in ledger:
+            writes.append((db.collection(self.ledger_path).document(order_id), state))
+        for offset in range(0, len(writes), BATCH_SIZE):
+            batch = db.batch()
+            for ref, document in writes[offset:offset + BATCH_SIZE]:
+                batch.set(ref, document)
+            batch.commit()
+
+    def repair_recent(self, days: int = REVENUE_REPAIR_DAYS) -> int:
+        """Rebuild the last ``days`` days, at most every REVENUE_REPAIR_INTERVAL seconds"""
+        if time.time() - self._repaired_at < REVENUE_REPAIR_INTERVAL:
+            return 0
+        today = date.today()
+        read = self.rebuild(today - timedelta(days=days - 1), today)
+        self._repaired_at = time.time()
+        return read
+
+    def stats(self) -> Dict[str, Any]:
+        return {'path': self.path, 'updates': self.updates, 'write_errors': self.write_errors}
+
+
+# Global instance
+revenue_rollups = RevenueRollups(counter=order_shards)
@@ -0,0 +1,478 @@
+"""
+Multiplexed Server-Sent Events hub
+Holds one event source per process (an upstream SSE stream or a Firestore
+listener) and fans each event out to every connected browser as pre-serialized bytes through bounded queues
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+SSE_CLIENT_QUEUE = int(os.environ.get('SSE_CLIENT_QUEUE', 100))    # frames buffered per browser
+SSE_REPLAY_SIZE = int(os.environ.get('SSE_REPLAY_SIZE', 200))      # recent frames kept for Last-Event-ID resume
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', 25))         # seconds between keep-alive comments
+SSE_MAX_CLIENT_AGE = float(os.environ.get('SSE_MAX_CLIENT_AGE', 3600))  # browsers reconnect after this
+SSE_BATCH_INTERVAL = float(os.environ.get('SSE_BATCH_INTERVAL', 0.25))  # events gathered per frame (0 = frame per event)
+SSE_SLOW_CONSUMER_GRACE = float(os.environ.get('SSE_SLOW_CONSUMER_GRACE', 30))  # backed-up browsers are dropped after this
+
+HEARTBEAT_FRAME = b': heartbeat\n\n'
+
+
+def encode_event(event_type: Optional[str], data: str, event_id: Optional[int] = None) -> bytes:
+    """Serialize one SSE frame (done once per event, not once per client)"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    if event_type:
+        lines.append(f'event: {event_type}')
+    lines.extend(f'data: {line}' for line in data.split('\n'))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    """Last-Event-ID header / lastEventId query value as an int (None if absent or foreign)"""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class EventLog:
+    """Bounded replay buffer of encoded frames with monotonically increasing ids
+
+    Ids start from the boot time in milliseconds, so ids from an earlier
+    process are older than anything this one has and resume as a resync.
+    Appends with a ``dedupe_key`` already in the buffer (e.g. the same
+    Firestore change seen by two listeners) return the existing entry.
+    Events relayed over an event bus carry the id the leader gave them, so
+    every worker's log agrees on ids. An empty log starts at the first such
+    id (older ones resync); after that an id at or below the last is dropped.
+    """
+
+    def __init__(self, size: int = SSE_REPLAY_SIZE):
+        self._entries = deque(maxlen=size)  # (id, frame, dedupe_key)
+        self._keys = {}                     # dedupe_key -> (id, frame)
+        self._last_id = int(time.time() * 1000)
+        self._first_id = self._last_id + 1
+        self._lock = threading.Lock()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def append(self, event_type: Optional[str], data: str, dedupe_key: Any = None,
+               event_id: Optional[int] = None) -> Tuple[int, bytes, bool]:
+        """Record an event (with the next id, or ``event_id``); returns (id, frame, is_new)"""
+        with self._lock:
+            if dedupe_key is not None and dedupe_key in self._keys:
+                existing_id, frame = self._keys[dedupe_key]
+                return existing_id, frame, False
+            if event_id is not None:
+                if not self._entries:
+                    self._first_id = event_id  # events before the first relayed one were never seen here
+                elif event_id <= self._last_id:
+                    return event_id, b'', False
+            self._last_id = self._last_id + 1 if event_id is None else event_id
+            frame = encode_event(event_type, data, self._last_id)
+            if len(self._entries) == self._entries.maxlen:
+                evicted = self._entries[0]
+                self._first_id = evicted[0] + 1
+                self._keys.pop(evicted[2], None)
+            self._entries.append((self._last_id, frame, dedupe_key))
+            if dedupe_key is not None:
+                self._keys[dedupe_key] = (self._last_id, frame)
+            return self._last_id, frame, True
+
+    def since(self, last_id: int) -> Optional[List[Tuple[int, bytes]]]:
+        """Frames after ``last_id``, or None if some of them are no longer buffered"""
+        with self._lock:
+            if last_id > self._last_id or last_id < self._first_id - 1:
+                return None
+            return [(event_id, frame) for event_id, frame, _ in self._entries if event_id > last_id]
+
+    def resync_frame(self) -> bytes:
+        """Tells a client that missed too much to refetch, and moves its id forward"""
+        return encode_event('resync', json.dumps({'type': 'resync'}), self._last_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Subscription:
+    """One browser connection: a bounded queue of encoded frames
+
+    A full queue loses its oldest frame. A browser whose queue stays
+    backed up for ``slow_grace`` seconds is marked ``evicted``; its stream
+    then ends and the browser reconnects with Last-Event-ID (getting a
+    replay or a resync) instead of reading ever older events.
+    """
+
+    def __init__(self, token: Optional[str], maxsize: int = SSE_CLIENT_QUEUE,
+                 slow_grace: float = SSE_SLOW_CONSUMER_GRACE):
+        self.token = token
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.slow_grace = slow_grace
+        self.dropped = 0
+        self.connected_at = time.time()
+        self.backed_up_since = None
+        self.evicted = False
+        self.replayed_to = 0  # last event id already queued by a Last-Event-ID replay
+
+    def offer(self, frame: bytes):
+        """Enqueue without blocking the fan-out"""
+        if self.evicted:
+            return
+        if self.queue.full():
+            now = time.time()
+            if self.backed_up_since is None:
+                self.backed_up_since = now
+            elif now - self.backed_up_since > self.slow_grace:
+                self.evicted = True
+                return
+        while True:
+            try:
+                self.queue.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class FanoutHub:
+    """Fan-out of one event source to N subscribers
+
+    Every published event is encoded once, recorded in the replay log and
+    offered to each subscriber's queue. Subclasses decide how events arrive
+    (``_subscribers_changed`` runs after every subscribe/unsubscribe).
+    Listeners get every event ``(event_type, data)`` once, regardless of how
+    many browsers are open.
+    """
+
+    def __init__(self, replay_size: int = SSE_REPLAY_SIZE, client_queue: int = SSE_CLIENT_QUEUE,
+                 heartbeat: float = SSE_HEARTBEAT, batch_interval: float = SSE_BATCH_INTERVAL):
+        self.client_queue = client_queue
+        self.heartbeat = heartbeat
+        self.batch_interval = batch_interval
+        self._subscribers = set()
+        self.log = EventLog(replay_size)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._pending = {}      # coalesce key -> [event_id, frame, event_type, payload]
+        self._flusher = None
+        self.events = 0
+        self.coalesced = 0      # events merged into a pending event for the same order
+        self.batches = 0        # multi-event frames sent
+        self.batched_events = 0
+        self.slow_disconnects = 0
+        self._departed_dropped = 0
+
+    # ---- subscribers ----
+
+    def subscribe(self, token: Optional[str], last_event_id: Optional[int] = None) -> Subscription:
+        """Register a browser; with ``last_event_id`` the events it missed are queued first"""
+        subscription = Subscription(token, self.client_queue)
+        with self._lock:
+            if last_event_id is not None:
+                missed = self.log.since(last_event_id)
+                if missed is None or len(missed) > self.client_queue:
+                    subscription.offer(self.log.resync_frame())
+                else:
+                    for _, frame in missed:
+                        subscription.offer(frame)
+                subscription.replayed_to = self.log.last_id
+            self._subscribers.add(subscription)
+        self._subscribers_changed()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.discard(subscription)
+                self._departed_dropped += subscription.dropped
+                if subscription.evicted:
+                    self.slow_disconnects += 1
+        self._subscribers_changed()
+
+    def _subscribers_changed(self):
+        pass
+
+    def _has_subscribers(self) -> bool:
+        with self._lock:
+            return bool(self._subscribers)
+
+    def add_listener(self, listener: Callable[[Optional[str], str], None]):
+        """Call ``listener(event_type, data)`` for every event"""
+        self._listeners.append(listener)
+
+    def stream(self, subscription: Subscription, max_age: float = SSE_MAX_CLIENT_AGE) -> Iterator[bytes]:
+        """Response body for one browser: connected message, events, heartbeats"""
+        try:
+            yield encode_event(None, json.dumps({'type': 'connected'}))
+            while time.time() - subscription.connected_at < max_age and not subscription.evicted:
+                try:
+                    frame = subscription.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    frame = HEARTBEAT_FRAME
+                if subscription.queue.qsize() < self.client_queue // 2:
+                    subscription.backed_up_since = None
+                yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    # ---- publishing ----
+
+    def publish(self, event_type: Optional[str], data: str, dedupe_key: Any = None,
+                event_id: Optional[int] = None):
+        """Encode once with the next event id, remember for replay and hand to every subscriber
+
+        ``event_id`` is the id an event bus leader assigned (see EventLog).
+        Events whose ``dedupe_key`` is still in the replay log were already
+        published and are ignored. With a ``batch_interval`` events are
+        gathered and flushed as one frame; events for the same order id
+        within an interval are merged into one.
+        """
+        with self._lock:
+            event_id, frame, is_new = self.log.append(event_type, data, dedupe_key, event_id)
+            if not is_new:
+                return
+            self.events += 1
+            if self.batch_interval > 0:
+                self._buffer(event_id, frame, event_type, data)
+                subscribers = []
+            else:
+                subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(frame)
+        for listener in self._listeners:
+            try:
+                listener(event_type, data)
+            except Exception as e:
+                logger.error(f"SSE listener failed: {e}")
+
+    # ---- batching ----
+
+    def _buffer(self, event_id: int, frame: bytes, event_type: Optional[str], data: str):
+        """Add an event to the pending batch, merging it into a pending event for the same order"""
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            payload = data
+        order_id = payload.get('id') if isinstance(payload, dict) else None
+        key = order_id if order_id is not None else ('#', event_id)
+        pending = self._pending.get(key)
+        if pending is not None and isinstance(pending[3], dict):
+            self.coalesced += 1
+            # A new order that was updated before anyone saw it is still a new order
+            merged_type = pending[2] if pending[2] == 'new_order' else event_type
+            self._pending[key] = [event_id, None, merged_type, {**pending[3], **payload}]
+        else:
+            self._pending[key] = [event_id, frame, event_type, payload]
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='sse-batch', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.batch_interval)
+            with self._lock:
+                pending, self._pending = list(self._pending.values()), {}
+                if not pending:
+                    self._flusher = None
+                    return
+                subscribers = list(self._subscribers)
+            first_id = min(p[0] for p in pending)
+            frames = {}  # replay cutoff -> frame
+            for subscription in subscribers:
+                # Skip events a Last-Event-ID replay already queued for this browser
+                cutoff = subscription.replayed_to if subscription.replayed_to >= first_id else 0
+                if cutoff not in frames:
+                    frames[cutoff] = self._encode_batch([p for p in pending if p[0] > cutoff])
+                if frames[cutoff]:
+                    subscription.offer(frames[cutoff])
+
+    def _encode_batch(self, pending: List[list]) -> Optional[bytes]:
+        """One frame for the pending events (the original frame when there is just one)"""
+        if not pending:
+            return None
+        if len(pending) == 1:
+            event_id, frame, event_type, payload = pending[0]
+            if frame is not None:
+                return frame
+            return encode_event(event_type, json.dumps(payload), event_id)
+        with self._lock:
+            self.batches += 1
+            self.batched_events += len(pending)
+        events = [{'type': event_type, 'data': payload} for _, _, event_type, payload in pending]
+        return encode_event('batch', json.dumps(events), max(p[0] for p in pending))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers)
+            dropped = self._departed_dropped + sum(s.dropped for s in subscribers)
+        return {'subscribers': len(subscribers), 'events': self.events, 'dropped': dropped,
+                'coalesced': self.coalesced, 'batches': self.batches, 'batched_events': self.batched_events,
+                'slow_disconnects': self.slow_disconnects,
+                'replay': len(self.log), 'last_event_id': self.log.last_id}
+
+
+class WatchHub(FanoutHub):
+    """Fan-out of an in-process watch (e.g. a Firestore ``on_snapshot`` listener)
+
+    ``start_watch(publish)`` starts the watch, which calls ``publish(event_type,
+    data, dedupe_key)`` for each change, and returns a handle with
+    ``unsubscribe()``. The watch is shared and reference-counted by the
+    subscribers: started for the first one, stopped when the last one leaves.
+    """
+
+    def __init__(self, start_watch: Callable[[Callable], Any], **kwargs):
+        super().__init__(**kwargs)
+        self.start_watch = start_watch
+        self._watch = None
+        self._watch_lock = threading.Lock()
+        self.watch_starts = 0
+
+    def _subscribers_changed(self):
+        with self._watch_lock:
+            wanted = self._has_subscribers()
+            if wanted and self._watch is None:
+                try:
+                    self._watch = self.start_watch(self.publish)
+                    self.watch_starts += 1
+                    logger.info("SSE hub: watch started")
+                except Exception as e:
+                    # Subscribers get heartbeats only; the next subscribe retries
+                    logger.error(f"SSE hub: could not start watch: {e}")
+            elif not wanted and self._watch is not None:
+                watch, self._watch = self._watch, None
+                try:
+                    watch.unsubscribe()
+                except Exception as e:
+                    logger.warning(f"SSE hub: watch unsubscribe failed: {e}")
+                logger.info("SSE hub: no subscribers, watch stopped")
+
+    @property
+    def watching(self) -> bool:
+        return self._watch is not None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({'watching': self.watching, 'watch_starts': self.watch_starts})
+        return stats
+
+
+class SSEHub(FanoutHub):
+    """Fan-out of one upstream SSE stream to N subscribers
+
+    ``open_upstream(token)`` returns a streamed response (``iter_lines()`` /
+    ``close()``). The upstream is connected by a background thread while at
+    least one subscriber exists and reconnected with backoff on errors; the
+    newest subscriber's token is used.
+    """
+
+    def __init__(self, open_upstream: Callable[[str], Any], replay_size: int = SSE_REPLAY_SIZE,
+                 client_queue: int = SSE_CLIENT_QUEUE, heartbeat: float = SSE_HEARTBEAT,
+                 batch_interval: float = SSE_BATCH_INTERVAL):
+        super().__init__(replay_size, client_queue, heartbeat, batch_interval)
+        self.open_upstream = open_upstream
+        self._state_listeners = []
+        self._thread = None
+        self.upstream_connected = False
+        self.reconnects = 0
+
+    def _subscribers_changed(self):
+        with self._lock:
+            if self._subscribers and self._thread is None:
+                self._thread = threading.Thread(target=self._run_upstream, name='sse-upstream', daemon=True)
+                self._thread.start()
+
+    def add_state_listener(self, listener: Callable[[bool], None]):
+        """Call ``listener(connected)`` when the upstream connects or drops"""
+        self._state_listeners.append(listener)
+
+    def _set_connected(self, connected: bool):
+        if connected == self.upstream_connected:
+            return
+        self.upstream_connected = connected
+        for listener in self._state_listeners:
+            try:
+                listener(connected)
+            except Exception as e:
+                logger.error(f"SSE state listener failed: {e}")
+
+    # ---- upstream ----
+
+    def current_token(self) -> Optional[str]:
+        """Token of the newest subscriber (used for the upstream and follow-up fetches)"""
+        with self._lock:
+            newest = max(self._subscribers, key=lambda s: s.connected_at, default=None)
+        return newest.token if newest else None
+
+    def _run_upstream(self):
+        attempt = 0
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Decided under the lock so a concurrent subscribe starts a new thread
+                    self._thread = None
+                    logger.info("SSE hub: no subscribers, upstream closed")
+                    return
+            if attempt:
+                self.reconnects += 1
+                time.sleep(backoff_delay(min(attempt - 1, 5), base=1.0, cap=30.0))
+            response = None
+            try:
+                response = self.open_upstream(self.current_token())
+                response.raise_for_status()
+                self._set_connected(True)
+                attempt = 0
+                logger.info("SSE hub: upstream connected")
+                for event_type, data in self._parse(response.iter_lines()):
+                    self.publish(event_type, data)
+            except Exception as e:
+                logger.warning(f"SSE hub: upstream error: {e}")
+            finally:
+                self._set_connected(False)
+                if response is not None:
+                    response.close()
+            attempt += 1
+
+    def _parse(self, lines) -> Iterator[Tuple[Optional[str], str]]:
+        """SSE lines -> (event_type, data); comments and 'connected' frames are dropped"""
+        event_type, data = None, []
+        for line in lines:
+            if not self._has_subscribers():
+                return
+            line = line.decode('utf-8') if isinstance(line, bytes) else line
+            if not line:
+                if data:
+                    payload = '\n'.join(data)
+                    if event_type or not self._is_connected_message(payload):
+                        yield event_type, payload
+                event_type, data = None, []
+            elif line.startswith(':'):
+                continue
+            elif line.startswith('event:'):
+                event_type = line[6:].strip()
+            elif line.startswith('data:'):
+                data.append(line[5:].lstrip(' '))
+
+    @staticmethod
+    def _is_connected_message(payload: str) -> bool:
+        try:
+            return json.loads(payload).get('type') == 'connected'
+        except (ValueError, AttributeError):
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({'upstream_connected': self.upstream_connected, 'reconnects': self.reconnects})
+        return stats
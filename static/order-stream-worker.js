@@ -0,0 +1,92 @@
+// Shared order event stream: one EventSource for every tab of this origin.
+// Tabs connect through order-stream.js, which relays events to their handlers.
+const EVENT_TYPES = ['new_order', 'order_update', 'stats_delta', 'batch', 'resync'];
+const PORT_TIMEOUT_MS = 30000;  // tabs ping every 10s; silent ones are gone
+const MAX_RETRY_MS = 30000;
+
+const ports = new Map();  // MessagePort -> last ping time
+let streamUrl = '/api/stream-orders';
+let source = null;
+let retryTimer = null;
+let retryDelay = 1000;
+let lastEventId = null;
+let state = 'connecting';
+
+function broadcast(message) {
+    ports.forEach((_, port) => port.postMessage(message));
+}
+
+function setState(newState) {
+    state = newState;
+    broadcast({ kind: 'state', state });
+}
+
+function forward(e) {
+    // Resume from here after a reconnect (the server replays what was missed)
+    if (e.lastEventId) lastEventId = e.lastEventId;
+    broadcast({ kind: 'event', type: e.type, data: e.data, lastEventId: e.lastEventId });
+}
+
+function connect() {
+    retryTimer = null;
+    if (source || !ports.size) return;
+    setState('connecting');
+    source = new EventSource(lastEventId
+        ? streamUrl + '?lastEventId=' + encodeURIComponent(lastEventId)
+        : streamUrl);
+    source.onopen = function() {
+        retryDelay = 1000;
+        setState('open');
+    };
+    source.onmessage = forward;
+    EVENT_TYPES.forEach(type => source.addEventListener(type, forward));
+    source.onerror = function() {
+        source.close();
+        source = null;
+        setState('error');
+        if (ports.size && !retryTimer) {
+            retryTimer = setTimeout(connect, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, MAX_RETRY_MS);
+        }
+    };
+}
+
+function disconnectIfIdle() {
+    if (ports.size) return;
+    if (source) source.close();
+    if (retryTimer) clearTimeout(retryTimer);
+    source = null;
+    retryTimer = null;
+}
+
+onconnect = function(e) {
+    const port = e.ports[0];
+    ports.set(port, Date.now());
+    port.onmessage = function(m) {
+        const message = m.data;
+        if (message.kind === 'hello') {
+            if (message.url) streamUrl = message.url;
+            ports.set(port, Date.now());
+            port.postMessage({ kind: 'state', state });
+            connect();
+        } else if (message.kind === 'ping') {
+            // A tab back from the bfcache (after its 'bye') or from a long suspend
+            const returning = !ports.has(port);
+            ports.set(port, Date.now());
+            if (returning) connect();
+        } else if (message.kind === 'bye') {
+            ports.delete(port);
+            disconnectIfIdle();
+        }
+    };
+    port.start();
+};
+
+// Tabs that were closed without a 'bye' (crash, mobile suspend)
+setInterval(function() {
+    const now = Date.now();
+    ports.forEach((lastPing, port) => {
+        if (now - lastPing > PORT_TIMEOUT_MS) ports.delete(port);
+    });
+    disconnectIfIdle();
+}, PORT_TIMEOUT_MS / 3);
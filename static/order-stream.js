@@ -0,0 +1,175 @@
+// One order event stream per browser, shared by every tab and script.
+//
+//   orderStream.on('new_order', e => ...)   // e: {type, data, lastEventId}
+//   orderStream.onState(state => ...)       // 'connecting' | 'open' | 'error'
+//
+// A SharedWorker (order-stream-worker.js, given as data-worker on the script
+// tag) holds the only EventSource. Without SharedWorker, tabs elect a leader
+// (Web Locks, or a localStorage lease) that connects and relays events over a
+// BroadcastChannel. Without either, each tab connects on its own.
+(function() {
+    const STREAM_URL = '/api/stream-orders';
+    const EVENT_TYPES = ['new_order', 'order_update', 'stats_delta', 'batch', 'resync'];
+    const CHANNEL_NAME = 'frizzly-order-stream';
+    const LEADER_LOCK = 'frizzly-order-stream-leader';
+    const LEASE_KEY = 'frizzlyOrderStreamLeader';
+    const PING_MS = 10000;
+    const MAX_RETRY_MS = 30000;
+    const workerUrl = document.currentScript && document.currentScript.dataset.worker;
+
+    const handlers = {};
+    const stateHandlers = [];
+    let state = 'connecting';
+
+    function setState(newState) {
+        state = newState;
+        stateHandlers.forEach(handler => handler(state));
+    }
+
+    function receive(message) {
+        if (message.kind === 'state') {
+            setState(message.state);
+        } else if (message.kind === 'event') {
+            (handlers[message.type] || []).forEach(handler => {
+                try {
+                    handler(message);
+                } catch (err) {
+                    console.error('Order stream handler failed:', err);
+                }
+            });
+        }
+    }
+
+    window.orderStream = {
+        on: function(type, handler) {
+            (handlers[type] = handlers[type] || []).push(handler);
+        },
+        onState: function(handler) {
+            stateHandlers.push(handler);
+            handler(state);
+        },
+        get state() {
+            return state;
+        }
+    };
+
+    // A connection owned by this tab; messages go to onMessage
+    function openStream(onMessage, resumeFrom) {
+        let source = null;
+        let lastEventId = resumeFrom || null;
+        let retryDelay = 1000;
+        let retryTimer = null;
+
+        function forward(e) {
+            if (e.lastEventId) lastEventId = e.lastEventId;
+            onMessage({ kind: 'event', type: e.type, data: e.data, lastEventId: e.lastEventId });
+        }
+
+        function connect() {
+            onMessage({ kind: 'state', state: 'connecting' });
+            source = new EventSource(lastEventId
+                ? STREAM_URL + '?lastEventId=' + encodeURIComponent(lastEventId)
+                : STREAM_URL);
+            source.onopen = function() {
+                retryDelay = 1000;
+                onMessage({ kind: 'state', state: 'open' });
+            };
+            source.onmessage = forward;
+            EVENT_TYPES.forEach(type => source.addEventListener(type, forward));
+            source.onerror = function() {
+                source.close();
+                onMessage({ kind: 'state', state: 'error' });
+                retryTimer = setTimeout(connect, retryDelay);
+                retryDelay = Math.min(retryDelay * 2, MAX_RETRY_MS);
+            };
+        }
+
+        connect();
+        return {
+            close: function() {
+                clearTimeout(retryTimer);
+                source.close();
+            }
+        };
+    }
+
+    function useSharedWorker() {
+        const worker = new SharedWorker(workerUrl, { name: CHANNEL_NAME });
+        worker.port.onmessage = e => receive(e.data);
+        worker.port.start();
+        const hello = () => worker.port.postMessage({ kind: 'hello', url: STREAM_URL });
+        hello();
+        setInterval(() => worker.port.postMessage({ kind: 'ping' }), PING_MS);
+        window.addEventListener('pagehide', () => worker.port.postMessage({ kind: 'bye' }));
+        // Restored from the bfcache: the 'bye' may have closed the worker's stream
+        window.addEventListener('pageshow', e => {
+            if (e.persisted) hello();
+        });
+    }
+
+    function useBroadcastChannel() {
+        const channel = new BroadcastChannel(CHANNEL_NAME);
+        const tabId = Math.random().toString(36).slice(2);
+        let leading = null;  // this tab's stream while it is the leader
+        let lastEventId = null;
+
+        channel.onmessage = function(e) {
+            const message = e.data;
+            if (message.kind === 'hello') {
+                // A new follower asks for the connection state
+                if (leading) channel.postMessage({ kind: 'state', state });
+                return;
+            }
+            if (message.kind === 'event' && message.lastEventId) lastEventId = message.lastEventId;
+            receive(message);
+        };
+
+        function lead() {
+            // Pick up where the previous leader's last relayed event left off
+            leading = openStream(function(message) {
+                receive(message);
+                channel.postMessage(message);
+            }, lastEventId);
+        }
+
+        if (navigator.locks) {
+            // Held until this tab closes; the next waiting tab then takes over
+            navigator.locks.request(LEADER_LOCK, () => {
+                lead();
+                return new Promise(() => {});
+            });
+        } else {
+            const claim = function() {
+                const lease = JSON.parse(localStorage.getItem(LEASE_KEY) || 'null');
+                if (!lease || lease.tab === tabId || lease.expires < Date.now()) {
+                    localStorage.setItem(LEASE_KEY, JSON.stringify({ tab: tabId, expires: Date.now() + 3 * PING_MS }));
+                    if (!leading) lead();
+                } else if (leading) {
+                    // Another tab took the lease while this one was suspended
+                    leading.close();
+                    leading = null;
+                }
+            };
+            claim();
+            setInterval(claim, PING_MS);
+            window.addEventListener('pagehide', () => {
+                if (leading) localStorage.removeItem(LEASE_KEY);
+            });
+        }
+        channel.postMessage({ kind: 'hello' });
+    }
+
+    if (window.SharedWorker && workerUrl) {
+        try {
+            useSharedWorker();
+            return;
+        } catch (err) {
+            console.warn('SharedWorker unavailable, sharing the order stream over BroadcastChannel:', err);
+        }
+    }
+    if (window.BroadcastChannel) {
+        useBroadcastChannel();
+    } else {
+        openStream(receive);
+    }
+})();
@@ -0,0 +1,149 @@
+// Live orders table: applies new_order / order_update events from the shared
+// order stream (order-stream.js) as row-level inserts and updates.
+//
+//   OrdersLive.attach(tbody, {template, insertNew, maxRows, formatters, afterRender})
+//
+// Custom formatters return HTML, so they must escape order fields
+// (OrdersLive.escapeHtml) like the defaults do.
+//
+// Rows carry data-order-id; cells that show an order field carry
+// data-field="status" (etc.) and are rewritten by that field's formatter.
+// New rows are cloned from a <template> row, where __ID__ in attributes is
+// replaced by the order id. Events are merged per order and rendered at most
+// once per RENDER_INTERVAL_MS, so a burst of updates costs one DOM pass.
+(function() {
+    const RENDER_INTERVAL_MS = 250;
+
+    const STATUS_BADGES = {
+        PENDING: ['bg-warning text-dark', 'Pending'],
+        CONFIRMED: ['bg-info', 'Confirmed'],
+        PREPARING_ORDER: ['bg-primary', 'Preparing'],
+        ON_WAY: ['bg-primary', 'On Way'],
+        DELIVERED: ['bg-success', 'Delivered'],
+        CANCELLED: ['bg-danger', 'Cancelled']
+    };
+
+    function escapeHtml(value) {
+        const div = document.createElement('div');
+        div.textContent = value == null ? '' : String(value);
+        return div.innerHTML;
+    }
+
+    function formatDate(timestamp) {
+        // Epoch seconds or milliseconds -> 'YYYY-MM-DD HH:MM' (local time, like the server)
+        if (typeof timestamp !== 'number' || !timestamp) return null;
+        const date = new Date(timestamp > 1e12 ? timestamp : timestamp * 1000);
+        const pad = n => String(n).padStart(2, '0');
+        return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())} ` +
+               `${pad(date.getHours())}:${pad(date.getMinutes())}`;
+    }
+
+    // field -> order -> innerHTML (undefined leaves the cell as it is)
+    const DEFAULT_FORMATTERS = {
+        orderId: order => order.orderId ? '#' + escapeHtml(String(order.orderId).slice(-8)) : undefined,
+        customer: order => {
+            // Same as the server-rendered rows; customerName is only a fallback ('Unknown' when unset)
+            const customer = order.userId || order.customerName;
+            return customer ? escapeHtml(String(customer).slice(0, 30)) : undefined;
+        },
+        itemCount: order => order.itemCount !== undefined ? `${escapeHtml(order.itemCount)} items` : undefined,
+        totalAmount: order => order.totalAmount !== undefined ? '$' + Number(order.totalAmount).toFixed(2) : undefined,
+        status: order => {
+            if (!order.status) return undefined;
+            const [cls, label] = STATUS_BADGES[order.status] || ['bg-secondary', order.status];
+            return `<span class="badge ${cls}">${escapeHtml(label)}</span>`;
+        },
+        date: order => {
+            const date = formatDate(order.timestamp);
+            return date ? escapeHtml(date) : undefined;
+        }
+    };
+
+    function attach(tbody, options) {
+        options = options || {};
+        const formatters = Object.assign({}, DEFAULT_FORMATTERS, options.formatters || {});
+        const pending = new Map();  // order id -> {order, isNew}
+        let timer = null;
+        let lastRender = 0;
+
+        function rowFor(id) {
+            return tbody.querySelector(`tr[data-order-id="${CSS.escape(id)}"]`);
+        }
+
+        function patchRow(row, order) {
+            row.querySelectorAll('[data-field]').forEach(cell => {
+                const formatter = formatters[cell.dataset.field];
+                const html = formatter ? formatter(order) : undefined;
+                if (html !== undefined && cell.innerHTML !== html) cell.innerHTML = html;
+            });
+        }
+
+        function createRow(order) {
+            if (!options.template) return null;
+            const row = options.template.content.firstElementChild.cloneNode(true);
+            [row, ...row.querySelectorAll('*')].forEach(el => {
+                [...el.attributes].forEach(attr => {
+                    if (attr.value.includes('__ID__')) attr.value = attr.value.split('__ID__').join(order.id);
+                });
+            });
+            row.dataset.orderId = order.id;
+            return row;
+        }
+
+        function render() {
+            timer = null;
+            lastRender = Date.now();
+            const changes = [...pending.values()];
+            pending.clear();
+            let inserted = 0;
+            changes.forEach(({order, isNew}) => {
+                const row = rowFor(order.id);
+                if (row) {
+                    patchRow(row, order);
+                } else if (isNew && options.insertNew) {
+                    const newRow = createRow(order);
+                    if (!newRow) return;
+                    patchRow(newRow, order);
+                    tbody.querySelectorAll('tr:not([data-order-id])').forEach(empty => empty.remove());
+                    tbody.insertBefore(newRow, tbody.firstElementChild);
+                    newRow.classList.add('table-success');
+                    setTimeout(() => newRow.classList.remove('table-success'), 3000);
+                    inserted++;
+                }
+            });
+            if (inserted && options.maxRows) {
+                const rows = tbody.querySelectorAll('tr[data-order-id]');
+                for (let i = options.maxRows; i < rows.length; i++) rows[i].remove();
+            }
+            if (options.afterRender) options.afterRender(changes.map(change => change.order));
+        }
+
+        function schedule() {
+            if (timer) return;
+            const wait = Math.max(0, lastRender + RENDER_INTERVAL_MS - Date.now());
+            timer = setTimeout(() => requestAnimationFrame(render), wait);
+        }
+
+        function queue(order, isNew) {
+            if (!order || !order.id) return;
+            const existing = pending.get(order.id);
+            pending.set(order.id, existing
+                ? {order: Object.assign(existing.order, order), isNew: existing.isNew || isNew}
+                : {order: Object.assign({}, order), isNew});
+            schedule();
+        }
+
+        orderStream.on('new_order', e => queue(JSON.parse(e.data), true));
+        orderStream.on('order_update', e => queue(JSON.parse(e.data), false));
+        orderStream.on('batch', e => {
+            JSON.parse(e.data).forEach(event => {
+                if (event.type === 'new_order' || event.type === 'order_update') {
+                    queue(event.data, event.type === 'new_order');
+                }
+            });
+        });
+        OrdersLive.active = true;
+    }
+
+    window.OrdersLive = { attach, formatters: DEFAULT_FORMATTERS, escapeHtml, active: false };
+})();
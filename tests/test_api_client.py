@@ -0,0 +1,96 @@
+import json
+
+import pytest
+import requests
+
+from api_client import FrizzlyAPIClient, INVALIDATES
+
+BASE_URL = 'https://api.test'
+
+
+class Response:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode() if body is not None else b''
+        self.headers = headers or {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f'{self.status_code}', response=self)
+
+
+class Upstream:
+    """Transport stand-in: answers from a handler and records every call"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+        self.session = None
+
+    def request(self, method, url, token=None, headers=None, **kwargs):
+        self.calls.append((method, url, dict(headers or {})))
+        return self.handler(method, url, headers or {})
+
+
+@pytest.fixture
+def versioned():
+    """An API whose GET bodies change with a version bumped by the test"""
+    state = {'version': 1}
+
+    def handler(method, url, headers):
+        if method != 'GET':
+            return Response(200, {'success': True})
+        etag = f'"v{state["version"]}"'
+        if headers.get('If-None-Match') == etag:
+            return Response(304)
+        return Response(200, {'version': state['version'], 'url': url}, {'ETag': etag})
+
+    upstream = Upstream(handler)
+    return state, upstream, FrizzlyAPIClient(BASE_URL, admin_token='t', transport=upstream)
+
+
+def test_unchanged_get_is_revalidated_with_its_etag(versioned):
+    state, upstream, client = versioned
+    first = client._request('GET', '/api/orders')
+    first['annotated'] = True
+    again = client._request('GET', '/api/orders')
+    assert again == {'version': 1, 'url': BASE_URL + '/api/orders'}
+    assert upstream.calls[1][2]['If-None-Match'] == '"v1"'
+    assert client.validator_cache.stats()['hits'] == 1
+
+    state['version'] = 2
+    assert client._request('GET', '/api/orders')['version'] == 2
+
+
+def test_304_after_eviction_refetches_unconditionally(versioned):
+    _, upstream, client = versioned
+    client._request('GET', '/api/orders')
+    client.validator_cache.get = lambda url: None  # evicted between the request and the 304
+    assert client._request('GET', '/api/orders')['version'] == 1
+    assert [headers.get('If-None-Match') for _, _, headers in upstream.calls] == [None, '"v1"', None]
+
+
+def test_policy_reads_are_served_from_cache_until_a_write_invalidates_them(versioned):
+    state, upstream, client = versioned
+    assert client._request('GET', '/api/products', policy='get_products')['version'] == 1
+    state['version'] = 2
+    assert client._request('GET', '/api/products', policy='get_products')['version'] == 1
+    assert len(upstream.calls) == 1
+
+    client._request('PUT', '/api/products/p1', policy='update_product', json={'name': 'x'})
+    assert 'get_products' in INVALIDATES['update_product']
+    assert client._request('GET', '/api/products', policy='get_products')['version'] == 2
+
+
+def test_writes_only_drop_the_reads_they_invalidate(versioned):
+    state, upstream, client = versioned
+    client._request('GET', '/api/products', policy='get_products')
+    client._request('GET', '/api/drivers', policy='get_all_drivers')
+    state['version'] = 2
+    client._request('PUT', '/api/drivers/d1', policy='update_driver', json={})
+    assert client._request('GET', '/api/products', policy='get_products')['version'] == 1
+    assert client._request('GET', '/api/drivers', policy='get_all_drivers')['version'] == 2
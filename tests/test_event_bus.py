@@ -0,0 +1,118 @@
+import json
+import time
+
+from event_bus import BusSubscription, BusWatch, LeaderElection, LocalBroker, LocalBus
+from sse_hub import FanoutHub
+
+TTL = 0.15
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class Source:
+    """Event source that records which process started it"""
+
+    def __init__(self):
+        self.running = []
+        self.publish = None
+
+    def start(self, name):
+        def start_source(publish=None):
+            self.running.append(name)
+            self.publish = publish
+
+            def stop():
+                self.running.remove(name)
+            return BusSubscription(stop)
+        return start_source
+
+
+def test_local_lease_expires_without_renewal():
+    broker = LocalBroker()
+    a, b = LocalBus(broker), LocalBus(broker)
+    assert a.acquire_leadership('lease', TTL)
+    assert not b.acquire_leadership('lease', TTL)
+    time.sleep(TTL * 1.5)
+    assert b.acquire_leadership('lease', TTL)
+    assert not a.acquire_leadership('lease', TTL)
+
+
+def test_election_runs_one_source_and_fails_over_on_release():
+    broker = LocalBroker()
+    source = Source()
+    elections = [LeaderElection(LocalBus(broker), 'orders', source.start(name), TTL) for name in 'ab']
+    stops = [election.start() for election in elections]
+    try:
+        assert wait_for(lambda: len(source.running) == 1)
+        time.sleep(TTL)
+        assert len(source.running) == 1
+        leader = 'ab'.index(source.running[0])
+        stops[leader].close()
+        assert wait_for(lambda: source.running == ['ab'[1 - leader]])
+        assert elections[1 - leader].leading
+    finally:
+        for stop in stops:
+            stop.close()
+    assert wait_for(lambda: not source.running)
+
+
+class FlakyLeases(LocalBus):
+    """A process that stops reaching the lease store without releasing its lease"""
+
+    down = False
+
+    def acquire_leadership(self, name, ttl):
+        if self.down:
+            raise ConnectionError('lease store unreachable')
+        return super().acquire_leadership(name, ttl)
+
+
+def test_election_fails_over_when_the_leader_cannot_renew():
+    broker = LocalBroker()
+    source = Source()
+    a, b = FlakyLeases(broker), LocalBus(broker)
+    first = LeaderElection(a, 'orders', source.start('a'), TTL)
+    stop_a = first.start()
+    assert wait_for(lambda: source.running == ['a'])
+    second = LeaderElection(b, 'orders', source.start('b'), TTL)
+    stop_b = second.start()
+    try:
+        a.down = True
+        assert wait_for(lambda: source.running == ['b'])
+        assert not first.leading
+    finally:
+        stop_a.close()
+        stop_b.close()
+
+
+def test_bus_watch_delivers_once_with_the_same_ids_everywhere():
+    broker = LocalBroker()
+    source = Source()
+    hubs = [FanoutHub(batch_interval=0), FanoutHub(batch_interval=0)]
+    watches = [BusWatch(LocalBus(broker), 'orders', source.start(name), TTL) for name in 'ab']
+    subscriptions = [watch.start(hub.publish) for watch, hub in zip(watches, hubs)]
+    try:
+        assert wait_for(lambda: source.publish is not None)
+        for n in range(3):
+            source.publish('new_order', json.dumps({'id': f'o{n}'}), ('o', n))
+        # The same change seen twice by the source is delivered once
+        source.publish('new_order', json.dumps({'id': 'o0'}), ('o', 0))
+
+        logs = [hub.log for hub in hubs]
+        assert [len(log) for log in logs] == [3, 3]
+        ids = [[event_id for event_id, _ in log.since(log.last_id - 3)] for log in logs]
+        assert ids[0] == ids[1]
+        assert ids[0] == sorted(set(ids[0]))
+        # A Last-Event-ID from one worker resumes at the same event on the other
+        assert [event_id for event_id, _ in logs[1].since(ids[0][0])] == ids[0][1:]
+        assert sum(watch.relayed for watch in watches) == 4
+    finally:
+        for subscription in subscriptions:
+            subscription.close()
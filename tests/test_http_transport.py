@@ -0,0 +1,127 @@
+import pytest
+import requests
+
+import http_transport
+from http_transport import HTTPTransport
+from resilience import CircuitOpenError, Deadline, DeadlineExceeded, endpoint_key
+
+URL = 'https://api.test/api/products'
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Upstream(HTTPTransport):
+    """Transport whose sends play back a script of responses and exceptions"""
+
+    def __init__(self, *outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    def _send(self, method, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return Response(outcome)
+
+    @property
+    def breaker(self):
+        return self.breakers.get(endpoint_key(URL))
+
+
+class Attempts(Deadline):
+    """Deadline with budget for exactly ``n`` attempts"""
+
+    def __init__(self, n):
+        super().__init__()
+        self.left = n
+
+    def timeout(self):
+        if not self.left:
+            raise DeadlineExceeded('API call deadline exceeded')
+        self.left -= 1
+        return super().timeout()
+
+
+@pytest.fixture(autouse=True)
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(http_transport.time, 'sleep', slept.append)
+    return slept
+
+
+def test_get_retries_5xx_with_backoff(sleeps):
+    upstream = Upstream(503, 502, 200)
+    response = upstream.request('GET', URL, retries=2)
+    assert response.status_code == 200
+    assert len(sleeps) == 2 and all(0 <= delay <= 2.0 for delay in sleeps)
+    assert upstream.stats()['retries'] == 2
+    assert upstream.breaker.failures == 0  # the success closed it again
+
+
+def test_get_retries_429_without_failing_the_breaker(sleeps):
+    upstream = Upstream(429, 429, 429)
+    response = upstream.request('GET', URL, retries=2)
+    assert response.status_code == 429
+    assert len(sleeps) == 2
+    assert upstream.breaker.failures == 0
+
+
+def test_last_5xx_is_returned_and_counted():
+    upstream = Upstream(503, 503)
+    assert upstream.request('GET', URL, retries=1).status_code == 503
+    assert upstream.breaker.failures == 2
+
+
+def test_writes_are_not_retried(sleeps):
+    upstream = Upstream(503, 200)
+    assert upstream.request('POST', URL).status_code == 503
+    assert upstream.outcomes == [200] and not sleeps
+
+
+def test_connection_errors_retry_then_raise():
+    upstream = Upstream(requests.exceptions.ConnectionError(), requests.exceptions.ConnectionError())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        upstream.request('GET', URL, retries=1)
+    assert upstream.breaker.failures == 2
+
+
+def test_open_breaker_short_circuits():
+    upstream = Upstream()
+    for _ in range(upstream.breaker.threshold):
+        upstream.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        upstream.request('GET', URL)
+    assert upstream.stats()['short_circuited'] == 1
+
+
+def test_spent_deadline_is_not_an_endpoint_failure():
+    upstream = Upstream(503, 200)
+    with pytest.raises(DeadlineExceeded):
+        upstream.request('GET', URL, retries=2, deadline=Attempts(1))
+    assert upstream.breaker.failures == 1  # the 503 only
+    assert upstream.outcomes == [200]
+
+
+def test_spent_deadline_releases_a_half_open_trial():
+    upstream = Upstream()
+    upstream.breaker.state = upstream.breaker.HALF_OPEN
+    with pytest.raises(DeadlineExceeded):
+        upstream.request('GET', URL, deadline=Attempts(0))
+    assert upstream.breaker.state == upstream.breaker.HALF_OPEN
+    assert upstream.breaker.allow()
+
+
+def test_explicit_timeout_bypasses_deadline_and_breaker():
+    upstream = Upstream(503)
+    assert upstream.request('GET', URL, timeout=None).status_code == 503
+    assert upstream.timeouts == [None]
+    assert upstream.breaker.failures == 0
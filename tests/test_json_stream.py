@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from json_stream import iter_json_array
+
+
+def chunked(text, size):
+    data = text.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 1024])
+def test_items_of_a_keyed_array_across_chunk_boundaries(size):
+    body = {'total': 3, 'orders': [{'id': 'a', 'amount': 12.5}, {'id': 'b', 'name': 'café'}, 10],
+            'nextCursor': 'c2'}
+    members = {}
+    items = list(iter_json_array(chunked(json.dumps(body), size), 'orders', members=members))
+    assert items == body['orders']
+    assert members == {'total': 3, 'nextCursor': 'c2'}
+
+
+def test_top_level_array_and_empty_array():
+    assert list(iter_json_array(chunked('[1, 22, 333]', 2))) == [1, 22, 333]
+    assert list(iter_json_array([b'{"orders": []}'], 'orders')) == []
+
+
+def test_missing_key_yields_nothing():
+    assert list(iter_json_array([b'{"users": [1, 2]}'], 'orders')) == []
+
+
+@pytest.mark.parametrize('body', [b'{"orders": [1, 2', b'[{"id": "a"}', b'{"orders": 5}', b'"text"'])
+def test_truncated_or_malformed_input_raises(body):
+    with pytest.raises(ValueError):
+        list(iter_json_array([body], 'orders' if body.startswith(b'{') else None))
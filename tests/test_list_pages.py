@@ -0,0 +1,82 @@
+import pytest
+from flask import session
+
+from api_client import Page
+from app_api import CURSOR_WINDOW, app, fetch_list_page
+
+
+class Pages:
+    """Cursor-paginated list of ``count`` items; cursor 'cN' starts page N"""
+
+    def __init__(self, count, per_page=2, paged=True):
+        self.count = count
+        self.per_page = per_page
+        self.paged = paged
+        self.cursors = []
+
+    def __call__(self, cursor=None, limit=None, offset=0, **filters):
+        self.cursors.append(cursor)
+        if not self.paged:
+            return Page(list(range(offset, min(offset + limit, self.count))), None, self.count, False)
+        page = int(cursor[1:]) if cursor else 1
+        start = (page - 1) * self.per_page
+        items = list(range(start, min(start + self.per_page, self.count)))
+        next_cursor = f'c{page + 1}' if start + self.per_page < self.count else None
+        return Page(items, next_cursor, None, True)
+
+
+@pytest.fixture
+def request_context():
+    with app.test_request_context():
+        yield
+
+
+def saved_cursors(name='orders'):
+    return session['page_cursors'][name]['cursors']
+
+
+def test_next_page_costs_one_request(request_context):
+    pages = Pages(10)
+    fetch_list_page('orders', pages, 1, per_page=2)
+    assert saved_cursors() == {'2': 'c2'}
+    result = fetch_list_page('orders', pages, 2, per_page=2)
+    assert result.items == [2, 3] and result.has_next and result.has_prev
+    assert pages.cursors == [None, 'c2']
+
+
+def test_unknown_page_walks_forward_from_the_nearest_cursor(request_context):
+    pages = Pages(20)
+    fetch_list_page('orders', pages, 1, per_page=2)
+    result = fetch_list_page('orders', pages, 4, per_page=2)
+    assert result.items == [6, 7]
+    assert pages.cursors == [None, 'c2', 'c3', 'c4']
+
+
+def test_only_cursors_near_the_current_page_are_kept(request_context):
+    pages = Pages(100)
+    far = CURSOR_WINDOW + 5
+    fetch_list_page('orders', pages, far, per_page=2)
+    pages_kept = sorted(int(p) for p in saved_cursors())
+    assert pages_kept[0] >= far - CURSOR_WINDOW - 1 and pages_kept[-1] == far + 1
+
+    del pages.cursors[:]
+    fetch_list_page('orders', pages, far - 1, per_page=2)
+    assert pages.cursors == [f'c{far - 1}']
+
+
+def test_page_past_the_end_is_empty(request_context):
+    result = fetch_list_page('orders', Pages(4), 5, per_page=2)
+    assert result.items == [] and not result.has_next
+
+
+def test_new_filters_start_over(request_context):
+    pages = Pages(10)
+    fetch_list_page('orders', pages, 1, per_page=2, status='PENDING')
+    fetch_list_page('orders', pages, 2, per_page=2, status='DELIVERED')
+    assert pages.cursors == [None, None, 'c2']
+
+
+def test_unpaged_servers_are_cut_locally(request_context):
+    result = fetch_list_page('orders', Pages(5, paged=False), 3, per_page=2)
+    assert result.items == [4] and result.total == 5 and not result.has_next
+    assert saved_cursors() == {}
@@ -0,0 +1,95 @@
+import json
+import time
+
+from order_index import OrderIndex
+
+
+def order(order_id, ts, status='PENDING', amount=10):
+    return {'id': order_id, 'timestamp': ts, 'status': status, 'totalAmount': amount}
+
+
+def loaded(orders, max_size=3):
+    index = OrderIndex(max_size=max_size)
+    index.load(orders)
+    return index
+
+
+def ids(index, offset=0, limit=10):
+    page = index.page(offset, limit)
+    return page and ([o['id'] for o in page[0]], page[1])
+
+
+def test_load_keeps_the_newest_window():
+    index = loaded([order(f'o{n}', 1000 + n) for n in range(5)])
+    assert ids(index, 0, 3) == (['o4', 'o3', 'o2'], 5)
+    assert index.page(2, 2) is None  # reaches past the window
+    assert index.newest_timestamp() == 1004 * 1000
+
+
+def test_events_insert_update_and_count():
+    index = loaded([order('a', 1000), order('b', 2000)])
+    deltas = []
+    index.add_delta_listener(deltas.append)
+    index.apply_event('new_order', json.dumps(order('c', 3000, amount=5)))
+    index.apply_event('order_update', {'id': 'a', 'status': 'DELIVERED'})
+    assert ids(index) == (['c', 'b', 'a'], 3)
+    assert index.page(2, 1)[0][0]['status'] == 'DELIVERED'
+    assert deltas[0]['total_orders'] == 1
+    assert deltas[1]['total_revenue'] == 10
+    index.remove('b')
+    assert ids(index) == (['c', 'a'], 2)
+
+
+def test_events_during_a_load_are_applied_after_it():
+    index = OrderIndex()
+
+    def orders():
+        index.apply_event('new_order', order('late', 5000))
+        yield order('a', 1000)
+
+    index.load(orders())
+    assert ids(index) == (['late', 'a'], 2)
+
+
+def test_merge_adds_new_orders_without_reloading():
+    index = loaded([order('a', 1000), order('b', 2000)], max_size=10)
+    index.merge([order('b', 2000), order('c', 3000)])
+    assert ids(index) == (['c', 'b', 'a'], 3)
+
+
+def test_refresh_merges_since_the_newest_order_until_a_full_reload_is_due():
+    index = loaded([order('a', 1000)], max_size=10)
+    calls = []
+
+    def load_all():
+        calls.append('all')
+        return [order('a', 1000), order('b', 2000)]
+
+    def load_since(since):
+        calls.append(since)
+        return [order('b', 2000)]
+
+    def refresh():
+        assert index.refresh_async(load_all, load_since)
+        deadline = time.time() + 2
+        while index._loading:
+            assert time.time() < deadline
+            time.sleep(0.01)
+
+    refresh()
+    assert calls == [1000 * 1000]
+    index.full_loaded_at = 0
+    refresh()
+    assert calls[-1] == 'all'
+    assert ids(index) == (['b', 'a'], 2)
+
+
+def test_freshness_follows_streams_and_max_age():
+    index = OrderIndex(max_age=60)
+    assert not index.is_fresh()
+    index.load([order('a', 1000)])
+    assert index.is_fresh()
+    index.loaded_at -= 120
+    assert not index.is_fresh()
+    index.stream_opened()  # events were missed: needs a load first
+    assert not index.is_fresh()
@@ -0,0 +1,37 @@
+from order_stats import OrderStateTracker, stats_delta
+
+
+def test_new_and_deleted_orders():
+    order = {'status': 'PENDING', 'totalAmount': 20}
+    assert stats_delta(None, order) == {'total_orders': 1, 'by_status': {'PENDING': 1}, 'pending_orders': 1}
+    assert stats_delta(order, None) == {'total_orders': -1, 'by_status': {'PENDING': -1}, 'pending_orders': -1}
+
+
+def test_delivery_moves_counters_and_adds_revenue():
+    before = {'status': 'ON_WAY', 'totalAmount': 12.5}
+    after = {'status': 'DELIVERED', 'totalAmount': 12.5}
+    assert stats_delta(before, after) == {
+        'by_status': {'ON_WAY': -1, 'DELIVERED': 1},
+        'in_progress_orders': -1,
+        'delivered_orders': 1,
+        'total_revenue': 12.5,
+    }
+
+
+def test_status_change_within_a_counter_keeps_the_counter():
+    delta = stats_delta({'status': 'CONFIRMED'}, {'status': 'ON_WAY'})
+    assert delta == {'by_status': {'CONFIRMED': -1, 'ON_WAY': 1}}
+
+
+def test_amount_change_of_a_delivered_order_and_no_change():
+    assert stats_delta({'status': 'DELIVERED', 'totalAmount': 10},
+                       {'status': 'DELIVERED', 'totalAmount': '12.25'}) == {'total_revenue': 2.25}
+    assert stats_delta({'status': 'PENDING'}, {'status': 'PENDING'}) == {}
+
+
+def test_tracker_skips_updates_of_unseen_orders():
+    tracker = OrderStateTracker()
+    assert tracker.observe('a', {'status': 'PENDING'}) == {}
+    assert tracker.observe('a', {'status': 'CANCELLED'}) == {
+        'by_status': {'PENDING': -1, 'CANCELLED': 1}, 'pending_orders': -1}
+    assert tracker.observe('b', {'status': 'PENDING'}, is_new=True)['total_orders'] == 1
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+import requests
+
+from resilience import CircuitBreaker, Deadline, DeadlineExceeded, endpoint_key
+
+
+def test_deadline_caps_each_attempt_at_the_remaining_budget():
+    connect, read = Deadline(0.5).timeout()
+    assert 0 < connect <= 0.5
+    assert 0.4 < read <= 0.5
+
+
+def test_spent_deadline_raises_a_requests_timeout():
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout()
+    assert issubclass(DeadlineExceeded, requests.exceptions.Timeout)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    assert not breaker.allow()
+
+
+def opened():
+    """A breaker whose cool-down has just passed"""
+    breaker = CircuitBreaker(threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    breaker.opened_at -= 60
+    return breaker
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = opened()
+    assert breaker.allow()
+    assert breaker.state == breaker.HALF_OPEN
+    assert not breaker.allow()  # the trial is in flight
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = opened()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    assert not breaker.allow()
+
+
+def test_release_frees_the_half_open_trial():
+    breaker = opened()
+    assert breaker.allow()
+    breaker.release()  # e.g. a 429: no verdict on the endpoint
+    assert breaker.state == breaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_endpoint_key_groups_by_resource():
+    assert endpoint_key('https://api.test/api/admin/orders/abc/assign-driver') == 'api.test/api/admin/orders'
+    assert endpoint_key('https://api.test/api/products/123/stock?x=1') == 'api.test/api/products'
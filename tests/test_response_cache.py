@@ -0,0 +1,94 @@
+import pytest
+
+import response_cache
+from response_cache import PolicyCache, ValidatorCache
+
+
+def test_validators_become_conditional_headers():
+    cache = ValidatorCache()
+    cache.store('/a', '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT', {'items': []}, 10)
+    assert cache.conditional_headers('/a') == {'If-None-Match': '"v1"',
+                                               'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert cache.conditional_headers('/b') == {}
+
+
+def test_responses_without_validators_are_not_kept():
+    cache = ValidatorCache()
+    cache.store('/a', None, None, {'items': []}, 10)
+    assert cache.get('/a') is None
+    assert cache.conditional_headers('/a') == {}
+
+
+def test_304_returns_a_detached_copy_of_the_cached_body():
+    cache = ValidatorCache()
+    cache.store('/a', '"v1"', None, {'items': [{'id': 1}]}, 10)
+    body = cache.revalidated('/a')
+    body['items'][0]['createdAt'] = 'annotated'
+    assert cache.revalidated('/a') == {'items': [{'id': 1}]}
+    assert cache.stats()['hits'] == 2
+
+
+def test_304_for_an_evicted_url_is_a_miss():
+    cache = ValidatorCache()
+    assert cache.revalidated('/gone') is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_validator_cache_evicts_least_recently_used():
+    cache = ValidatorCache(max_entries=2, max_bytes=100)
+    cache.store('/a', '"a"', None, 'a', 10)
+    cache.store('/b', '"b"', None, 'b', 10)
+    cache.get('/a')
+    cache.store('/c', '"c"', None, 'c', 10)
+    assert cache.get('/b') is None and cache.get('/a') == 'a'
+    cache.store('/d', '"d"', None, 'd', 95)  # over the byte budget with anything else
+    assert cache.stats()['entries'] == 1 and cache.stats()['bytes'] == 95
+    cache.store('/huge', '"h"', None, 'h', 101)
+    assert cache.get('/huge') is None
+
+
+def test_validator_cache_invalidates_by_prefix():
+    cache = ValidatorCache()
+    for url in ('/api/products', '/api/products?page=2', '/api/orders'):
+        cache.store(url, '"v"', None, url, 10)
+    cache.invalidate('/api/products')
+    assert cache.stats()['entries'] == 1 and cache.get('/api/orders') == '/api/orders'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_policy_cache_expires_after_ttl_but_keeps_stale_bodies(clock):
+    cache = PolicyCache(stale_seconds=60)
+    cache.set('get_products', '/api/products', {'items': [1]}, ttl_seconds=30)
+    assert cache.get('get_products', '/api/products') == {'items': [1]}
+    clock[0] += 31
+    assert cache.get('get_products', '/api/products') is None
+    assert cache.get_stale('get_products', '/api/products') == {'items': [1]}
+    clock[0] += 60
+    assert cache.get_stale('get_products', '/api/products') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_policy_cache_invalidates_every_variant_of_a_read(clock):
+    cache = PolicyCache()
+    cache.set('get_products', '/api/products?page=1', 'p1', 60)
+    cache.set('get_products', '/api/products?page=2', 'p2', 60)
+    cache.set('get_all_drivers', '/api/drivers', 'd', 60)
+    cache.invalidate('get_products', 'get_product_stock')
+    assert cache.get('get_products', '/api/products?page=1') is None
+    assert cache.get('get_products', '/api/products?page=2') is None
+    assert cache.get('get_all_drivers', '/api/drivers') == 'd'
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_policy_cache_is_bounded(clock):
+    cache = PolicyCache(max_entries=2)
+    for key in 'abc':
+        cache.set('get_products', key, key, 60)
+    assert cache.get('get_products', 'a') is None
+    assert cache.stats()['evictions'] == 1
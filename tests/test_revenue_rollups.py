@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('firebase_admin')
+
+from revenue_rollups import counted_state, rollup_delta  # noqa: E402
+
+DAY_MS = int(datetime(2026, 3, 10, 12).timestamp() * 1000)
+NEXT_DAY_MS = int(datetime(2026, 3, 11, 12).timestamp() * 1000)
+
+
+def order(status, amount=20.0, ts=DAY_MS):
+    return {'status': status, 'totalAmount': amount, 'timestamp': ts}
+
+
+def test_new_pending_order():
+    assert rollup_delta(None, order('PENDING')) == {
+        '2026-03-10': {'order_count': 1, 'pending_revenue': 20.0, 'revenue_by_status': {'PENDING': 20.0}},
+    }
+
+
+def test_delivery_moves_revenue_within_the_day():
+    assert rollup_delta(order('PENDING'), order('DELIVERED')) == {
+        '2026-03-10': {'delivered_count': 1, 'delivered_revenue': 20.0, 'pending_revenue': -20.0,
+                       'revenue_by_status': {'PENDING': -20.0, 'DELIVERED': 20.0}},
+    }
+
+
+def test_deleted_delivered_order_and_unchanged_order():
+    assert rollup_delta(order('DELIVERED', 5), None) == {
+        '2026-03-10': {'order_count': -1, 'delivered_count': -1, 'delivered_revenue': -5.0,
+                       'revenue_by_status': {'DELIVERED': -5.0}},
+    }
+    assert rollup_delta(order('ON_WAY'), order('ON_WAY')) == {}
+
+
+def test_timestamp_change_moves_the_order_between_days():
+    delta = rollup_delta(order('CONFIRMED'), order('CONFIRMED', ts=NEXT_DAY_MS))
+    assert delta['2026-03-10']['order_count'] == -1
+    assert delta['2026-03-11']['order_count'] == 1
+
+
+def test_ledger_state_round_trips():
+    state = counted_state({'status': 'DELIVERED', 'totalAmount': '7.5', 'timestamp': DAY_MS, 'items': []})
+    assert state == {'status': 'DELIVERED', 'totalAmount': 7.5, 'timestamp': DAY_MS}
+    assert rollup_delta(state, order('DELIVERED', 7.5)) == {}
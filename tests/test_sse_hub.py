@@ -0,0 +1,46 @@
+import json
+
+from sse_hub import EventLog
+
+
+def append(log, n, **kwargs):
+    return log.append('new_order', json.dumps({'id': n}), **kwargs)
+
+
+def test_since_replays_the_frames_after_an_id():
+    log = EventLog(size=10)
+    ids = [append(log, n)[0] for n in range(4)]
+    assert [event_id for event_id, _ in log.since(ids[1])] == ids[2:]
+    assert log.since(ids[-1]) == []
+
+
+def test_since_is_none_for_evicted_or_unknown_ids():
+    log = EventLog(size=3)
+    ids = [append(log, n)[0] for n in range(5)]
+    assert [event_id for event_id, _ in log.since(ids[1])] == ids[2:]
+    assert log.since(ids[0]) is None       # ids[1] was evicted
+    assert log.since(ids[-1] + 1) is None  # from another process (or the future)
+
+
+def test_duplicate_keys_are_not_appended_twice():
+    log = EventLog()
+    first = append(log, 1, dedupe_key=('o1', 'v1'))
+    again = append(log, 1, dedupe_key=('o1', 'v1'))
+    assert again == (first[0], first[1], False)
+    assert len(log) == 1
+
+
+def test_relayed_ids_are_kept_and_older_ids_resync():
+    log = EventLog()
+    event_id = log.last_id + 1000
+    assert append(log, 1, event_id=event_id)[:1] == (event_id,)
+    assert append(log, 2, event_id=event_id + 5)[0] == event_id + 5
+    assert append(log, 3, event_id=event_id + 5)[2] is False
+    assert [i for i, _ in log.since(event_id)] == [event_id + 5]
+    assert log.since(event_id - 2) is None  # relayed before this log joined
+
+
+def test_resync_frame_carries_the_last_id():
+    log = EventLog()
+    append(log, 1)
+    assert f'id: {log.last_id}'.encode() in log.resync_frame()
@@ -5,6 +5,7 @@ import firebase_admin
 from firebase_admin import firestore, messaging
 from datetime import datetime
 import time
+import request_memo
 
 # Assuming db is initialized in app.py and passed or accessed globally
 # For now, we'll assume db is accessible via current_app or similar context in Flask
@@ -43,7 +44,11 @@ def send_notification(user_id, title, body):
         # Assuming db is accessible here, e.g., from current_app.db or passed in
         # For now, we'll assume firebase_admin.firestore.client() can be called
         db_client = firestore.client() 
-        user_doc = db_client.collection('users').document(user_id).get()
+        # Memoized: bulk updates often notify the same customer several times
+        user_doc = request_memo.get_or_load(
+            ('firestore', 'users', user_id),
+            lambda: db_client.collection('users').document(user_id).get()
+        )
         if user_doc.exists:
             fcm_token = user_doc.to_dict().get('fcmToken')
             if fcm_token: